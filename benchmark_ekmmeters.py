@@ -0,0 +1,213 @@
+'''
+Offline benchmarks for the ekmmeters library.  No meter or serial port
+is required: V3 and V4 meters are driven through an in-memory port which
+answers reads with fixed 255 byte A and B frames, built with the
+OmnimeterEmulator encoder, and answers settings commands with an ACK.
+
+Reports operations per second and, from a separate tracemalloc pass,
+peak traced memory and bytes retained per operation.  Run with --json to
+save results for comparison between versions.
+
+    python benchmark_ekmmeters.py
+    python benchmark_ekmmeters.py --filter request --iterations 2000
+    python benchmark_ekmmeters.py --json > before.json
+
+(c) 2015, 2016 EKM Metering.
+This software is provided under an MIT license:
+    https://opensource.org/licenses/MIT
+'''
+import argparse
+import json
+import time
+import tracemalloc
+
+from ekmmeters import *
+
+V3_ADDRESS = "000000000026"
+V4_ADDRESS = "000300001463"
+METER_TIME = "22010101120000"
+
+
+def v3Frame(address=V3_ADDRESS):
+    '''
+    Synthetic V3 read.
+    '''
+    meter = V3Meter(address)
+    values = {Field.Meter_Address: address,
+              Field.Model: "\x10\x17",
+              Field.Firmware: "\x13",
+              Field.kWh_Tot: "00012345",
+              Field.RMS_Volts_Ln_1: "1203",
+              Field.Meter_Time: METER_TIME}
+    return VirtualMeter.encodeFrame(meter.m_blk_a, values)
+
+
+def v4Frames(address=V4_ADDRESS):
+    '''
+    Synthetic V4 A and B reads.
+    '''
+    meter = V4Meter(address)
+    values_a = {Field.Meter_Address: address,
+                Field.Model: "\x10\x24",
+                Field.Firmware: "\x15",
+                "Request_Type": "00",
+                Field.kWh_Scale: "1",
+                Field.kWh_Tot: "00012345",
+                Field.RMS_Volts_Ln_1: "1203",
+                Field.State_Watts_Dir: "1",
+                Field.Meter_Time: METER_TIME}
+    values_b = {Field.Meter_Address: address,
+                Field.Model: "\x10\x24",
+                Field.Firmware: "\x15",
+                "Request_Type": "01",
+                Field.CT_Ratio: "0200",
+                Field.Meter_Time: METER_TIME}
+    return (VirtualMeter.encodeFrame(meter.m_blk_a, values_a),
+            VirtualMeter.encodeFrame(meter.m_blk_b, values_b))
+
+
+class MemoryPort(SerialPort):
+    '''
+    SerialPort answering from prebuilt frames, without sleeps or I/O.
+    '''
+
+    def __init__(self):
+        super(MemoryPort, self).__init__("memory", force_wait=0)
+        self.m_frames = {}
+        self.m_last = ""
+
+    def addV3(self, address):
+        self.m_frames[address + "v3"] = v3Frame(address)
+
+    def addV4(self, address):
+        frame_a, frame_b = v4Frames(address)
+        self.m_frames[address + "00"] = frame_a
+        self.m_frames[address + "01"] = frame_b
+
+    def initPort(self):
+        return True
+
+    def closePort(self):
+        pass
+
+    def write(self, output):
+        self.m_last = output
+
+    def getResponse(self, context=""):
+        output = self.m_last
+        if output.startswith("/?"):
+            address = output[2:14]
+            if output[14:17] == "!\r\n":
+                return self.m_frames.get(address + "v3", "")
+            return self.m_frames.get(address + output[14:16], "")
+        if output.startswith("\x01"):
+            return "\x06"
+        return ""
+
+
+def timeOps(func, iterations):
+    '''
+    Operations per second for func over iterations calls, after a short warmup.
+    '''
+    for i in range(min(iterations, 50)):
+        func()
+    start = time.perf_counter()
+    for i in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed if elapsed > 0 else 0.0
+
+
+def traceOps(func, iterations):
+    '''
+    Peak traced bytes above the starting point, and bytes retained per call.
+    '''
+    tracemalloc.start()
+    try:
+        func()
+        base, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for i in range(iterations):
+            func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - base, float(current - base) / iterations
+
+
+def buildBenchmarks():
+    '''
+    Named zero argument callables, each one operation.
+    '''
+    port = MemoryPort()
+    port.addV3(V3_ADDRESS)
+    port.addV4(V4_ADDRESS)
+
+    meter_v3 = V3Meter(V3_ADDRESS)
+    meter_v3.attachPort(port)
+    meter_v4 = V4Meter(V4_ADDRESS)
+    meter_v4.attachPort(port)
+    meter_v4.request()
+
+    frame_a, frame_b = v4Frames(V4_ADDRESS)
+    crc_body = frame_a[1:-2]
+    contents_a = meter_v4.unpackStruct(frame_a, meter_v4.m_blk_a)
+    read_buffer = meter_v4.getReadBuffer()
+    watt_fields = [Field.RMS_Watts_Ln_1, Field.RMS_Watts_Ln_2, Field.RMS_Watts_Ln_3, Field.RMS_Watts_Tot]
+    holiday_frame = CommandFrame.get("W", "00B0", (2,) * 40)
+    holiday_values = [1, 1] * 20
+
+    def requestV4Uncached():
+        meter_v4.requestBreadCounter[V4_ADDRESS] = meter_v4.requestBinterval + 1
+        meter_v4.request()
+
+    return [
+        ("calc_crc16", lambda: Meter.calc_crc16(crc_body)),
+        ("unpackStruct[v4A]", lambda: meter_v4.unpackStruct(frame_a, meter_v4.m_blk_a)),
+        ("convertData[v4A]", lambda: meter_v4.convertData(contents_a, meter_v4.m_blk_a, 1)),
+        ("CommandFrame.build[00B0]", lambda: holiday_frame.build(*holiday_values)),
+        ("setHolidayDates[v4]", lambda: meter_v4.setHolidayDates()),
+        ("crcMeterRead[v4A]", lambda: meter_v4.crcMeterRead(frame_a, meter_v4.m_blk_a)),
+        ("getFields[v4]", lambda: meter_v4.getFields(watt_fields)),
+        ("jsonRender[v4]", lambda: meter_v4.jsonRender(read_buffer)),
+        ("sqlInsert[v4]", lambda: MeterDB.sqlInsert(read_buffer, frame_a, frame_b)),
+        ("request[v3]", meter_v3.request),
+        ("request[v4 cached B]", meter_v4.request),
+        ("request[v4 A+B]", requestV4Uncached),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ekmmeters benchmarks.")
+    parser.add_argument("--iterations", type=int, default=5000, help="timed calls per benchmark")
+    parser.add_argument("--trace-iterations", type=int, default=200, help="tracemalloc calls per benchmark")
+    parser.add_argument("--filter", default="", help="run benchmarks whose name contains this string")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    ekm_set_log(ekm_no_log)
+    results = []
+    for name, func in buildBenchmarks():
+        if args.filter and args.filter not in name:
+            continue
+        ops = timeOps(func, args.iterations)
+        peak, retained = traceOps(func, args.trace_iterations)
+        results.append({"name": name,
+                        "ops_per_sec": ops,
+                        "usec_per_op": 1000000.0 / ops if ops else 0.0,
+                        "peak_bytes": peak,
+                        "retained_bytes_per_op": retained})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("%-24s %12s %10s %12s %14s" % ("benchmark", "ops/sec", "usec/op", "peak bytes", "retained/op"))
+    for result in results:
+        print("%-24s %12.0f %10.1f %12d %14.1f" % (result["name"], result["ops_per_sec"],
+                                                   result["usec_per_op"], result["peak_bytes"],
+                                                   result["retained_bytes_per_op"]))
+
+
+if __name__ == '__main__':
+    main()
@@ -10,15 +10,30 @@ import struct
 import time
 from collections import OrderedDict
 from collections import namedtuple
+from collections import deque
 #from datetime import date
 import sqlite3
 #import binascii
 import serial
 import traceback
+import threading
 import sys
 import json
 import datetime
 import codecs
+import math
+import bisect
+import random
+import os
+import hashlib
+import csv
+import io
+import tempfile
+import zipfile
+import mmap
+import zlib
+from operator import itemgetter
+from array import array
 
 def hex2str(string):
     return codecs.decode(codecs.decode(string, "hex"), "ascii")
@@ -28,6 +43,72 @@ def str2hex(string):
     return codecs.decode(codecs.encode(string.encode(), "hex"), "ascii")
 
 
+#: Byte lookup table for the EKM Omnimeter CRC-16.
+ekm_crc16_table = (0x0000, 0xc0c1, 0xc181, 0x0140, 0xc301, 0x03c0, 0x0280, 0xc241,
+                   0xc601, 0x06c0, 0x0780, 0xc741, 0x0500, 0xc5c1, 0xc481, 0x0440,
+                   0xcc01, 0x0cc0, 0x0d80, 0xcd41, 0x0f00, 0xcfc1, 0xce81, 0x0e40,
+                   0x0a00, 0xcac1, 0xcb81, 0x0b40, 0xc901, 0x09c0, 0x0880, 0xc841,
+                   0xd801, 0x18c0, 0x1980, 0xd941, 0x1b00, 0xdbc1, 0xda81, 0x1a40,
+                   0x1e00, 0xdec1, 0xdf81, 0x1f40, 0xdd01, 0x1dc0, 0x1c80, 0xdc41,
+                   0x1400, 0xd4c1, 0xd581, 0x1540, 0xd701, 0x17c0, 0x1680, 0xd641,
+                   0xd201, 0x12c0, 0x1380, 0xd341, 0x1100, 0xd1c1, 0xd081, 0x1040,
+                   0xf001, 0x30c0, 0x3180, 0xf141, 0x3300, 0xf3c1, 0xf281, 0x3240,
+                   0x3600, 0xf6c1, 0xf781, 0x3740, 0xf501, 0x35c0, 0x3480, 0xf441,
+                   0x3c00, 0xfcc1, 0xfd81, 0x3d40, 0xff01, 0x3fc0, 0x3e80, 0xfe41,
+                   0xfa01, 0x3ac0, 0x3b80, 0xfb41, 0x3900, 0xf9c1, 0xf881, 0x3840,
+                   0x2800, 0xe8c1, 0xe981, 0x2940, 0xeb01, 0x2bc0, 0x2a80, 0xea41,
+                   0xee01, 0x2ec0, 0x2f80, 0xef41, 0x2d00, 0xedc1, 0xec81, 0x2c40,
+                   0xe401, 0x24c0, 0x2580, 0xe541, 0x2700, 0xe7c1, 0xe681, 0x2640,
+                   0x2200, 0xe2c1, 0xe381, 0x2340, 0xe101, 0x21c0, 0x2080, 0xe041,
+                   0xa001, 0x60c0, 0x6180, 0xa141, 0x6300, 0xa3c1, 0xa281, 0x6240,
+                   0x6600, 0xa6c1, 0xa781, 0x6740, 0xa501, 0x65c0, 0x6480, 0xa441,
+                   0x6c00, 0xacc1, 0xad81, 0x6d40, 0xaf01, 0x6fc0, 0x6e80, 0xae41,
+                   0xaa01, 0x6ac0, 0x6b80, 0xab41, 0x6900, 0xa9c1, 0xa881, 0x6840,
+                   0x7800, 0xb8c1, 0xb981, 0x7940, 0xbb01, 0x7bc0, 0x7a80, 0xba41,
+                   0xbe01, 0x7ec0, 0x7f80, 0xbf41, 0x7d00, 0xbdc1, 0xbc81, 0x7c40,
+                   0xb401, 0x74c0, 0x7580, 0xb541, 0x7700, 0xb7c1, 0xb681, 0x7640,
+                   0x7200, 0xb2c1, 0xb381, 0x7340, 0xb101, 0x71c0, 0x7080, 0xb041,
+                   0x5000, 0x90c1, 0x9181, 0x5140, 0x9301, 0x53c0, 0x5280, 0x9241,
+                   0x9601, 0x56c0, 0x5780, 0x9741, 0x5500, 0x95c1, 0x9481, 0x5440,
+                   0x9c01, 0x5cc0, 0x5d80, 0x9d41, 0x5f00, 0x9fc1, 0x9e81, 0x5e40,
+                   0x5a00, 0x9ac1, 0x9b81, 0x5b40, 0x9901, 0x59c0, 0x5880, 0x9841,
+                   0x8801, 0x48c0, 0x4980, 0x8941, 0x4b00, 0x8bc1, 0x8a81, 0x4a40,
+                   0x4e00, 0x8ec1, 0x8f81, 0x4f40, 0x8d01, 0x4dc0, 0x4c80, 0x8c41,
+                   0x4400, 0x84c1, 0x8581, 0x4540, 0x8701, 0x47c0, 0x4680, 0x8641,
+                   0x8201, 0x42c0, 0x4380, 0x8341, 0x4100, 0x81c1, 0x8081, 0x4040)
+
+
+def ekm_crc16_update(crc, buf):
+    """ Continue an EKM CRC-16 over buf.
+
+    Start with 0xffff.  A CRC carried across a constant prefix lets
+    :class:`~ekmmeters.CommandFrame` CRC only the variable part of a frame.
+
+    Args:
+        crc (int): Running CRC state.
+        buf (str): Characters to add.
+
+    Returns:
+        int: New running CRC state.
+    """
+    crc_table = ekm_crc16_table
+    for c in buf:
+        crc = (crc >> 8) ^ crc_table[(crc ^ ord(c)) & 0xff]
+    return crc
+
+
+def ekm_crc16_final(crc):
+    """ Finish a running EKM CRC-16 state.
+
+    Args:
+        crc (int): Running CRC state from :func:`~ekmmeters.ekm_crc16_update`.
+
+    Returns:
+        int: 16 bit CRC per EKM Omnimeters.
+    """
+    return ((crc << 8) | (crc >> 8)) & 0x7F7F
+
+
 def ekm_no_log(output_string):
     """ No-op predefined module level logging callback.
 
@@ -54,6 +135,10 @@ global ekmmeters_log_func  #: Module level log or diagnostic print
 ekmmeters_log_func = ekm_no_log
 global ekmmeters_log_level
 ekmmeters_log_level = 3
+global ekmmeters_logger  #: Optional stdlib logging.Logger, see ekm_use_logging()
+ekmmeters_logger = None
+global ekmmeters_metrics  #: Optional MetricsRegistry, see ekm_set_metrics()
+ekmmeters_metrics = None
 global __EKMMETERS_VERSION
 __EKMMETERS_VERSION = "0.2.6"
 
@@ -65,21 +150,94 @@ def ekm_set_log(function_name):
         function_name (function):  function taking 1 string returning nothing.
     """
     global ekmmeters_log_func
+    global ekmmeters_logger
     ekmmeters_log_func = function_name
+    ekmmeters_logger = None
     pass
 
 
-def ekm_log(logstr, priority=3):
-    """ Send string to module level log
+def ekm_use_logging(logger=None):
+    """ Route module level log output to a stdlib logging.Logger.
+
+    Priority 3 messages are logged at logging.DEBUG and priority 4 one step
+    below it, so the logger's own level and handlers decide what is kept.
+    Call ekm_set_log() to return to a callback.
+
+    Args:
+        logger (logging.Logger): Destination, defaults to logging.getLogger("ekmmeters").
+    """
+    global ekmmeters_log_func
+    global ekmmeters_logger
+    if logger is None:
+        import logging
+        logger = logging.getLogger("ekmmeters")
+    ekmmeters_logger = logger
+    ekmmeters_log_func = ekm_no_log
+    pass
+
+
+def ekm_log_enabled(priority=3):
+    """ True if a message at priority would be output.
+
+    Use to skip building expensive diagnostic strings.
 
     Args:
-        logstr (str): string to print.
         priority (int): priority, supports 3 (default) and 4 (special).
+
+    Returns:
+        bool: True if ekm_log() would output at priority.
+    """
+    if ekmmeters_logger is not None:
+        return ekmmeters_logger.isEnabledFor(13 - priority)
+    return (ekmmeters_log_func is not ekm_no_log) and (priority <= ekmmeters_log_level)
+
+
+def ekm_log(logstr, *args, priority=None):
+    """ Send string to module level log
+
+    Nothing is formatted or timestamped unless the message will be output, so
+    pass values as %-args or pass a callable returning the string rather than
+    concatenating on hot paths::
+
+        ekm_log("Read %s in %d ms", address, elapsed)
+        ekm_log(qry_str, priority=4)
+
+    The original positional form, ekm_log(qry_str, 4), is still accepted: a
+    lone int after a string with no % conversions is the priority.  Logging
+    never raises, a message which fails to format is output unformatted.
+
+    Args:
+        logstr (str): string to print, a %-format if args passed, or a callable returning the string.
+        *args: Optional %-format arguments for logstr.
+        priority (int): Priority, supports 3 (default) and 4 (special).
     """
-    if priority <= ekmmeters_log_level:
-        dt = datetime.datetime
+    if priority is None:
+        priority = 3
+        if (len(args) == 1 and type(args[0]) is int and
+                not (isinstance(logstr, str) and "%" in logstr)):
+            priority = args[0]
+            args = ()
+    try:
+        if ekmmeters_logger is not None:
+            level = 13 - priority
+            if ekmmeters_logger.isEnabledFor(level):
+                if callable(logstr):
+                    logstr = logstr()
+                ekmmeters_logger.log(level, logstr, *args)
+            return
+        if (ekmmeters_log_func is ekm_no_log) or (priority > ekmmeters_log_level):
+            return
+        if callable(logstr):
+            logstr = logstr()
+        elif args:
+            try:
+                logstr = logstr % args
+            except (TypeError, ValueError):
+                logstr = str(logstr) + " " + " ".join(str(arg) for arg in args)
         stamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M.%f")
-        ekmmeters_log_func("[EKM Meter Debug Message: " + stamp + "] -> " + logstr)
+        ekmmeters_log_func("[EKM Meter Debug Message: " + stamp + "] -> " + str(logstr))
+    except:
+        pass
     pass
 
 
@@ -92,6 +250,23 @@ def ekm_set_log_level(level=3):
     ekmmeters_log_level = level
     pass
 
+
+def ekm_set_metrics(registry):
+    """ Set the module level :class:`~ekmmeters.MetricsRegistry` updated by reads and inserts.
+
+    Args:
+        registry (MetricsRegistry): Registry, or None to stop collecting.
+    """
+    global ekmmeters_metrics
+    ekmmeters_metrics = registry
+    pass
+
+
+def ekm_get_metrics():
+    """ Module level :class:`~ekmmeters.MetricsRegistry`, None if not set. """
+    return ekmmeters_metrics
+
+
 def fixCosTheta(CosTheta):
         return CosTheta[1:2]+"."+CosTheta[2:]+" "+CosTheta[0]
 
@@ -922,6 +1097,309 @@ class CosTheta():
     NoLeadOrLag = (" ")
 
 
+class DispatchPolicy():
+    """ Full queue handling in :class:`~ekmmeters.QueuedObserver`.
+
+    ============ ==============================================
+    Block        Wait up to the observer timeout, then drop.
+                 With no timeout, wait for room until stopped.
+    DropNewest   Discard the incoming read
+    DropOldest   Discard the oldest queued read
+    Coalesce     Keep only the most recent undelivered read
+    ============ ==============================================
+
+    """
+
+    def __init__(self):
+        pass
+
+    Block = "block"
+    DropNewest = "drop_newest"
+    DropOldest = "drop_oldest"
+    Coalesce = "coalesce"
+
+
+class WindowType():
+    """ Window kind for :class:`~ekmmeters.SummaryObserver`.
+
+    ======== ===============================================
+    Tumbling Fixed, back to back intervals aligned to epoch
+    Sliding  Trailing interval, summarized every hop seconds
+    ======== ===============================================
+
+    """
+
+    def __init__(self):
+        pass
+
+    Tumbling = "tumbling"
+    Sliding = "sliding"
+
+
+class EventRuleType():
+    """ Test applied by an :class:`~ekmmeters.EventRule`.
+
+    ========== ===============================================
+    Above      Native value greater than level
+    Below      Native value less than level
+    RateAbove  Change per second greater than level
+    RateBelow  Change per second less than level
+    Transition Native value changed, optionally from/to states
+    ========== ===============================================
+
+    """
+
+    def __init__(self):
+        pass
+
+    Above = "above"
+    Below = "below"
+    RateAbove = "rate_above"
+    RateBelow = "rate_below"
+    Transition = "transition"
+
+
+class EventState():
+    """ Kind of :class:`~ekmmeters.MeterEvent`.
+
+    ====== ===========================================
+    Raise  Threshold or rate rule became active
+    Clear  Active threshold or rate rule cleared
+    Change Transition rule saw a new (debounced) state
+    ====== ===========================================
+
+    """
+
+    def __init__(self):
+        pass
+
+    Raise = "raise"
+    Clear = "clear"
+    Change = "change"
+
+
+class LatencyStage():
+    """ Stage names recorded by :func:`~ekmmeters.Meter.enableLatencyStats`
+    and :func:`~ekmmeters.SerialPort.enableLatencyStats`.
+
+    ========== ====================================================
+    Write      Port write, including the post write force_wait sleep
+    Response   Polling getResponse() for the block or ACK
+    Unpack     unpackStruct()
+    Convert    convertData()
+    Crc        crcMeterRead()
+    Calculate  calculateFields() and buffer assembly
+    Observers  updateObservers()
+    Request    Whole request()
+    ========== ====================================================
+
+    Settings commands are recorded under their context name, ex. "setCTRatio".
+    """
+
+    def __init__(self):
+        pass
+
+    Write = "write"
+    Response = "response"
+    Unpack = "unpack"
+    Convert = "convert"
+    Crc = "crc"
+    Calculate = "calculate"
+    Observers = "observers"
+    Request = "request"
+
+
+class MetricType():
+    """ Kind of metric in a :class:`~ekmmeters.MetricsRegistry`.
+
+    ========= =====================================
+    Counter   Monotonic total
+    Gauge     Current value
+    Histogram Bucketed samples with sum and count
+    ========= =====================================
+
+    """
+
+    def __init__(self):
+        pass
+
+    Counter = "counter"
+    Gauge = "gauge"
+    Histogram = "histogram"
+
+
+class Metric():
+    """ Metrics updated by the library when a registry is set with :func:`~ekmmeters.ekm_set_metrics`.
+
+    ================ ================================== =====
+    ReadsAttempted   Meter reads started                meter
+    ReadsSucceeded   Reads with good CRC and address    meter
+    CrcFailures      Blocks with a bad CRC              meter
+    LengthErrors     Blocks of the wrong length         meter
+    ResponseTimeouts getResponse() polls timed out      port
+    BCacheHits       V4 reads using a cached B block    meter
+    Retries          Reads and commands retried         meter
+    CircuitSkips     Requests refused by open breaker   meter
+    DbInsertSeconds  dbInsert() duration histogram      meter
+    SpoolPending     Reads waiting in a spool (gauge)   spool
+    SpoolBytes       Spool disk use (gauge)             spool
+    SpoolDrained     Spooled reads stored               spool
+    SpoolDropped     Spooled reads dropped at max_bytes spool
+    SpoolFailures    Spool drain batches which failed   spool
+    SpoolDeadLetters Spooled reads moved to spool.dead  spool
+    ================ ================================== =====
+
+    """
+
+    def __init__(self):
+        pass
+
+    ReadsAttempted = "ekm_reads_attempted_total"
+    ReadsSucceeded = "ekm_reads_succeeded_total"
+    CrcFailures = "ekm_crc_failures_total"
+    LengthErrors = "ekm_length_errors_total"
+    ResponseTimeouts = "ekm_response_timeouts_total"
+    BCacheHits = "ekm_b_cache_hits_total"
+    Retries = "ekm_retries_total"
+    CircuitSkips = "ekm_circuit_skips_total"
+    DbInsertSeconds = "ekm_db_insert_seconds"
+    SpoolPending = "ekm_spool_pending_reads"
+    SpoolBytes = "ekm_spool_bytes"
+    SpoolDrained = "ekm_spool_drained_total"
+    SpoolDropped = "ekm_spool_dropped_total"
+    SpoolFailures = "ekm_spool_failures_total"
+    SpoolDeadLetters = "ekm_spool_dead_letters_total"
+
+
+class CaptureKind():
+    """ Record type in a :class:`~ekmmeters.RecordingSerialPort` capture file.
+
+    ======== =============================
+    Write    Bytes written to the port
+    Response Bytes returned by getResponse
+    ======== =============================
+
+    """
+
+    def __init__(self):
+        pass
+
+    Write = 0
+    Response = 1
+
+
+class ReadError():
+    """ Why the last read or command on a :class:`~ekmmeters.Meter` failed.
+
+    ======== ===============================================
+    NoError  Last read or command succeeded
+    Timeout  No complete response before the deadline
+    Length   Response did not unpack to the expected block
+    Crc      Response CRC did not match
+    Address  Response was from another meter or read type
+    Reply    Command answered with something other than ACK
+    Circuit  Skipped, the circuit breaker for the meter is open
+    ======== ===============================================
+
+    """
+
+    def __init__(self):
+        pass
+
+    NoError = ""
+    Timeout = "Timeout"
+    Length = "Length"
+    Crc = "Crc"
+    Address = "Address"
+    Reply = "Reply"
+    Circuit = "Circuit"
+
+
+class PushStatus():
+    """ Per meter result in a :class:`~ekmmeters.FleetPushEngine` run and checkpoint.
+
+    ========= ==========================================
+    Done      Every configured setting matches the meter
+    Failed    A read or command failed, retried on resume
+    Skipped   Done in the checkpoint, not contacted
+    ========= ==========================================
+
+    """
+
+    def __init__(self):
+        pass
+
+    Done = "Done"
+    Failed = "Failed"
+    Skipped = "Skipped"
+
+
+class ExportFormat():
+    """ File format written by :class:`~ekmmeters.ReadExporter`.
+
+    ======= ==========================================
+    Parquet Parquet file, requires pyarrow
+    Arrow   Arrow IPC file, requires pyarrow
+    Npz     numpy .npz, one array per field
+    Csv     CSV with a header row, no requirements
+    Ndjson  One JSON object per line, no requirements
+    ======= ==========================================
+
+    """
+
+    def __init__(self):
+        pass
+
+    Parquet = "parquet"
+    Arrow = "arrow"
+    Npz = "npz"
+    Csv = "csv"
+    Ndjson = "ndjson"
+
+
+class CircuitState():
+    """ Per meter state in a :class:`~ekmmeters.CircuitBreaker`.
+
+    ======== ===================================================
+    Closed   Requests pass
+    Open     Requests are refused until the reset timeout passes
+    HalfOpen One trial request passes, its result closes or opens
+    ======== ===================================================
+
+    """
+
+    def __init__(self):
+        pass
+
+    Closed = "Closed"
+    Open = "Open"
+    HalfOpen = "HalfOpen"
+
+
+#: One field summarized over one window by :class:`~ekmmeters.SummaryObserver`.
+#: Times are epoch ms.  Delta is Last less the first sample, for registers like kWh_Tot.
+WindowSummary = namedtuple("WindowSummary", [Field.Meter_Address, "Field_Name", "Start_Time", "End_Time",
+                                             "Count", "Min", "Max", "Mean", "StdDev", "Last", "Delta"])
+
+#: Event from :class:`~ekmmeters.EventObserver`.  Value is the rate for rate rules,
+#: Previous is the prior state for transitions and None otherwise.  Time is epoch ms.
+MeterEvent = namedtuple("MeterEvent", [Field.Meter_Address, "Rule_Name", "Field_Name", "Event",
+                                       "Value", "Previous", "Time_Stamp"])
+
+#: Settings from :func:`~ekmmeters.Meter.getSettings`.  Schedules is a tuple of
+#: Extents.Schedules tuples of Extents.Periods (Hour, Min, Tariff).  Seasons are
+#: (Month, Day, Schedule), Holidays (Month, Day), and Months_kWh and Months_Rev_kWh
+#: Extents.Months tuples of (Tariff_1, Tariff_2, Tariff_3, Tariff_4, Tot) as floats.
+#: All other values are int.  Time_Stamp is epoch ms at read.
+MeterSettings = namedtuple("MeterSettings", [Field.Meter_Address, "Schedules", "Seasons", "Holidays",
+                                             "Weekend_Schd", "Holiday_Schd", "Months_kWh",
+                                             "Months_Rev_kWh", "Time_Stamp"])
+
+#: One column of a :class:`~ekmmeters.StorageBackend` schema.  Field_Type is a
+#: :class:`~ekmmeters.FieldType` value and Size the field length in characters.
+StorageColumn = namedtuple("StorageColumn", ["Column_Name", "Field_Type", "Size"])
+
+
 class SerialBlock(OrderedDict):
     """ Simple subclass of collections.OrderedDict.
 
@@ -945,462 +1423,4148 @@ class SerialBlock(OrderedDict):
         super(SerialBlock, self).__init__()
 
 
-class SerialPort(object):
-    """ Wrapper for serial port commands.
-
-    It should only be necessary to create one SerialPort per real port.
-
-    Object construction sets the class variables.  The port is opened with
-    initPort(), and any serial exceptions will thrown at that point.
+class ReadSnapshot(object):
+    """ Immutable, tuple backed copy of one read.
 
-    The standard serial settings for v3 and v4 EKM meters are 9600 baud,
-    7 bits, 1 stop bit, no parity.  The baud rate may be reset but all timings
-    and test in this library are at 9600 baud.  Bits, stop and parity may not
-    be changed.
+    Supports the same read-only traversal as :class:`~ekmmeters.SerialBlock`,
+    so snapshot[Field.RMS_Volts_Ln_1][MeterData.NativeValue] works unchanged,
+    but every field value is a tuple and the next read cannot overwrite it.
+    Field name lookups share one index per meter layout, so a snapshot is a
+    single tuple of tuples and passing it between threads costs nothing.
     """
 
-    def __init__(self, ttyport, baudrate=9600, force_wait=0.2):
+    __slots__ = ("m_keys", "m_index", "m_fields", "m_time_stamp", "m_natives")
+
+    def __init__(self, keys, index, fields, time_stamp):
         """
         Args:
-            ttyport (str): port name, ex 'COM3' '/dev/ttyUSB0'
-            baudrate (int): optional, 9600 default and recommended
-            force_wait(float) : optional post commnd sleep, if required
+            keys (tuple): Field names in read order.
+            index (dict): Field name to position in keys.
+            fields (tuple): One :class:`~ekmmeters.MeterData` tuple per field.
+            time_stamp (int): Epoch in ms at read.
         """
-        self.m_ttyport = ttyport
-        self.m_baudrate = baudrate
-        self.m_ser = None
-        self.m_fd = None
-        self.m_max_waits = 100
-        self.m_wait_sleep = 0.02
-        self.m_force_wait = force_wait
-        self.m_init_wait = 0.1
-        pass
+        self.m_keys = keys
+        self.m_index = index
+        self.m_fields = fields
+        self.m_time_stamp = time_stamp
+        self.m_natives = None
 
-    def initPort(self):
-        """ Required initialization call, wraps pyserial constructor. """
-        try:
-            self.m_ser = serial.Serial(port=self.m_ttyport,
-                                       baudrate=self.m_baudrate,
-                                       timeout=10,
-                                       parity=serial.PARITY_EVEN,
-                                       stopbits=serial.STOPBITS_ONE,
-                                       bytesize=serial.SEVENBITS,
-                                       rtscts=False)
-            ekm_log("Pyserial version = " + serial.VERSION)
-            ekm_log("Port = " + self.m_ttyport)
-            ekm_log("Rate = " + str(self.m_baudrate))
-            time.sleep(self.m_init_wait)
-            return True
-        except:
-            ekm_log(traceback.format_exc())
+    @staticmethod
+    def makeIndex(keys):
+        """ Build the shared name to position lookup for a field layout.
 
-        return False
+        Args:
+            keys (tuple): Field names in read order.
 
-    def getName(self):
-        """ Getter for serial port name
+        Returns:
+            dict: Field name to position.
+        """
+        return dict((fld, idx) for idx, fld in enumerate(keys))
+
+    @staticmethod
+    def fromBlock(def_buf, time_stamp=None, keys=None, index=None):
+        """ Freeze a :class:`~ekmmeters.SerialBlock`.
+
+        Args:
+            def_buf (SerialBlock): Read buffer to copy.
+            time_stamp (int): Optional epoch in ms, defaults to now.
+            keys (tuple): Optional cached field names, must match def_buf order.
+            index (dict): Optional cached index for keys.
 
         Returns:
-            string: name of serial port (ex: 'COM3', '/dev/ttyS0')
+            ReadSnapshot: Immutable copy of def_buf.
         """
-        return self.m_ttyport
+        if keys is None:
+            keys = tuple(def_buf.keys())
+            index = ReadSnapshot.makeIndex(keys)
+        if time_stamp is None:
+            time_stamp = int(time.time() * 1000)
+        return ReadSnapshot(keys, index, tuple(tuple(val) for val in def_buf.values()), time_stamp)
 
-    def closePort(self):
-        """ Passthrough for pyserial port close()."""
-        self.m_ser.close()
-        pass
+    def __getitem__(self, fld):
+        return self.m_fields[self.m_index[fld]]
 
-    def write(self, output):
-        """Passthrough for pyserial Serial.write().
+    def __contains__(self, fld):
+        return fld in self.m_index
+
+    def __iter__(self):
+        return iter(self.m_keys)
+
+    def __len__(self):
+        return len(self.m_keys)
+
+    def keys(self):
+        """ Field names in read order. """
+        return self.m_keys
+
+    def values(self):
+        """ Field value tuples in read order. """
+        return self.m_fields
+
+    def items(self):
+        """ (field, value tuple) pairs in read order. """
+        return zip(self.m_keys, self.m_fields)
+
+    def get(self, fld, default=None):
+        """ Mapping style get.
 
         Args:
-            output (str): Block to write to port
+            fld (str): A :class:`~ekmmeters.Field` value.
+            default: Returned if the field is not in the read.
         """
-        view_str = output.encode('ascii', 'ignore')
-        if (len(view_str) > 0):
-            self.m_ser.write(view_str)
-            self.m_ser.flush()
-            self.m_ser.reset_input_buffer()
-            time.sleep(self.m_force_wait)
-        pass
+        idx = self.m_index.get(fld)
+        if idx is None:
+            return default
+        return self.m_fields[idx]
 
-    def setPollingValues(self, max_waits, wait_sleep):
-        """ Optional polling loop control
+    def getField(self, fld):
+        """ String value of a field, as :func:`~ekmmeters.V4Meter.getField`.
 
         Args:
-            max_waits (int):   waits
-            wait_sleep (int):  ms per wait
+            fld (str): A :class:`~ekmmeters.Field` value.
+
+        Returns:
+            str: String value, empty if the field is not in the read.
         """
-        self.m_max_waits = max_waits
-        self.m_wait_sleep = wait_sleep
+        idx = self.m_index.get(fld)
+        if idx is None:
+            return ""
+        return self.m_fields[idx][MeterData.StringValue]
+
+    def getNative(self, fld):
+        """ Native (scaled int, float or str) value of a field.
 
-    def getResponse(self, context=""):
-        """ Poll for finished block or first byte ACK.
         Args:
-            context (str): internal serial call context.
+            fld (str): A :class:`~ekmmeters.Field` value.
 
         Returns:
-            string: Response, implict cast from byte array.
+            Native value, None if the field is not in the read.
         """
-        waits = 0  # allowed interval counter
-        response_str = ""  # returned bytes in string default
-        try:
-            waits = 0  # allowed interval counter
-            while (waits < self.m_max_waits):
-                bytes_to_read = self.m_ser.inWaiting()
-                if bytes_to_read > 0:
-                    next_chunk = codecs.decode(self.m_ser.read(bytes_to_read), "ascii")
-                    response_str += next_chunk
-                    if (len(response_str) == 255):
-                        time.sleep(self.m_force_wait)
-                        return response_str
-                    if (len(response_str) == 1) and (str2hex(response_str) == '06'):
-                        time.sleep(self.m_force_wait)
-                        return response_str
-                else:  # hang out -- half shortest expected interval (50 ms)
-                    waits += 1
-                    time.sleep(self.m_wait_sleep)
-            response_str = ""
+        idx = self.m_index.get(fld)
+        if idx is None:
+            return None
+        return self.m_fields[idx][MeterData.NativeValue]
 
-        except:
+    def getNatives(self):
+        """ Native values of every field in read order, built on first use.
+
+        A None follows the last field, the position
+        :class:`~ekmmeters.FieldAccessor` uses for fields not in the read.
+
+        Returns:
+            tuple: Native values in read order, then None.
+        """
+        if self.m_natives is None:
+            native = MeterData.NativeValue
+            self.m_natives = tuple([val[native] for val in self.m_fields]) + (None,)
+        return self.m_natives
+
+    def getFields(self, flds):
+        """ Native values of several fields in one call.
+
+        Args:
+            flds (list): :class:`~ekmmeters.Field` values.
+
+        Returns:
+            tuple: Native value of each field, None where not in the read.
+        """
+        return FieldAccessor(flds)(self)
+
+    def getTimeStamp(self):
+        """ Epoch in ms when the read completed. """
+        return self.m_time_stamp
+
+    def getMeterAddress(self):
+        """ 12 character meter address from the read. """
+        return self.getField(Field.Meter_Address)
+
+
+class FieldAccessor(object):
+    """ Precomputed lookup of a fixed list of fields in a :class:`~ekmmeters.ReadSnapshot`.
+
+    Field positions are resolved once per meter layout and the values are
+    picked from :func:`~ekmmeters.ReadSnapshot.getNatives` with one
+    itemgetter call, so an observer pulling the same fields from every
+    read does no name hashing or string to number conversion::
+
+        volts = FieldAccessor([Field.RMS_Volts_Ln_1, Field.RMS_Volts_Ln_2])
+        ln_1, ln_2 = volts(snapshot)
+    """
+
+    __slots__ = ("m_flds", "m_keys", "m_getter")
+
+    def __init__(self, flds):
+        """
+        Args:
+            flds (list): :class:`~ekmmeters.Field` values, in return order.
+        """
+        self.m_flds = tuple(flds)
+        self.m_keys = None
+        self.m_getter = None
+
+    def __call__(self, snapshot):
+        """ Native values for the fields from one read.
+
+        Args:
+            snapshot (ReadSnapshot): Read to pick from.
+
+        Returns:
+            tuple: Native value of each field, None where not in the read.
+        """
+        if snapshot.m_keys is not self.m_keys:
+            self.resolve(snapshot.m_keys, snapshot.m_index)
+        return self.m_getter(snapshot.getNatives())
+
+    def resolve(self, keys, index):
+        """ Compute positions for a field layout.  Private.
+
+        Args:
+            keys (tuple): Field names in read order.
+            index (dict): Field name to position in keys.
+        """
+        missing = len(keys)
+        positions = [index.get(fld, missing) for fld in self.m_flds]
+        if len(positions) == 1:
+            position = positions[0]
+            self.m_getter = lambda natives: (natives[position],)
+        elif positions:
+            self.m_getter = itemgetter(*positions)
+        else:
+            self.m_getter = lambda natives: ()
+        self.m_keys = keys
+
+    def getFieldNames(self):
+        """ Fields returned, in order. """
+        return self.m_flds
+
+
+class LatencyHistogram(object):
+    """ Fixed size log scale histogram of durations in seconds.
+
+    Buckets are four per octave from 10 microseconds up, so add() is a log,
+    a multiply and an increment, and memory does not grow with samples.
+    Percentiles are the upper edge of the containing bucket, within about
+    19 percent, clamped to the observed min and max.  The last bucket is
+    open ended and reports the max.
+    """
+
+    m_floor = 0.00001
+    m_per_octave = 4
+    m_buckets = 96
+
+    def __init__(self):
+        self.m_scale = self.m_per_octave / math.log(2)
+        self.reset()
+
+    def reset(self):
+        """ Discard all samples. """
+        self.m_counts = [0] * self.m_buckets
+        self.m_count = 0
+        self.m_sum = 0.0
+        self.m_min = None
+        self.m_max = None
+
+    def add(self, seconds):
+        """ Add one duration.
+
+        Args:
+            seconds (float): Duration.
+        """
+        if seconds > self.m_floor:
+            idx = int(math.log(seconds / self.m_floor) * self.m_scale) + 1
+            if idx >= self.m_buckets:
+                idx = self.m_buckets - 1
+        else:
+            idx = 0
+        self.m_counts[idx] += 1
+        self.m_count += 1
+        self.m_sum += seconds
+        if self.m_min is None or seconds < self.m_min:
+            self.m_min = seconds
+        if self.m_max is None or seconds > self.m_max:
+            self.m_max = seconds
+
+    def getCount(self):
+        """ Number of samples. """
+        return self.m_count
+
+    def getMean(self):
+        """ Mean duration in seconds, 0 if empty. """
+        if not self.m_count:
+            return 0.0
+        return self.m_sum / self.m_count
+
+    def getPercentile(self, pct):
+        """ Approximate percentile.
+
+        Args:
+            pct (float): Percentile, 0 to 100.
+
+        Returns:
+            float: Duration in seconds, 0 if empty.
+        """
+        if not self.m_count:
+            return 0.0
+        target = max(1, int(math.ceil(self.m_count * pct / 100.0)))
+        running = 0
+        for idx, count in enumerate(self.m_counts):
+            running += count
+            if running >= target:
+                if idx == self.m_buckets - 1:
+                    return self.m_max
+                edge = self.m_floor * math.exp(idx / self.m_scale)
+                return min(max(edge, self.m_min), self.m_max)
+        return self.m_max
+
+    def getSummary(self):
+        """ Count, mean, min, max, p50, p90 and p99, times in seconds.
+
+        Returns:
+            dict: Summary keyed by statistic name.
+        """
+        return {"count": self.m_count,
+                "mean": self.getMean(),
+                "min": self.m_min if self.m_min is not None else 0.0,
+                "max": self.m_max if self.m_max is not None else 0.0,
+                "p50": self.getPercentile(50),
+                "p90": self.getPercentile(90),
+                "p99": self.getPercentile(99)}
+
+
+class LatencyStats(object):
+    """ One :class:`~ekmmeters.LatencyHistogram` per stage for a meter or port.
+
+    Stages are :class:`~ekmmeters.LatencyStage` values, or the context name of a
+    settings command such as "setCTRatio".
+    """
+
+    def __init__(self, name, callback=None):
+        """
+        Args:
+            name (str): Meter address or port name, passed to callback.
+            callback (function): Optional, called as callback(name, stage, seconds) per sample.
+        """
+        self.m_name = name
+        self.m_callback = callback
+        self.m_stages = OrderedDict()
+        self.m_lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        """ Add one stage duration.
+
+        Args:
+            stage (str): Stage name.
+            seconds (float): Duration.
+        """
+        with self.m_lock:
+            histogram = self.m_stages.get(stage)
+            if histogram is None:
+                histogram = self.m_stages[stage] = LatencyHistogram()
+            histogram.add(seconds)
+        if self.m_callback:
+            try:
+                self.m_callback(self.m_name, stage, seconds)
+            except:
+                ekm_log(traceback.format_exc())
+
+    def lap(self, stage, start):
+        """ Record time since start and return now, for chained stages.
+
+        Args:
+            stage (str): Stage name.
+            start (float): time.perf_counter() at stage start.
+
+        Returns:
+            float: time.perf_counter() at stage end.
+        """
+        now = time.perf_counter()
+        self.record(stage, now - start)
+        return now
+
+    def getHistogram(self, stage):
+        """ Histogram for one stage, None if no samples. """
+        return self.m_stages.get(stage)
+
+    def getStats(self):
+        """ Summary of every recorded stage.
+
+        Returns:
+            OrderedDict: Stage name to :func:`~ekmmeters.LatencyHistogram.getSummary` dict.
+        """
+        with self.m_lock:
+            return OrderedDict((stage, histogram.getSummary()) for stage, histogram in self.m_stages.items())
+
+    def reset(self):
+        """ Discard all samples. """
+        with self.m_lock:
+            self.m_stages.clear()
+
+
+class MetricsRegistry(object):
+    """ In process counters, gauges and histograms with one label each.
+
+    Updates take a short lock and a dict update, so they are safe from several
+    port polling threads and cheap enough for every read.  render() produces the
+    Prometheus text exposition format, served by :class:`~ekmmeters.MetricsServer`.
+    The library metrics in :class:`~ekmmeters.Metric` are declared on construction.
+    """
+
+    m_default_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self):
+        self.m_lock = threading.Lock()
+        self.m_metrics = OrderedDict()
+        self.describe(Metric.ReadsAttempted, "Meter reads started.")
+        self.describe(Metric.ReadsSucceeded, "Meter reads with good CRC and address.")
+        self.describe(Metric.CrcFailures, "Blocks received with a bad CRC.")
+        self.describe(Metric.LengthErrors, "Blocks received with the wrong length.")
+        self.describe(Metric.ResponseTimeouts, "Response polls which timed out.", label="port")
+        self.describe(Metric.BCacheHits, "V4 reads completed with a cached B block.")
+        self.describe(Metric.Retries, "Reads and commands retried by the retry policy.")
+        self.describe(Metric.CircuitSkips, "Requests refused by an open circuit breaker.")
+        self.describe(Metric.DbInsertSeconds, "MeterDB.dbInsert() duration in seconds.",
+                      MetricType.Histogram)
+        self.describe(Metric.SpoolPending, "Reads waiting in the spool.", MetricType.Gauge, label="spool")
+        self.describe(Metric.SpoolBytes, "Spool segment bytes on disk.", MetricType.Gauge, label="spool")
+        self.describe(Metric.SpoolDrained, "Spooled reads stored in the database.", label="spool")
+        self.describe(Metric.SpoolDropped, "Spooled reads dropped to stay under max_bytes.", label="spool")
+        self.describe(Metric.SpoolFailures, "Spool drain batches the database refused.", label="spool")
+        self.describe(Metric.SpoolDeadLetters, "Spooled reads moved to the dead letter file.", label="spool")
+
+    def describe(self, name, help_str, metric_type=MetricType.Counter, label="meter", buckets=None):
+        """ Declare a metric.  Undeclared names used in inc() are declared as counters.
+
+        Args:
+            name (str): Metric name.
+            help_str (str): HELP text.
+            metric_type (str): A :class:`~ekmmeters.MetricType` value.
+            label (str): Label name for the single label value passed on update.
+            buckets (tuple): Histogram upper bounds in ascending order.
+        """
+        with self.m_lock:
+            self.m_metrics[name] = [metric_type, help_str, label,
+                                    tuple(buckets or self.m_default_buckets), {}]
+
+    def inc(self, name, label_value="", amount=1):
+        """ Add to a counter.
+
+        Args:
+            name (str): Metric name.
+            label_value (str): Label value, ex. meter address.
+            amount (float): Increment.
+        """
+        with self.m_lock:
+            metric = self.m_metrics.get(name)
+            if metric is None:
+                metric = self.m_metrics[name] = [MetricType.Counter, "", "meter", (), {}]
+            values = metric[4]
+            values[label_value] = values.get(label_value, 0) + amount
+
+    def setGauge(self, name, value, label_value=""):
+        """ Set a gauge.
+
+        Args:
+            name (str): Metric name.
+            value (float): Current value.
+            label_value (str): Label value, ex. meter address.
+        """
+        with self.m_lock:
+            metric = self.m_metrics.get(name)
+            if metric is None:
+                metric = self.m_metrics[name] = [MetricType.Gauge, "", "meter", (), {}]
+            metric[4][label_value] = value
+
+    def observe(self, name, value, label_value=""):
+        """ Add a sample to a histogram.
+
+        Args:
+            name (str): Metric name, must be declared with describe().
+            value (float): Sample.
+            label_value (str): Label value, ex. meter address.
+        """
+        with self.m_lock:
+            metric = self.m_metrics[name]
+            series = metric[4].get(label_value)
+            if series is None:
+                series = metric[4][label_value] = [[0] * len(metric[3]), 0.0, 0]
+            idx = bisect.bisect_left(metric[3], value)
+            if idx < len(metric[3]):
+                series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def getValue(self, name, label_value=""):
+        """ Current counter or gauge value, or histogram sample count.
+
+        Args:
+            name (str): Metric name.
+            label_value (str): Label value, ex. meter address.
+
+        Returns:
+            float: Value, 0 if never updated.
+        """
+        with self.m_lock:
+            metric = self.m_metrics.get(name)
+            if metric is None or label_value not in metric[4]:
+                return 0
+            if metric[0] == MetricType.Histogram:
+                return metric[4][label_value][2]
+            return metric[4][label_value]
+
+    @staticmethod
+    def escapeLabel(label_value):
+        """ Escape a label value for the exposition format. """
+        return str(label_value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+    def render(self):
+        """ All metrics in Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text.
+        """
+        lines = []
+        with self.m_lock:
+            for name, metric in self.m_metrics.items():
+                metric_type, help_str, label, buckets, values = metric
+                if help_str:
+                    lines.append("# HELP " + name + " " + help_str)
+                lines.append("# TYPE " + name + " " + metric_type)
+                for label_value in sorted(values):
+                    if label_value:
+                        label_str = label + '="' + self.escapeLabel(label_value) + '"'
+                    else:
+                        label_str = ""
+                    if metric_type != MetricType.Histogram:
+                        lines.append(name + ("{" + label_str + "}" if label_str else "") +
+                                     " " + repr(float(values[label_value])))
+                        continue
+                    counts, total, count = values[label_value]
+                    prefix = label_str + "," if label_str else ""
+                    running = 0
+                    for bound, bucket_count in zip(buckets, counts):
+                        running += bucket_count
+                        lines.append(name + '_bucket{' + prefix + 'le="' + repr(float(bound)) + '"} ' + str(running))
+                    lines.append(name + '_bucket{' + prefix + 'le="+Inf"} ' + str(count))
+                    lines.append(name + "_sum" + ("{" + label_str + "}" if label_str else "") + " " + repr(total))
+                    lines.append(name + "_count" + ("{" + label_str + "}" if label_str else "") + " " + str(count))
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer(object):
+    """ Minimal HTTP endpoint serving a :class:`~ekmmeters.MetricsRegistry` on a daemon thread.
+
+    Any GET returns the exposition text, so it can be scraped at /metrics.
+    """
+
+    def __init__(self, registry=None, port=9108, host="127.0.0.1"):
+        """
+        Args:
+            registry (MetricsRegistry): Registry to serve, defaults to the one set with ekm_set_metrics().
+            port (int): TCP port, 0 to pick a free port.
+            host (str): Bind address, loopback by default.
+        """
+        self.m_registry = registry
+        self.m_port = port
+        self.m_host = host
+        self.m_server = None
+        self.m_thread = None
+
+    def start(self):
+        """ Bind and start serving.
+
+        Returns:
+            bool: True if listening.
+        """
+        try:
+            from http.server import HTTPServer, BaseHTTPRequestHandler
+            metrics_server = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    registry = metrics_server.m_registry or ekmmeters_metrics
+                    body = (registry.render() if registry else "").encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    ekm_log("MetricsServer " + format, *args, priority=4)
+
+            self.m_server = HTTPServer((self.m_host, self.m_port), MetricsHandler)
+            self.m_port = self.m_server.server_address[1]
+            self.m_thread = threading.Thread(target=self.m_server.serve_forever,
+                                             name="ekm-metrics-" + str(self.m_port))
+            self.m_thread.daemon = True
+            self.m_thread.start()
+            return True
+        except:
+            ekm_log(traceback.format_exc())
+        return False
+
+    def stop(self):
+        """ Stop serving and close the socket. """
+        if self.m_server:
+            self.m_server.shutdown()
+            self.m_server.server_close()
+            self.m_server = None
+
+    def getPort(self):
+        """ Listening TCP port. """
+        return self.m_port
+
+
+class AdaptiveTiming(object):
+    """ Response times and pacing learned per meter and command by a :class:`~ekmmeters.SerialPort`.
+
+    Keys are (meter address, command) where command is the read type ("00",
+    "01" or "v3"), "P" for the password or "W"/"R" plus the settings register.
+    Commands carry no address, so they are keyed to the last address read.
+
+    Times are measured from the end of the write, so they never include the
+    post write sleep.  The response deadline for a key is the p99 of its
+    recent complete response times, times factor, plus margin, kept between
+    min_timeout and the port's fixed max_waits * wait_sleep.  The post write
+    wait, before polling starts, is the fastest recent time to first byte,
+    at most force_wait.  Until min_samples responses are seen there is no
+    post write wait, polling starts at once so the first byte is timed.  The turnaround before
+    the next write to a meter halves toward force_wait after a timeout and
+    shrinks by a tenth toward min_turnaround after each good response.
+    Turnaround is tracked per meter address, not per bus: a write to one
+    meter waits out that meter's own turnaround only, so a slow meter does
+    not hold back the others on the same port.
+    """
+
+    def __init__(self, factor=1.5, margin=0.05, min_samples=5, window=64,
+                 min_timeout=0.1, min_turnaround=0.02):
+        """
+        Args:
+            factor (float): Multiplier on p99 response time.
+            margin (float): Seconds added to the scaled p99.
+            min_samples (int): Responses required before a key is adapted.
+            window (int): Recent response times kept per key.
+            min_timeout (float): Shortest allowed deadline in seconds.
+            min_turnaround (float): Shortest allowed gap before the next write to a meter.
+        """
+        self.m_factor = factor
+        self.m_margin = margin
+        self.m_min_samples = min_samples
+        self.m_window = window
+        self.m_min_timeout = min_timeout
+        self.m_min_turnaround = min_turnaround
+        self.m_samples = {}
+        self.m_first_bytes = {}
+        self.m_timeouts = {}
+        self.m_turnaround = {}
+        self.m_last_address = ""
+
+    def keyFor(self, output):
+        """ (address, command) for an outgoing frame, None if no reply is expected.
+
+        Args:
+            output (str): Block written to the port.
+        """
+        if output.startswith("/?"):
+            self.m_last_address = output[2:14]
+            if output[14:15] == "!":
+                return (self.m_last_address, "v3")
+            return (self.m_last_address, output[14:16])
+        if output.startswith("\x01"):
+            command = output[1:2]
+            if command == "P":
+                return (self.m_last_address, command)
+            if command in ("W", "R"):
+                return (self.m_last_address, command + output[4:8])
+        return None
+
+    def addResponse(self, key, seconds, first_byte=None):
+        """ Record a good response time for key.
+
+        Args:
+            key (tuple): From keyFor().
+            seconds (float): Write to complete response.
+            first_byte (float): Write to first byte of the response, defaults to seconds.
+        """
+        samples = self.m_samples.get(key)
+        if samples is None:
+            samples = self.m_samples[key] = deque(maxlen=self.m_window)
+            self.m_first_bytes[key] = deque(maxlen=self.m_window)
+        samples.append(seconds)
+        self.m_first_bytes[key].append(seconds if first_byte is None else first_byte)
+        address = key[0]
+        turnaround = self.m_turnaround.get(address)
+        if turnaround is not None:
+            self.m_turnaround[address] = max(self.m_min_turnaround, turnaround * 0.9)
+
+    def addTimeout(self, key, force_wait):
+        """ Record a timeout for key and back off that meter's turnaround. """
+        self.m_timeouts[key] = self.m_timeouts.get(key, 0) + 1
+        address = key[0]
+        turnaround = self.m_turnaround.get(address, force_wait)
+        self.m_turnaround[address] = min(max(force_wait, self.m_min_turnaround),
+                                         turnaround + (force_wait - turnaround) / 2.0)
+
+    def getDeadline(self, key, default):
+        """ Seconds to wait for a response to key.
+
+        Args:
+            key (tuple): From keyFor().
+            default (float): Fixed port timeout, also the upper bound.
+        """
+        samples = self.m_samples.get(key)
+        if key is None or samples is None or len(samples) < self.m_min_samples:
+            return default
+        ordered = sorted(samples)
+        p99 = ordered[min(len(ordered) - 1, int(math.ceil(len(ordered) * 0.99)) - 1)]
+        return min(default, max(self.m_min_timeout, p99 * self.m_factor + self.m_margin))
+
+    def getPostWriteWait(self, key, force_wait):
+        """ Seconds to sleep after a write before polling starts, 0 while learning. """
+        samples = self.m_first_bytes.get(key)
+        if key is None:
+            return force_wait
+        if samples is None or len(samples) < self.m_min_samples:
+            return 0.0
+        return min(force_wait, min(samples))
+
+    def getTurnaround(self, address, force_wait):
+        """ Seconds required between a response from address and the next write. """
+        return self.m_turnaround.setdefault(address, force_wait)
+
+    def getStats(self):
+        """ Per key count, timeouts, fastest first byte, p50, p99 and turnaround, seconds.
+
+        Returns:
+            dict: (address, command) to statistics dict.
+        """
+        stats = {}
+        for key in set(self.m_samples) | set(self.m_timeouts):
+            ordered = sorted(self.m_samples.get(key, ()))
+            first_bytes = self.m_first_bytes.get(key, ())
+            stats[key] = {"count": len(ordered),
+                          "first_byte": min(first_bytes) if first_bytes else 0.0,
+                          "timeouts": self.m_timeouts.get(key, 0),
+                          "p50": ordered[len(ordered) // 2] if ordered else 0.0,
+                          "p99": ordered[min(len(ordered) - 1, int(math.ceil(len(ordered) * 0.99)) - 1)]
+                          if ordered else 0.0,
+                          "turnaround": self.m_turnaround.get(key[0], 0.0)}
+        return stats
+
+
+class RetryPolicy(object):
+    """ When and how soon a :class:`~ekmmeters.Meter` retries a failed read or command.
+
+    The backoff schedule is the sleep before each retry, the last entry
+    repeating.  It may also be a dict of :class:`~ekmmeters.ReadError` to
+    schedule, with key None as the default, so a CRC or length error from
+    line noise can be retried at once while a timeout waits for the bus.
+    Jitter adds up to that fraction of the delay at random.
+    """
+
+    def __init__(self, max_attempts=3, backoff=(0.0, 0.25, 1.0), jitter=0.0,
+                 retry_on=(ReadError.Timeout, ReadError.Length, ReadError.Crc)):
+        """
+        Args:
+            max_attempts (int): Total tries per read or command, 1 for no retry.
+            backoff (tuple or dict): Seconds before retry 1, 2, ...
+            jitter (float): Random extra delay as a fraction of the delay.
+            retry_on (tuple): :class:`~ekmmeters.ReadError` values worth retrying.
+        """
+        self.m_max_attempts = max(1, int(max_attempts))
+        self.m_backoff = backoff
+        self.m_jitter = jitter
+        self.m_retry_on = frozenset(retry_on)
+
+    def getMaxAttempts(self):
+        """ Total tries per read or command. """
+        return self.m_max_attempts
+
+    def shouldRetry(self, error, attempt):
+        """ True if a failure on try number attempt should be retried.
+
+        Args:
+            error (str): :class:`~ekmmeters.ReadError` value.
+            attempt (int): Tries made so far, from 1.
+        """
+        return attempt < self.m_max_attempts and error in self.m_retry_on
+
+    def getDelay(self, error, attempt):
+        """ Seconds to sleep before the try following attempt.
+
+        Args:
+            error (str): :class:`~ekmmeters.ReadError` value.
+            attempt (int): Tries made so far, from 1.
+        """
+        schedule = self.m_backoff
+        if isinstance(schedule, dict):
+            schedule = schedule.get(error, schedule.get(None, (0.0,)))
+        if not schedule:
+            return 0.0
+        delay = schedule[min(attempt, len(schedule)) - 1]
+        if self.m_jitter and delay > 0:
+            delay += random.uniform(0, delay * self.m_jitter)
+        return delay
+
+
+class CircuitBreaker(object):
+    """ Per meter circuit breaker held by a :class:`~ekmmeters.SerialPort`.
+
+    After failure_threshold consecutive failed reads or commands a meter's
+    circuit opens, and requests to it fail at once with ReadError.Circuit
+    rather than waiting out a timeout on a shared bus.  After reset_timeout
+    seconds one trial request is let through: success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures which open a circuit.
+            reset_timeout (float): Seconds open before a trial request.
+        """
+        self.m_failure_threshold = max(1, int(failure_threshold))
+        self.m_reset_timeout = reset_timeout
+        self.m_failures = {}
+        self.m_opened = {}
+        self.m_lock = threading.Lock()
+
+    def allow(self, address):
+        """ True if a request to address may be sent.
+
+        Args:
+            address (str): 12 character meter address.
+        """
+        with self.m_lock:
+            opened = self.m_opened.get(address)
+            if opened is None:
+                return True
+            if time.time() - opened >= self.m_reset_timeout:
+                # half open, one trial until recordSuccess() or recordFailure()
+                self.m_opened[address] = time.time()
+                return True
+            return False
+
+    def recordSuccess(self, address):
+        """ Close the circuit for address. """
+        with self.m_lock:
+            self.m_failures.pop(address, None)
+            self.m_opened.pop(address, None)
+
+    def recordFailure(self, address):
+        """ Count a failure for address, opening its circuit at the threshold. """
+        with self.m_lock:
+            failures = self.m_failures.get(address, 0) + 1
+            self.m_failures[address] = failures
+            if failures >= self.m_failure_threshold or address in self.m_opened:
+                if address not in self.m_opened:
+                    ekm_log("Circuit open for meter %s after %d failures", address, failures)
+                self.m_opened[address] = time.time()
+
+    def getState(self, address):
+        """ :class:`~ekmmeters.CircuitState` for address. """
+        with self.m_lock:
+            opened = self.m_opened.get(address)
+            if opened is None:
+                return CircuitState.Closed
+            if time.time() - opened >= self.m_reset_timeout:
+                return CircuitState.HalfOpen
+            return CircuitState.Open
+
+    def reset(self, address=None):
+        """ Close the circuit for address, or for every meter if None. """
+        with self.m_lock:
+            if address is None:
+                self.m_failures = {}
+                self.m_opened = {}
+            else:
+                self.m_failures.pop(address, None)
+                self.m_opened.pop(address, None)
+
+
+class SerialPort(object):
+    """ Wrapper for serial port commands.
+
+    It should only be necessary to create one SerialPort per real port.
+
+    Object construction sets the class variables.  The port is opened with
+    initPort(), and any serial exceptions will thrown at that point.
+
+    The standard serial settings for v3 and v4 EKM meters are 9600 baud,
+    7 bits, 1 stop bit, no parity.  The baud rate may be reset but all timings
+    and test in this library are at 9600 baud.  Bits, stop and parity may not
+    be changed.
+    """
+
+    def __init__(self, ttyport, baudrate=9600, force_wait=0.2):
+        """
+        Args:
+            ttyport (str): port name, ex 'COM3' '/dev/ttyUSB0'
+            baudrate (int): optional, 9600 default and recommended
+            force_wait(float) : optional post commnd sleep, if required
+        """
+        self.m_ttyport = ttyport
+        self.m_baudrate = baudrate
+        self.m_ser = None
+        self.m_fd = None
+        self.m_max_waits = 100
+        self.m_wait_sleep = 0.02
+        self.m_force_wait = force_wait
+        self.m_init_wait = 0.1
+        self.m_latency = None
+        self.m_adaptive = None
+        self.m_pending_key = None
+        self.m_write_done = 0.0
+        self.m_response_done = {}
+        self.m_breaker = None
+        pass
+
+    def initPort(self):
+        """ Required initialization call, wraps pyserial constructor. """
+        try:
+            self.m_ser = serial.Serial(port=self.m_ttyport,
+                                       baudrate=self.m_baudrate,
+                                       timeout=10,
+                                       parity=serial.PARITY_EVEN,
+                                       stopbits=serial.STOPBITS_ONE,
+                                       bytesize=serial.SEVENBITS,
+                                       rtscts=False)
+            ekm_log("Pyserial version = " + serial.VERSION)
+            ekm_log("Port = " + self.m_ttyport)
+            ekm_log("Rate = " + str(self.m_baudrate))
+            time.sleep(self.m_init_wait)
+            return True
+        except:
+            ekm_log(traceback.format_exc())
+
+        return False
+
+    def getName(self):
+        """ Getter for serial port name
+
+        Returns:
+            string: name of serial port (ex: 'COM3', '/dev/ttyS0')
+        """
+        return self.m_ttyport
+
+    def closePort(self):
+        """ Passthrough for pyserial port close()."""
+        self.m_ser.close()
+        pass
+
+    def enableLatencyStats(self, callback=None):
+        """ Record write and response times for every meter on this port.
+
+        Args:
+            callback (function): Optional, called as callback(port_name, stage, seconds).
+
+        Returns:
+            LatencyStats: Stats object, also returned by getLatencyStats().
+        """
+        self.m_latency = LatencyStats(self.m_ttyport, callback)
+        return self.m_latency
+
+    def disableLatencyStats(self):
+        """ Stop recording port latency. """
+        self.m_latency = None
+
+    def getLatencyStats(self):
+        """ Port :class:`~ekmmeters.LatencyStats`, None if not enabled. """
+        return self.m_latency
+
+    def write(self, output):
+        """Passthrough for pyserial Serial.write().
+
+        Args:
+            output (str): Block to write to port
+        """
+        view_str = output.encode('ascii', 'ignore')
+        if (len(view_str) > 0):
+            latency = self.m_latency
+            if latency:
+                start = time.perf_counter()
+            adaptive = self.m_adaptive
+            if adaptive:
+                key = adaptive.keyFor(output)
+                self.m_pending_key = key
+                if key is not None:
+                    turnaround = adaptive.getTurnaround(key[0], self.m_force_wait)
+                    remaining = turnaround - (time.time() - self.m_response_done.get(key[0], 0.0))
+                    if remaining > 0:
+                        time.sleep(remaining)
+                post_write_wait = adaptive.getPostWriteWait(key, self.m_force_wait)
+            else:
+                post_write_wait = self.m_force_wait
+            self.m_ser.write(view_str)
+            self.m_ser.flush()
+            self.m_ser.reset_input_buffer()
+            self.m_write_done = time.time()
+            time.sleep(post_write_wait)
+            if latency:
+                latency.lap(LatencyStage.Write, start)
+        pass
+
+    def setAdaptiveTiming(self, enabled=True, **kwargs):
+        """ Learn response deadlines and pacing per meter and command.
+
+        With adaptive timing, the fixed force_wait sleeps and the max_waits
+        timeout become upper bounds, and meters which answer quickly are
+        polled sooner and given up on sooner.  See :class:`~ekmmeters.AdaptiveTiming`.
+
+        Args:
+            enabled (bool): False restores fixed timing.
+            **kwargs: Passed to :class:`~ekmmeters.AdaptiveTiming`.
+
+        Returns:
+            AdaptiveTiming: Learned state, None if disabled.
+        """
+        self.m_adaptive = AdaptiveTiming(**kwargs) if enabled else None
+        self.m_pending_key = None
+        self.m_response_done = {}
+        return self.m_adaptive
+
+    def getAdaptiveTiming(self):
+        """ :class:`~ekmmeters.AdaptiveTiming` in use, None if timing is fixed. """
+        return self.m_adaptive
+
+    def setCircuitBreaker(self, breaker=None):
+        """ Skip meters on this port which keep failing, see :class:`~ekmmeters.CircuitBreaker`.
+
+        Args:
+            breaker (CircuitBreaker): Breaker to use, None for a default breaker.
+
+        Returns:
+            CircuitBreaker: Breaker in use, also returned by getCircuitBreaker().
+        """
+        self.m_breaker = breaker if breaker is not None else CircuitBreaker()
+        return self.m_breaker
+
+    def clearCircuitBreaker(self):
+        """ Stop skipping failed meters on this port. """
+        self.m_breaker = None
+
+    def getCircuitBreaker(self):
+        """ :class:`~ekmmeters.CircuitBreaker` in use, None if not set. """
+        return self.m_breaker
+
+    def setPollingValues(self, max_waits, wait_sleep):
+        """ Optional polling loop control
+
+        Args:
+            max_waits (int):   waits
+            wait_sleep (int):  ms per wait
+        """
+        self.m_max_waits = max_waits
+        self.m_wait_sleep = wait_sleep
+
+    def getResponse(self, context=""):
+        """ Poll for finished block or first byte ACK.
+        Args:
+            context (str): internal serial call context.
+
+        Returns:
+            string: Response, implict cast from byte array.
+        """
+        waits = 0  # allowed interval counter
+        response_str = ""  # returned bytes in string default
+        latency = self.m_latency
+        if latency:
+            start = time.perf_counter()
+        adaptive = self.m_adaptive
+        max_waits = self.m_max_waits
+        if adaptive:
+            key = self.m_pending_key
+            self.m_pending_key = None
+            if key is not None:
+                deadline = adaptive.getDeadline(key, self.m_max_waits * self.m_wait_sleep)
+                remaining = deadline - (time.time() - self.m_write_done)
+                max_waits = max(1, int(math.ceil(remaining / self.m_wait_sleep)))
+        first_byte = None
+        try:
+            waits = 0  # allowed interval counter
+            while (waits < max_waits):
+                bytes_to_read = self.m_ser.inWaiting()
+                if bytes_to_read > 0:
+                    if first_byte is None:
+                        first_byte = time.time() - self.m_write_done
+                    next_chunk = codecs.decode(self.m_ser.read(bytes_to_read), "ascii")
+                    response_str += next_chunk
+                    if (len(response_str) == 255) or \
+                            ((len(response_str) == 1) and (str2hex(response_str) == '06')):
+                        if adaptive:
+                            self.adaptiveResponse(key, True, first_byte)
+                        else:
+                            time.sleep(self.m_force_wait)
+                        if latency:
+                            latency.lap(LatencyStage.Response, start)
+                        return response_str
+                else:  # hang out -- half shortest expected interval (50 ms)
+                    waits += 1
+                    time.sleep(self.m_wait_sleep)
+            response_str = ""
+            if adaptive:
+                self.adaptiveResponse(key, False)
+            if ekmmeters_metrics:
+                ekmmeters_metrics.inc(Metric.ResponseTimeouts, self.m_ttyport)
+
+        except:
+            ekm_log(traceback.format_exc())
+
+        if latency:
+            latency.lap(LatencyStage.Response, start)
+        return response_str
+
+    def adaptiveResponse(self, key, success, first_byte=None):
+        """ Feed one response or timeout to adaptive timing.  Private.
+
+        Args:
+            key (tuple): (address, command) of the request, or None.
+            success (bool): False on timeout.
+            first_byte (float): Seconds from end of write to the first byte.
+        """
+        if key is None:
+            return
+        now = time.time()
+        self.m_response_done[key[0]] = now
+        if success:
+            self.m_adaptive.addResponse(key, now - self.m_write_done, first_byte)
+        else:
+            self.m_adaptive.addTimeout(key, self.m_force_wait)
+
+
+class RecordingSerialPort(SerialPort):
+    """ :class:`~ekmmeters.SerialPort` which also writes every exchange to a capture file.
+
+    Each record is a little endian header of seconds since the capture
+    started (double), a :class:`~ekmmeters.CaptureKind` (byte) and the
+    payload length (uint32), then the payload bytes.  The file starts with
+    a magic string and the capture start time, and is flushed after each
+    response, so a capture survives a killed collector.
+    """
+
+    m_magic = b"EKMCAP01"
+    m_file_header = struct.Struct("<8sd")
+    m_record_header = struct.Struct("<dBI")
+
+    def __init__(self, ttyport, capture_path, baudrate=9600, force_wait=0.2):
+        """
+        Args:
+            ttyport (str): port name, ex 'COM3' '/dev/ttyUSB0'
+            capture_path (str): Capture file to create, overwritten if present.
+            baudrate (int): optional, 9600 default and recommended
+            force_wait(float) : optional post commnd sleep, if required
+        """
+        super(RecordingSerialPort, self).__init__(ttyport, baudrate, force_wait)
+        self.m_capture_path = capture_path
+        self.m_capture = None
+        self.m_capture_start = 0.0
+
+    def initPort(self):
+        """ Open the port, then create the capture file. """
+        if not super(RecordingSerialPort, self).initPort():
+            return False
+        try:
+            self.m_capture_start = time.time()
+            self.m_capture = open(self.m_capture_path, "wb")
+            self.m_capture.write(self.m_file_header.pack(self.m_magic, self.m_capture_start))
+            return True
+        except:
+            ekm_log(traceback.format_exc())
+        return False
+
+    def closePort(self):
+        """ Close the port and the capture file. """
+        super(RecordingSerialPort, self).closePort()
+        if self.m_capture:
+            self.m_capture.close()
+            self.m_capture = None
+
+    def record(self, kind, payload):
+        """ Append one record.  Private.
+
+        Args:
+            kind (int): A :class:`~ekmmeters.CaptureKind` value.
+            payload (str): Implicit byte string written or received.
+        """
+        if not self.m_capture:
+            return
+        data = codecs.encode(payload, "latin-1")
+        self.m_capture.write(self.m_record_header.pack(time.time() - self.m_capture_start, kind, len(data)))
+        self.m_capture.write(data)
+
+    def write(self, output):
+        """ Record, then pass through to :func:`~ekmmeters.SerialPort.write`.
+
+        Args:
+            output (str): Block to write to port
+        """
+        self.record(CaptureKind.Write, output)
+        super(RecordingSerialPort, self).write(output)
+
+    def getResponse(self, context=""):
+        """ Pass through to :func:`~ekmmeters.SerialPort.getResponse`, then record.
+
+        Args:
+            context (str): internal serial call context.
+
+        Returns:
+            string: Response, implict cast from byte array.
+        """
+        response_str = super(RecordingSerialPort, self).getResponse(context)
+        self.record(CaptureKind.Response, response_str)
+        if self.m_capture:
+            self.m_capture.flush()
+        return response_str
+
+    @staticmethod
+    def readCapture(capture_path):
+        """ Load a capture file.
+
+        Args:
+            capture_path (str): File written by a RecordingSerialPort.
+
+        Returns:
+            tuple: Capture start epoch seconds, and a list of
+            (seconds since start, :class:`~ekmmeters.CaptureKind`, payload) tuples.
+        """
+        file_header = RecordingSerialPort.m_file_header
+        record_header = RecordingSerialPort.m_record_header
+        records = []
+        with open(capture_path, "rb") as capture:
+            data = capture.read()
+        magic, start = file_header.unpack_from(data, 0)
+        if magic != RecordingSerialPort.m_magic:
+            raise ValueError("Not an ekmmeters capture: " + capture_path)
+        offset = file_header.size
+        while offset + record_header.size <= len(data):
+            seconds, kind, length = record_header.unpack_from(data, offset)
+            offset += record_header.size
+            if offset + length > len(data):
+                break
+            records.append((seconds, kind, codecs.decode(data[offset:offset + length], "latin-1")))
+            offset += length
+        return start, records
+
+
+class ReplaySerialPort(SerialPort):
+    """ :class:`~ekmmeters.SerialPort` answering from a :class:`~ekmmeters.RecordingSerialPort` capture.
+
+    Each write advances to the next recorded write with the same bytes, and
+    the following getResponse() returns the recorded response after the
+    recorded delay divided by speed.  A speed of 0 replays without any delay.
+    Writes not found in the capture are counted and logged, and consume the
+    next recorded write, so replay continues.
+    """
+
+    def __init__(self, capture_path, speed=1.0, loop=False):
+        """
+        Args:
+            capture_path (str): File written by a RecordingSerialPort.
+            speed (float): Replay rate, 1.0 is real time, 100.0 is 100x, 0 is no delay.
+            loop (bool): Restart at the first record when the capture is exhausted.
+        """
+        super(ReplaySerialPort, self).__init__(capture_path, force_wait=0)
+        self.m_capture_path = capture_path
+        self.m_speed = speed
+        self.m_loop = loop
+        self.m_records = []
+        self.m_position = 0
+        self.m_write_time = 0.0
+        self.m_write_host_time = 0.0
+        self.m_mismatches = 0
+
+    def initPort(self):
+        """ Load the capture. """
+        try:
+            start, self.m_records = RecordingSerialPort.readCapture(self.m_capture_path)
+            self.m_position = 0
+            return True
+        except:
+            ekm_log(traceback.format_exc())
+        return False
+
+    def closePort(self):
+        """ No op. """
+        pass
+
+    def nextRecord(self, kind):
+        """ Advance to and return the next record of kind, None at end of capture.  Private. """
+        for attempt in range(2):
+            while self.m_position < len(self.m_records):
+                record = self.m_records[self.m_position]
+                self.m_position += 1
+                if record[1] == kind:
+                    return record
+            if not self.m_loop or not self.m_records:
+                return None
+            self.m_position = 0
+        return None
+
+    def write(self, output):
+        """ Match output to the next recorded write.
+
+        Args:
+            output (str): Block to write to port
+        """
+        self.m_write_host_time = time.time()
+        record = self.findWrite(output)
+        if record is None:
+            self.m_mismatches += 1
+            ekm_log("Replay write not found in capture after record %d", self.m_position)
+            record = self.nextRecord(CaptureKind.Write)
+        if record is not None:
+            self.m_write_time = record[0]
+
+    def findWrite(self, output):
+        """ Advance to the next recorded write equal to output, None if there is none.  Private. """
+        count = len(self.m_records)
+        for step in range(count):
+            idx = self.m_position + step
+            if idx >= count:
+                if not self.m_loop:
+                    return None
+                idx -= count
+            record = self.m_records[idx]
+            if record[1] == CaptureKind.Write and record[2] == output:
+                self.m_position = idx + 1
+                return record
+        return None
+
+    def getResponse(self, context=""):
+        """ Next recorded response, after the recorded delay scaled by speed.
+
+        Args:
+            context (str): internal serial call context.
+
+        Returns:
+            string: Recorded response, empty at end of capture.
+        """
+        record = self.nextRecord(CaptureKind.Response)
+        if record is None:
+            return ""
+        if self.m_speed > 0:
+            wait = (record[0] - self.m_write_time) / self.m_speed
+            wait -= time.time() - self.m_write_host_time
+            if wait > 0:
+                time.sleep(wait)
+        return record[2]
+
+    def getMismatches(self):
+        """ Count of writes which differed from the capture. """
+        return self.m_mismatches
+
+    def rewind(self):
+        """ Restart replay at the first record. """
+        self.m_position = 0
+
+
+class BatchDecoder(object):
+    """ Decode many stored raw reads of one block layout at once with numpy.
+
+    The fixed field offsets of a :class:`~ekmmeters.SerialBlock` layout
+    are applied to an (N, 255) uint8 array, so every field of every read is
+    parsed and scaled with a few array operations instead of unpackStruct()
+    and convertData() per read.  Calculated fields are not produced.
+
+    numpy is imported when a decoder is created and is not otherwise
+    required by ekmmeters.
+    """
+    m_layouts = {}
+
+    def __init__(self, def_buf):
+        """
+        Args:
+            def_buf (SerialBlock): Block layout, ex. V4Meter().m_blk_a.
+        """
+        import numpy
+        self.m_np = numpy
+        self.m_fields = []
+        self.m_scale_offset = None
+        offset = 0
+        for fld in def_buf:
+            if def_buf[fld][MeterData.CalculatedFlag]:
+                continue
+            size = def_buf[fld][MeterData.SizeValue]
+            compare_fld = fld.upper()
+            if not "RESERVED" in compare_fld and not "CRC" in compare_fld:
+                self.m_fields.append((fld, offset, size,
+                                      def_buf[fld][MeterData.TypeValue],
+                                      def_buf[fld][MeterData.ScaleValue]))
+            if fld == Field.kWh_Scale:
+                self.m_scale_offset = offset
+            offset += size
+        self.m_crc_table = numpy.array(ekm_crc16_table, dtype=numpy.uint32)
+        self.m_hex_digits = numpy.frombuffer(b"0123456789abcdef", dtype=numpy.uint8)
+
+    def getFieldNames(self):
+        """ Fields returned by decode(), in block order. """
+        return [fld[0] for fld in self.m_fields]
+
+    def toArray(self, frames):
+        """ Stack raw reads into one array.
+
+        Args:
+            frames (list): Raw 255 character reads, as str or bytes.
+
+        Returns:
+            tuple: (N, 255) uint8 array and a bool array, False for reads of the
+            wrong length, which are left as zeros.
+        """
+        np = self.m_np
+        raw = [frame.encode("latin-1") if isinstance(frame, str) else bytes(frame) for frame in frames]
+        length_ok = np.array([len(frame) == 255 for frame in raw], dtype=bool)
+        if length_ok.all():
+            rows = np.frombuffer(b"".join(raw), dtype=np.uint8).reshape(len(raw), 255)
+        else:
+            rows = np.zeros((len(raw), 255), dtype=np.uint8)
+            good = np.flatnonzero(length_ok)
+            if len(good):
+                rows[good] = np.frombuffer(b"".join([raw[idx] for idx in good]),
+                                           dtype=np.uint8).reshape(len(good), 255)
+        return rows, length_ok
+
+    def fromHex(self, hex_frames):
+        """ Stack hex strings from the Raw_A or Raw_B database columns.
+
+        Args:
+            hex_frames (list): Hex strings, empty or None for a missing read.
+
+        Returns:
+            tuple: As :func:`~ekmmeters.BatchDecoder.toArray`.
+        """
+        raw = []
+        for hex_frame in hex_frames:
+            try:
+                raw.append(bytes.fromhex(hex_frame or ""))
+            except ValueError:
+                raw.append(b"")
+        return self.toArray(raw)
+
+    def crcOk(self, rows):
+        """ EKM CRC-16 check of every read, one array step per byte position.
+
+        Args:
+            rows (numpy.ndarray): (N, 255) uint8 reads.
+
+        Returns:
+            numpy.ndarray: True where the CRC matches.
+        """
+        np = self.m_np
+        table = self.m_crc_table
+        crc = np.full(len(rows), 0xffff, dtype=np.uint32)
+        for pos in range(1, 253):
+            crc = (crc >> 8) ^ table[(crc ^ rows[:, pos]) & 0xff]
+        crc = ((crc << 8) | (crc >> 8)) & 0x7F7F
+        return crc == ((rows[:, 253].astype(np.uint32) << 8) | rows[:, 254])
+
+    def parseDigits(self, chunk):
+        """ Parse ASCII digit fields, allowing blanks and a minus sign.
+
+        Args:
+            chunk (numpy.ndarray): (N, size) uint8 field bytes.
+
+        Returns:
+            tuple: int64 values and a bool array, False where a field has no
+            digits or any other character.
+        """
+        np = self.m_np
+        digits = chunk.astype(np.int64) - 48
+        is_digit = (digits >= 0) & (digits <= 9)
+        is_minus = chunk == 45
+        parsed = np.all(is_digit | is_minus | (chunk == 32), axis=1) & np.any(is_digit, axis=1)
+        weights = 10 ** np.arange(chunk.shape[1] - 1, -1, -1, dtype=np.int64)
+        values = np.where(is_digit, digits, 0).dot(weights)
+        return np.where(is_minus.any(axis=1), -values, values), parsed
+
+    def decode(self, frames, kwh_scale=None, check_crc=True, rows=None):
+        """ Decode raw reads into one column per field.
+
+        Float fields are float64 with the :class:`~ekmmeters.ScaleType` and
+        per read kWh scale applied, and NaN where unparsable.  Int fields are
+        int64.  Hex fields are hex strings and String and PowerFactor fields
+        are str, as in the read buffer StringValue.
+
+        Args:
+            frames (list): Raw reads, see :func:`~ekmmeters.BatchDecoder.toArray`.
+            kwh_scale (int): :class:`~ekmmeters.ScaleKWH` value or per read array.
+                Defaults to the Field.kWh_Scale of each read, if in the layout.
+                V3 reads are always ScaleKWH.Scale10.
+            check_crc (bool): Clear Frame_Ok where the CRC does not match.
+            rows (tuple): Optional toArray() or fromHex() result, in place of frames.
+
+        Returns:
+            OrderedDict: Field name to numpy array, and Frame_Ok, True for reads
+            of the right length and CRC with every numeric field parsed.
+        """
+        np = self.m_np
+        if rows is None:
+            rows = self.toArray(frames)
+        rows, frame_ok = rows
+        frame_ok = frame_ok.copy()
+        if check_crc and len(rows):
+            frame_ok &= self.crcOk(rows)
+
+        if kwh_scale is None:
+            if self.m_scale_offset is not None:
+                kwh_scale = rows[:, self.m_scale_offset].astype(np.int64) - 48
+            else:
+                kwh_scale = ScaleKWH.NoScale
+        kwh_scale = np.asarray(kwh_scale)
+        kwh_divisor = np.where(kwh_scale == ScaleKWH.Scale10, 10.0,
+                               np.where(kwh_scale == ScaleKWH.Scale100, 100.0, 1.0))
+
+        columns = OrderedDict()
+        for fld, offset, size, fld_type, fld_scale in self.m_fields:
+            chunk = rows[:, offset:offset + size]
+            if fld_type == FieldType.Float or fld_type == FieldType.Int:
+                values, parsed = self.parseDigits(chunk)
+                frame_ok &= parsed
+                if fld_type == FieldType.Float:
+                    if fld_scale == ScaleType.KWH:
+                        values = values / kwh_divisor
+                    elif fld_scale == ScaleType.Div10:
+                        values = values / 10.0
+                    elif fld_scale == ScaleType.Div100:
+                        values = values / 100.0
+                    else:
+                        values = values.astype(np.float64)
+                    values[~parsed] = np.nan
+                columns[fld] = values
+            elif fld_type == FieldType.Hex:
+                hex_chars = np.empty((len(rows), size * 2), dtype=np.uint8)
+                hex_chars[:, 0::2] = self.m_hex_digits[chunk >> 4]
+                hex_chars[:, 1::2] = self.m_hex_digits[chunk & 0x0f]
+                columns[fld] = hex_chars.view("S" + str(size * 2)).ravel().astype("U")
+            else:
+                columns[fld] = np.ascontiguousarray(chunk).view("S" + str(size)).ravel().astype("U")
+        columns["Frame_Ok"] = frame_ok
+        return columns
+
+    @staticmethod
+    def getLayoutDecoders(version):
+        """ Shared decoders for the V3 or V4 read layout, created on first use.
+
+        Args:
+            version (int): 3 or 4.
+
+        Returns:
+            tuple: A block and B block decoders, B None for V3.
+        """
+        decoders = BatchDecoder.m_layouts.get(version)
+        if decoders is None:
+            if version == 4:
+                definition_meter = V4Meter()
+                decoders = (BatchDecoder(definition_meter.m_blk_a), BatchDecoder(definition_meter.m_blk_b))
+            else:
+                decoders = (BatchDecoder(V3Meter().m_blk_a), None)
+            BatchDecoder.m_layouts[version] = decoders
+        return decoders
+
+    @staticmethod
+    def decodeReads(rows_a, rows_b=None, check_crc=True):
+        """ Decode V4 reads, or V3 reads if rows_b is None, combined as in the read buffer.
+
+        Args:
+            rows_a (tuple): A reads from :func:`~ekmmeters.BatchDecoder.toArray` or fromHex().
+            rows_b (tuple): Matching B reads, None for V3.
+            check_crc (bool): Clear Frame_Ok where a CRC does not match.
+
+        Returns:
+            OrderedDict: Field name to numpy array, and Frame_Ok.
+        """
+        if rows_b is None:
+            decoder_a = BatchDecoder.getLayoutDecoders(3)[0]
+            return decoder_a.decode(None, ScaleKWH.Scale10, check_crc, rows_a)
+        decoder_a, decoder_b = BatchDecoder.getLayoutDecoders(4)
+        read_a = decoder_a.decode(None, None, check_crc, rows_a)
+        columns = decoder_b.decode(None, read_a[Field.kWh_Scale], check_crc, rows_b)
+        frame_ok = columns["Frame_Ok"] & read_a["Frame_Ok"]
+        columns.update(read_a)
+        columns["Frame_Ok"] = frame_ok
+        return columns
+
+
+class ReadExporter(object):
+    """ Columnar export of reads, streamed in chunks of rows.
+
+    Column types come from the :class:`~ekmmeters.FieldType` of each field:
+    Float fields are float64, Int fields and Time_Stamp int64 and all
+    others strings.  Only one chunk of rows is held in memory.  Missing
+    values are nulls in Parquet and Arrow, NaN, 0 or empty in npz, and
+    empty in CSV.
+
+    Use as a context manager, or call close() to finish the file::
+
+        with ReadExporter("reads", my_db.m_all_fields) as exporter:
+            exporter.writeReads(reads)
+    """
+
+    def __init__(self, path, def_buf, fmt=None, chunk_size=10000):
+        """
+        Args:
+            path (str): File to write.  The format extension is added if path has none.
+            def_buf (SerialBlock): Field layout, ex. MeterDB().m_all_fields.
+            fmt (str): :class:`~ekmmeters.ExportFormat` value, defaults to the
+                best installed: Parquet with pyarrow, Npz with numpy, else Csv.
+            chunk_size (int): Rows buffered before each write.
+        """
+        if fmt is None:
+            fmt = ReadExporter.bestFormat()
+        if not os.path.splitext(path)[1]:
+            path += "." + fmt
+        self.m_path = path
+        self.m_format = fmt
+        self.m_chunk_size = chunk_size
+        self.m_fields = []
+        for fld in def_buf:
+            compare_fld = fld.upper()
+            if not "RESERVED" in compare_fld and not "CRC" in compare_fld:
+                self.m_fields.append((fld, def_buf[fld][MeterData.TypeValue],
+                                      def_buf[fld][MeterData.SizeValue]))
+        self.m_fields.append((Field.Time_Stamp, FieldType.Int, 8))
+        self.m_rows = []
+        self.m_row_count = 0
+        self.m_writer = None
+        self.m_file = None
+        self.m_spools = None
+        self.m_closed = False
+
+    @staticmethod
+    def bestFormat():
+        """ Best :class:`~ekmmeters.ExportFormat` available in this install. """
+        try:
+            import pyarrow.parquet
+            return ExportFormat.Parquet
+        except ImportError:
+            pass
+        try:
+            import numpy
+            return ExportFormat.Npz
+        except ImportError:
+            pass
+        return ExportFormat.Csv
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+        return False
+
+    def getPath(self):
+        """ File written, with the format extension if one was added. """
+        return self.m_path
+
+    def getFormat(self):
+        """ :class:`~ekmmeters.ExportFormat` in use. """
+        return self.m_format
+
+    def getFieldNames(self):
+        """ Column names in file order, ending with Time_Stamp. """
+        return [fld[0] for fld in self.m_fields]
+
+    def getRowCount(self):
+        """ Rows written so far, including buffered rows. """
+        return self.m_row_count + len(self.m_rows)
+
+    def writeRow(self, row):
+        """ Add one row of native values in :func:`~ekmmeters.ReadExporter.getFieldNames` order.
+
+        Args:
+            row (sequence): Values, None where missing.
+        """
+        self.m_rows.append(row)
+        if len(self.m_rows) >= self.m_chunk_size:
+            self.flush()
+
+    def writeRows(self, rows):
+        """ Add many rows, ex. from a database cursor.
+
+        Args:
+            rows (iterable): Sequences of values in getFieldNames() order.
+        """
+        for row in rows:
+            self.writeRow(row)
+
+    def writeReads(self, reads):
+        """ Add reads kept in memory.
+
+        Args:
+            reads (iterable): :class:`~ekmmeters.ReadSnapshot` or
+                :class:`~ekmmeters.SerialBlock` reads.  A SerialBlock has no
+                time stamp and is written with the current time.
+        """
+        names = self.getFieldNames()[:-1]
+        native = MeterData.NativeValue
+        for read in reads:
+            row = []
+            for fld in names:
+                val = read.get(fld)
+                row.append(val[native] if val is not None else None)
+            if isinstance(read, ReadSnapshot):
+                row.append(read.getTimeStamp())
+            else:
+                row.append(int(time.time() * 1000))
+            self.writeRow(row)
+
+    def flush(self):
+        """ Write buffered rows. """
+        rows = self.m_rows
+        if not rows:
+            return
+        self.m_rows = []
+        if self.m_format == ExportFormat.Csv:
+            self.flushCsv(rows)
+        elif self.m_format == ExportFormat.Ndjson:
+            self.flushNdjson(rows)
+        elif self.m_format == ExportFormat.Npz:
+            self.flushNpz(rows)
+        else:
+            self.flushArrow(rows)
+        self.m_row_count += len(rows)
+
+    def flushCsv(self, rows):
+        """ Append rows to the CSV file.  Private. """
+        if self.m_writer is None:
+            self.m_file = open(self.m_path, "w", newline="")
+            self.m_writer = csv.writer(self.m_file)
+            self.m_writer.writerow(self.getFieldNames())
+        self.m_writer.writerows(rows)
+
+    def flushNdjson(self, rows):
+        """ Append rows to the NDJSON file.  Private. """
+        if self.m_file is None:
+            self.m_file = open(self.m_path, "w")
+        names = self.getFieldNames()
+        self.m_file.writelines([json.dumps(dict(zip(names, row))) + "\n" for row in rows])
+
+    def flushArrow(self, rows):
+        """ Append rows as one Parquet row group or Arrow record batch.  Private. """
+        import pyarrow
+        arrow_types = {FieldType.Float: pyarrow.float64(), FieldType.Int: pyarrow.int64()}
+        if self.m_writer is None:
+            schema = pyarrow.schema([(fld, arrow_types.get(fld_type, pyarrow.string()))
+                                     for fld, fld_type, fld_size in self.m_fields])
+            if self.m_format == ExportFormat.Parquet:
+                import pyarrow.parquet
+                self.m_writer = pyarrow.parquet.ParquetWriter(self.m_path, schema)
+            else:
+                import pyarrow.ipc
+                self.m_writer = pyarrow.ipc.new_file(self.m_path, schema)
+        arrays = []
+        for idx, (fld, fld_type, fld_size) in enumerate(self.m_fields):
+            values = [row[idx] for row in rows]
+            if fld_type not in arrow_types:
+                values = [val if val is None else str(val) for val in values]
+            arrays.append(pyarrow.array(values, type=arrow_types.get(fld_type, pyarrow.string())))
+        batch = pyarrow.RecordBatch.from_arrays(arrays, names=self.getFieldNames())
+        if self.m_format == ExportFormat.Parquet:
+            self.m_writer.write_table(pyarrow.Table.from_batches([batch]))
+        else:
+            self.m_writer.write_batch(batch)
+
+    def npzDtype(self, fld_type, fld_size):
+        """ numpy dtype string for a field.  Private. """
+        if fld_type == FieldType.Float:
+            return "<f8"
+        if fld_type == FieldType.Int:
+            return "<i8"
+        if fld_type == FieldType.Hex:
+            fld_size *= 2
+        return "<U" + str(max(fld_size, 1))
+
+    def flushNpz(self, rows):
+        """ Append rows to one temporary file per column.  Private.
+
+        The .npz is assembled on close(), when the row count is known.
+        """
+        import numpy
+        if self.m_spools is None:
+            self.m_spools = [tempfile.TemporaryFile() for fld in self.m_fields]
+        for idx, (fld, fld_type, fld_size) in enumerate(self.m_fields):
+            if fld_type == FieldType.Float:
+                values = [numpy.nan if row[idx] is None else row[idx] for row in rows]
+            elif fld_type == FieldType.Int:
+                values = [0 if row[idx] is None else row[idx] for row in rows]
+            else:
+                values = ["" if row[idx] is None else str(row[idx]) for row in rows]
+            array = numpy.array(values, dtype=self.npzDtype(fld_type, fld_size))
+            self.m_spools[idx].write(array.tobytes())
+
+    def closeNpz(self):
+        """ Copy the column files into the .npz archive.  Private. """
+        import numpy
+        from numpy.lib import format as npy_format
+        spools = self.m_spools or [None] * len(self.m_fields)
+        with zipfile.ZipFile(self.m_path, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for (fld, fld_type, fld_size), spool in zip(self.m_fields, spools):
+                header = {"descr": self.npzDtype(fld_type, fld_size),
+                          "fortran_order": False,
+                          "shape": (self.m_row_count,)}
+                with archive.open(fld + ".npy", "w", force_zip64=True) as member:
+                    npy_format.write_array_header_2_0(member, header)
+                    if spool is not None:
+                        spool.seek(0)
+                        block = spool.read(1 << 20)
+                        while block:
+                            member.write(block)
+                            block = spool.read(1 << 20)
+                if spool is not None:
+                    spool.close()
+        self.m_spools = None
+
+    def close(self):
+        """ Write buffered rows and finish the file.
+
+        Returns:
+            int: Rows written.
+        """
+        if self.m_closed:
+            return self.m_row_count
+        self.flush()
+        self.m_closed = True
+        if self.m_format == ExportFormat.Npz:
+            self.closeNpz()
+        elif self.m_format == ExportFormat.Csv or self.m_format == ExportFormat.Ndjson:
+            if self.m_file is None and self.m_format == ExportFormat.Csv:
+                self.flushCsv([])
+            elif self.m_file is None:
+                self.flushNdjson([])
+            self.m_file.close()
+        else:
+            if self.m_writer is None:
+                self.flushArrow([])
+            self.m_writer.close()
+        return self.m_row_count
+
+
+class MeterDB(object):
+    """ Base class for single-table reads database abstraction."""
+
+    #: Meter_Summaries columns in :class:`~ekmmeters.WindowSummary` order.  The
+    #: statistics are prefixed so no column is named like an SQL function.
+    m_summary_columns = (Field.Meter_Address, "Field_Name", "Start_Time", "End_Time",
+                         "Summary_Count", "Summary_Min", "Summary_Max", "Summary_Mean",
+                         "Summary_StdDev", "Summary_Last", "Summary_Delta")
+
+    def __init__(self, connection_string):
+        """
+        Args:
+            connection_string (str): database appropriate connection string
+        """
+        self.m_connection_string = connection_string
+        self.m_all_fields = SerialBlock()
+        self.m_decoders = {}
+        self.combineAB()
+        pass
+
+    def setConnectString(self, connection_string):
+        """ Setter for connection string.
+        Args:
+            connection_string (str): Connection string.
+        """
+        self.m_connection_string = connection_string
+        pass
+
+    def combineAB(self):
+        """ Use the serial block definitions in V3 and V4 to create one field list. """
+        v4definition_meter = V4Meter()
+        v4definition_meter.makeAB()
+        defv4 = v4definition_meter.getReadBuffer()
+
+        v3definition_meter = V3Meter()
+        v3definition_meter.makeReturnFormat()
+        defv3 = v3definition_meter.getReadBuffer()
+
+        for fld in defv3:
+            if fld not in self.m_all_fields:
+                compare_fld = fld.upper()
+                if not "RESERVED" in compare_fld and not "CRC" in compare_fld:
+                    self.m_all_fields[fld] = defv3[fld]
+
+        for fld in defv4:
+            if fld not in self.m_all_fields:
+                compare_fld = fld.upper()
+                if not "RESERVED" in compare_fld and not "CRC" in compare_fld:
+                    self.m_all_fields[fld] = defv4[fld]
+        pass
+
+    @staticmethod
+    def mapTypeToSql(fld_type=FieldType.NoType, fld_len=0):
+        """ Translate FieldType to portable SQL Type.  Override if needful.
+        Args:
+            fld_type (int): :class:`~ekmmeters.FieldType` in serial block.
+            fld_len (int): Binary length in serial block
+
+        Returns:
+            string: Portable SQL type and length where appropriate.
+        """
+        if fld_type == FieldType.Float:
+            return "FLOAT"
+        elif fld_type == FieldType.String:
+            return "VARCHAR(" + str(fld_len) + ")"
+        elif fld_type == FieldType.Int:
+            return "INT"
+        elif fld_type == FieldType.Hex:
+            return "VARCHAR(" + str(fld_len * 2) + ")"
+        elif fld_type == FieldType.PowerFactor:
+            return "VARCHAR(" + str(fld_len) + ")"
+        else:
+            ekm_log("Type " + str(type) + " not handled by mapTypeToSql, returned VARCHAR(255)")
+            return "VARCHAR(255)"
+
+    def fillCreate(self, qry_str):
+        """ Return query portion below CREATE.
+        Args:
+            qry_str (str): String as built.
+
+        Returns:
+            string: Passed string with fields appended.
+        """
+        count = 0
+        for fld in self.m_all_fields:
+            fld_type = self.m_all_fields[fld][MeterData.TypeValue]
+            fld_len = self.m_all_fields[fld][MeterData.SizeValue]
+            qry_spec = self.mapTypeToSql(fld_type, fld_len)
+            if count > 0:
+                qry_str += ", \n"
+            qry_str = qry_str + '   ' + fld + ' ' + qry_spec
+            count += 1
+
+        qry_str += (",\n\t" + Field.Time_Stamp + " BIGINT,\n\t" +
+                    "Raw_A VARCHAR(512),\n\t" +
+                    "Raw_B VARCHAR(512)\n)")
+
+        return qry_str
+
+    def sqlCreate(self):
+        """ Reasonably portable SQL CREATE for defined fields.
+        Returns:
+            string: Portable as possible SQL Create for all-reads table.
+        """
+        count = 0
+        qry_str = "CREATE TABLE Meter_Reads ( \n\r"
+        qry_str = self.fillCreate(qry_str)
+        ekm_log(qry_str, priority=4)
+        return qry_str
+
+    @staticmethod
+    def sqlInsert(def_buf, raw_a, raw_b, time_stamp=None):
+        """ Reasonably portable SQL INSERT for from combined read buffer.
+        Args:
+            def_buf (SerialBlock): Database only serial block of all fields.
+            raw_a (str): Raw A read as hex string.
+            raw_b (str): Raw B read (if exists, otherwise empty) as hex string.
+            time_stamp (int): Optional epoch ms of the read, default now.
+
+        Returns:
+            str: SQL insert for passed read buffer
+        """
+        count = 0
+        qry_str = "INSERT INTO  Meter_Reads ( \n\t"
+        for fld in def_buf:
+            if count > 0:
+                qry_str += ", \n\t"
+            qry_str = qry_str + fld
+            count += 1
+        qry_str += (",\n\t" + Field.Time_Stamp + ", \n\t" +
+                    "Raw_A,\n\t" +
+                    "Raw_B\n) \n" +
+                    "VALUES( \n\t")
+        count = 0
+        for fld in def_buf:
+            if count > 0:
+                qry_str += ", \n\t"
+            fld_type = def_buf[fld][MeterData.TypeValue]
+            fld_str_content = def_buf[fld][MeterData.StringValue]
+            delim = ""
+            if (fld_type == FieldType.Hex) or \
+                    (fld_type == FieldType.String) or \
+                    (fld_type == FieldType.PowerFactor):
+                delim = "'"
+            qry_str = qry_str + delim + fld_str_content + delim
+            count += 1
+        time_val = int(time.time() * 1000) if time_stamp is None else int(time_stamp)
+        qry_str = (qry_str + ",\n\t" + str(time_val) + ",\n\t'" +
+                   str2hex(raw_a) + "'" + ",\n\t'" +
+                   str2hex(raw_b) + "'\n);")
+        ekm_log(qry_str, priority=4)
+        return qry_str
+
+    @staticmethod
+    def sqlIdxMeterTime():
+        """ Reasonably portable Meter_Address and Time_Stamp index SQL create.
+        Returns:
+            str: SQL CREATE INDEX statement.
+        """
+        return ("CREATE INDEX idx_meter_time " +
+                "ON Meter_Reads('" + Field.Meter_Address + "', '" +
+                Field.Time_Stamp + "')")
+
+    @staticmethod
+    def sqlIdxMeter():
+        """ Reasonably portable Meter_Address index SQL create.
+        Returns:
+            str: SQL CREATE INDEX statement.
+        """
+        return ("CREATE INDEX idx_meter " +
+                "ON Meter_Reads('" + Field.Meter_Address + "')")
+
+    @staticmethod
+    def sqlDrop():
+        """ Reasonably portable drop of reads table.
+        Returns:
+            str: SQL DROP TABLE statement.
+        """
+        qry_str = 'DROP TABLE Meter_Reads'
+        return qry_str
+
+    def dbInsert(self, def_buf, raw_a, raw_b, time_stamp=None):
+        """ Call overridden dbExec() with built insert statement.
+        Args:
+            def_buf (SerialBlock): Block of read buffer fields to write.
+            raw_a (str): Hex string of raw A read.
+            raw_b (str): Hex string of raw B read or empty.
+            time_stamp (int): Optional epoch ms of the read, default now.
+
+        Returns:
+            The dbExec() result, False if the insert failed.
+        """
+        metrics = ekmmeters_metrics
+        if metrics:
+            start = time.perf_counter()
+        result = self.dbExec(self.sqlInsert(def_buf, raw_a, raw_b, time_stamp))
+        if metrics:
+            metrics.observe(Metric.DbInsertSeconds, time.perf_counter() - start,
+                            def_buf[Field.Meter_Address][MeterData.StringValue])
+        return result
+
+    def dbInsertBatch(self, reads):
+        """ Insert several reads, stopping at the first failure.
+
+        Subclasses may override with a single transaction or bulk write.
+        Items are taken one at a time, and each def_buf is only valid
+        until the next is taken.
+
+        Args:
+            reads (iterable): (def_buf, raw_a, raw_b, time_stamp) per read.
+
+        Returns:
+            int: Reads inserted, from the start of reads.
+        """
+        count = 0
+        for def_buf, raw_a, raw_b, time_stamp in reads:
+            try:
+                if self.dbInsert(def_buf, raw_a, raw_b, time_stamp) is False:
+                    break
+            except:
+                ekm_log(traceback.format_exc())
+                break
+            count += 1
+        return count
+
+    def decodeRaw(self, raw_a, raw_b):
+        """ Read buffer for stored raw reads, with the V4 layout if raw_b is set.
+
+        Args:
+            raw_a (str): Raw A read.
+            raw_b (str): Raw B read, empty for V3.
+
+        Returns:
+            SerialBlock: Read buffer with calculated fields, reused by the next call.
+        """
+        version = 4 if raw_b else 3
+        definition_meter = self.m_decoders.get(version)
+        if definition_meter is None:
+            definition_meter = V4Meter() if version == 4 else V3Meter()
+            self.m_decoders[version] = definition_meter
+        if version == 4:
+            definition_meter.convertData(definition_meter.unpackStruct(raw_a, definition_meter.m_blk_a),
+                                         definition_meter.m_blk_a)
+            definition_meter.convertData(definition_meter.unpackStruct(raw_b, definition_meter.m_blk_b),
+                                         definition_meter.m_blk_b, definition_meter.m_kwh_precision)
+            definition_meter.makeAB()
+            definition_meter.calculateFields()
+        else:
+            definition_meter.convertData(definition_meter.unpackStruct(raw_a, definition_meter.m_blk_a),
+                                         definition_meter.m_blk_a, 1)
+            definition_meter.calculateFields()
+            definition_meter.makeReturnFormat()
+        return definition_meter.getReadBuffer()
+
+    def dbCreate(self):
+        """ Call overridden dbExec() with built create statement. """
+        self.dbExec(self.sqlCreate())
+
+    @staticmethod
+    def sqlCreateSummary():
+        """ Reasonably portable SQL CREATE for :class:`~ekmmeters.WindowSummary` records.
+
+        Columns are :attr:`m_summary_columns`, the WindowSummary fields with
+        the statistics prefixed by Summary_.
+
+        Returns:
+            string: SQL CREATE for the Meter_Summaries table.
+        """
+        qry_str = ("CREATE TABLE Meter_Summaries ( \n\t" +
+                   Field.Meter_Address + " VARCHAR(12),\n\t" +
+                   "Field_Name VARCHAR(64),\n\t" +
+                   "Start_Time BIGINT,\n\t" +
+                   "End_Time BIGINT,\n\t" +
+                   "Summary_Count INT,\n\t" +
+                   "Summary_Min FLOAT,\n\t" +
+                   "Summary_Max FLOAT,\n\t" +
+                   "Summary_Mean FLOAT,\n\t" +
+                   "Summary_StdDev FLOAT,\n\t" +
+                   "Summary_Last FLOAT,\n\t" +
+                   "Summary_Delta FLOAT\n)")
+        ekm_log(qry_str, priority=4)
+        return qry_str
+
+    @staticmethod
+    def sqlInsertSummary(summary):
+        """ Reasonably portable SQL INSERT for one window summary.
+
+        Args:
+            summary (WindowSummary): Record emitted by :class:`~ekmmeters.SummaryObserver`.
+
+        Returns:
+            str: SQL insert for passed summary.
+        """
+        qry_str = ("INSERT INTO Meter_Summaries ( \n\t" +
+                   ", ".join(MeterDB.m_summary_columns) +
+                   "\n) \nVALUES( \n\t'" +
+                   str(summary.Meter_Address) + "', '" +
+                   str(summary.Field_Name) + "', " +
+                   ", ".join([str(val) for val in summary[2:]]) +
+                   "\n);")
+        ekm_log(qry_str, priority=4)
+        return qry_str
+
+    @staticmethod
+    def sqlDropSummary():
+        """ Reasonably portable drop of summaries table.
+
+        Returns:
+            str: SQL DROP TABLE statement.
+        """
+        return "DROP TABLE Meter_Summaries"
+
+    def dbCreateSummary(self):
+        """ Call overridden dbExec() with built summaries create statement. """
+        self.dbExec(self.sqlCreateSummary())
+
+    def dbInsertSummary(self, summary):
+        """ Call overridden dbExec() with built summary insert statement.
+
+        Args:
+            summary (WindowSummary): Record emitted by :class:`~ekmmeters.SummaryObserver`.
+        """
+        self.dbExec(self.sqlInsertSummary(summary))
+
+    def dbDropSummary(self):
+        """ Call overridden dbExec() with built summaries drop statement. """
+        self.dbExec(self.sqlDropSummary())
+
+    def dbDropReads(self):
+        """ Call overridden dbExec() with build drop statement. """
+        self.dbExec(self.sqlDrop())
+
+    def dbExec(self, query_str):
+        """ Required override for MeterDB subclass, run a query.
+        Args:
+            query_str (str): SQL Query to run.
+        """
+        pass
+
+
+class SqliteMeterDB(MeterDB):
+    """MeterDB subclass for simple sqlite database"""
+
+    def __init__(self, connection_string="default.db"):
+        """
+        Args:
+            connection_string (str): name of sqlite database file.
+        """
+        super(SqliteMeterDB, self).__init__(connection_string)
+
+    def dbExec(self, query_str):
+        """ Required override of dbExec() from MeterDB(), run query.
+        Args:
+            query_str (str): query to run
+        """
+        try:
+            connection = sqlite3.connect(self.m_connection_string)
+            cursor = connection.cursor()
+            cursor.execute(query_str)
+            connection.commit()
+            cursor.close()
+            connection.close()
+            return True
+        except:
+            ekm_log(traceback.format_exc())
+            return False
+        pass
+
+    def dbInsertBatch(self, reads):
+        """ Insert several reads in one transaction.
+
+        Args:
+            reads (iterable): (def_buf, raw_a, raw_b, time_stamp) per read.
+
+        Returns:
+            int: Reads inserted, all or none.
+        """
+        try:
+            connection = sqlite3.connect(self.m_connection_string)
+            try:
+                cursor = connection.cursor()
+                count = 0
+                for def_buf, raw_a, raw_b, time_stamp in reads:
+                    cursor.execute(self.sqlInsert(def_buf, raw_a, raw_b, time_stamp))
+                    count += 1
+                connection.commit()
+                cursor.close()
+                return count
+            finally:
+                connection.close()
+        except:
+            ekm_log(traceback.format_exc())
+        return 0
+
+    def dict_factory(self, cursor, row):
+        """ Sqlite callback accepting the cursor and the original row as a tuple.
+
+        Simple return of JSON safe types.
+
+        Args:
+            cursor (sqlite cursor):  Original cursory
+            row (sqlite row tuple): Original row.
+
+        Returns:
+            dict: modified row.
+        """
+        d = {}
+        for idx, col in enumerate(cursor.description):
+            val = row[idx]
+            name = col[0]
+            if name == Field.Time_Stamp:
+                d[col[0]] = str(val)
+                continue
+            if name == "Raw_A" or name == "Raw_B":  # or name == Field.Meter_Time:
+                continue
+            if name not in self.m_all_fields:
+                continue
+            if (str(val) != "None"):
+                d[name] = str(val)
+        return d
+
+    @staticmethod
+    def raw_dict_factory(cursor, row):
+        """ Sqlite callback accepting the cursor and the original row as a tuple.
+
+        Simple return of JSON safe types, including raw read hex strings.
+
+        Args:
+            cursor (sqlite cursor):  Original cursory
+            row (sqlite row tuple): Original row.
+
+        Returns:
+            dict: modified row.
+        """
+        d = {}
+        for idx, col in enumerate(cursor.description):
+            val = row[idx]
+            name = col[0]
+            if name == Field.Time_Stamp or name == Field.Meter_Address:
+                d[name] = str(val)
+                continue
+            if name == "Raw_A" or name == "Raw_B":
+                d[name] = str(val)
+                continue
+        return d
+
+    def renderJsonReadsSince(self, timestamp, meter):
+        """ Simple since Time_Stamp query returned as JSON records.
+
+        Args:
+            timestamp (int): Epoch time in seconds.
+            meter (str): 12 character meter address to query
+
+        Returns:
+            str: JSON rendered read records.
+
+        """
+        result = ""
+        try:
+            connection = sqlite3.connect(self.m_connection_string)
+            connection.row_factory = self.dict_factory
+            select_cursor = connection.cursor()
+            select_cursor.execute("select * from Meter_Reads where " + Field.Time_Stamp +
+                                  " > " + str(timestamp) + " and " + Field.Meter_Address +
+                                  "= '" + meter + "';")
+            reads = select_cursor.fetchall()
+            result = json.dumps(reads, indent=4)
+
+        except:
+            ekm_log(traceback.format_exc())
+        return result
+
+    def renderRawJsonReadsSince(self, timestamp, meter):
+        """ Simple Time_Stamp query returned as JSON, with raw hex string fields.
+
+        Args:
+            timestamp (int): Epoch time in seconds.
+            meter (str): 12 character meter address to query
+
+        Returns:
+            str: JSON rendered read records including raw hex fields.
+
+        """
+        result = ""
+        try:
+            connection = sqlite3.connect(self.m_connection_string)
+            connection.row_factory = self.raw_dict_factory
+            select_cursor = connection.cursor()
+            select_cursor.execute("select " + Field.Time_Stamp + ", Raw_A, Raw_B, " +
+                                  Field.Meter_Address + " from Meter_Reads where " +
+                                  Field.Time_Stamp + " > " + str(timestamp) + " and " +
+                                  Field.Meter_Address + " = '" + meter + "';")
+            reads = select_cursor.fetchall()
+            result = json.dumps(reads, indent=4)
+        except:
+            ekm_log(traceback.format_exc())
+        return result
+
+    def exportReadsSince(self, timestamp, path, meter=None, fmt=None, chunk_size=10000):
+        """ Time_Stamp query written to a columnar file with :class:`~ekmmeters.ReadExporter`.
+
+        Rows are fetched and written chunk_size at a time, so memory does not
+        grow with the export.
+
+        Args:
+            timestamp (int): Epoch time in ms, rows after it are exported.
+            path (str): File to write, format extension added if none.
+            meter (str): Optional 12 character meter address, default all meters.
+            fmt (str): Optional :class:`~ekmmeters.ExportFormat` value.
+            chunk_size (int): Rows per fetch and write.
+
+        Returns:
+            str: Path written, empty on failure.
+        """
+        result = ""
+        try:
+            exporter = ReadExporter(path, self.m_all_fields, fmt, chunk_size)
+            qry_str = ("select " + ", ".join(exporter.getFieldNames()) + " from Meter_Reads where " +
+                       Field.Time_Stamp + " > " + str(timestamp))
+            if meter:
+                qry_str += " and " + Field.Meter_Address + " = '" + meter + "'"
+            connection = sqlite3.connect(self.m_connection_string)
+            select_cursor = connection.cursor()
+            select_cursor.execute(qry_str + " order by " + Field.Time_Stamp + ";")
+            rows = select_cursor.fetchmany(chunk_size)
+            while rows:
+                exporter.writeRows(rows)
+                rows = select_cursor.fetchmany(chunk_size)
+            select_cursor.close()
+            connection.close()
+            exporter.close()
+            result = exporter.getPath()
+        except:
+            ekm_log(traceback.format_exc())
+        return result
+
+    def decodeRawReadsSince(self, timestamp, meter, check_crc=True, chunk_size=10000):
+        """ Time_Stamp query decoded from the stored raw reads with :class:`~ekmmeters.BatchDecoder`.
+
+        Re-derives every field, A and B combined as in the read buffer, with
+        the current block layouts.  Requires numpy.
+
+        Args:
+            timestamp (int): Epoch time in ms.
+            meter (str): 12 character meter address to query
+            check_crc (bool): Check the CRC of each stored read.
+            chunk_size (int): Rows fetched and decoded per step.
+
+        Returns:
+            OrderedDict: Field name to numpy array, with Time_Stamp and Frame_Ok.
+        """
+        result = OrderedDict()
+        try:
+            import numpy
+            connection = sqlite3.connect(self.m_connection_string)
+            select_cursor = connection.cursor()
+            select_cursor.execute("select " + Field.Time_Stamp + ", Raw_A, Raw_B from Meter_Reads where " +
+                                  Field.Time_Stamp + " > " + str(timestamp) + " and " +
+                                  Field.Meter_Address + " = '" + meter + "' order by " +
+                                  Field.Time_Stamp + ";")
+            is_v4 = None
+            chunks = []
+            rows = select_cursor.fetchmany(chunk_size)
+            while rows:
+                if is_v4 is None:
+                    is_v4 = bool(rows[0][2])
+                decoder_a = BatchDecoder.getLayoutDecoders(3)[0]
+                rows_b = None
+                if is_v4:
+                    rows_b = decoder_a.fromHex([row[2] for row in rows])
+                chunk = BatchDecoder.decodeReads(decoder_a.fromHex([row[1] for row in rows]), rows_b, check_crc)
+                chunk[Field.Time_Stamp] = numpy.array([row[0] for row in rows], dtype=numpy.int64)
+                chunks.append(chunk)
+                rows = select_cursor.fetchmany(chunk_size)
+            select_cursor.close()
+            connection.close()
+            for fld in (chunks[0] if chunks else ()):
+                result[fld] = numpy.concatenate([chunk[fld] for chunk in chunks])
+        except:
+            ekm_log(traceback.format_exc())
+        return result
+
+
+class FrameLogSegment(object):
+    """ One segment file of a :class:`~ekmmeters.FrameLogMeterDB`.  Private.
+
+    Holds the record count, the sparse index (Time_Stamp of every
+    index_interval-th record) and a read only memory map, remapped when
+    the file has grown since it was mapped.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Segment file.
+        """
+        self.m_path = path
+        self.m_count = 0
+        self.m_index = array("q")
+        self.m_map = None
+        self.m_map_count = 0
+
+    def getMap(self, record_size):
+        """ Memory map covering every record, None if the segment is empty. """
+        if self.m_count == 0:
+            return None
+        if self.m_map is None or self.m_map_count != self.m_count:
+            # views of the old map stay valid, it closes when they are released
+            with open(self.m_path, "rb") as segment_file:
+                self.m_map = mmap.mmap(segment_file.fileno(), self.m_count * record_size,
+                                       access=mmap.ACCESS_READ)
+            self.m_map_count = self.m_count
+        return self.m_map
+
+    def close(self):
+        """ Release the memory map. """
+        if self.m_map is not None:
+            try:
+                self.m_map.close()
+            except BufferError:
+                pass
+        self.m_map = None
+        self.m_map_count = 0
+
+
+class FrameLogMeterDB(MeterDB):
+    """ MeterDB subclass appending raw reads to fixed size records in segment files.
+
+    Each read is one 530 byte record, struct "<q12s255s255s": Time_Stamp
+    in ms, meter address, raw A and raw B (zeros for V3).  Inserts are
+    sequential appends to the newest segment, and a new segment is started
+    every segment_records records.  A sparse index of every index_interval-th
+    Time_Stamp per segment finds time ranges, which are returned as memoryview
+    slices of the memory mapped segments and decoded only when asked.
+    Time ranges assume records were appended in time order, as dbInsert()
+    does.  The connection string is the log directory.  There is no SQL,
+    so dbExec() and the summary table calls return False.
+    """
+
+    m_record = struct.Struct("<q12s255s255s")
+
+    def __init__(self, connection_string="framelog", segment_records=100000, index_interval=256):
+        """
+        Args:
+            connection_string (str): Directory for the segment files.
+            segment_records (int): Records per segment before rotating.
+            index_interval (int): Records between sparse index entries.
+        """
+        super(FrameLogMeterDB, self).__init__(connection_string)
+        self.m_segment_records = segment_records
+        self.m_index_interval = index_interval
+        self.m_segments = None
+        self.m_file = None
+        self.m_lock = threading.RLock()
+
+    def dbExec(self, query_str):
+        """ No SQL in a frame log.
+
+        Returns:
+            bool: Always False.
+        """
+        ekm_log("FrameLogMeterDB does not run SQL: " + query_str, priority=4)
+        return False
+
+    def dbCreate(self):
+        """ Create the log directory if needed and open the segments. """
+        try:
+            self.openLog()
+        except:
+            ekm_log(traceback.format_exc())
+
+    def dbInsert(self, def_buf, raw_a, raw_b, time_stamp=None):
+        """ Append one read record.
+
+        Args:
+            def_buf (SerialBlock): Read buffer, for the meter address.
+            raw_a (str): Raw A read.
+            raw_b (str): Raw B read or empty.
+            time_stamp (int): Optional epoch ms of the read, default now.
+
+        Returns:
+            bool: True if appended.
+        """
+        metrics = ekmmeters_metrics
+        if metrics:
+            start = time.perf_counter()
+        address = def_buf[Field.Meter_Address][MeterData.StringValue]
+        if time_stamp is None:
+            time_stamp = int(time.time() * 1000)
+        result = self.appendRecord(time_stamp, address, raw_a, raw_b)
+        if metrics:
+            metrics.observe(Metric.DbInsertSeconds, time.perf_counter() - start, address)
+        return result
+
+    def dbDropReads(self):
+        """ Delete every segment. """
+        with self.m_lock:
+            try:
+                self.closeLog()
+                if os.path.isdir(self.m_connection_string):
+                    for name in self.segmentNames():
+                        os.remove(os.path.join(self.m_connection_string, name))
+            except:
+                ekm_log(traceback.format_exc())
+
+    def segmentNames(self):
+        """ Segment file names in the log directory, oldest first.  Private. """
+        return sorted(name for name in os.listdir(self.m_connection_string)
+                      if name.startswith("frames_") and name.endswith(".log"))
+
+    def openLog(self):
+        """ Open existing segments and rebuild their sparse indexes.  Private.
+
+        A partial record at the end of the newest segment, from an
+        interrupted write, is truncated.
+        """
+        with self.m_lock:
+            if self.m_segments is not None:
+                return
+            if not os.path.isdir(self.m_connection_string):
+                os.makedirs(self.m_connection_string)
+            record_size = self.m_record.size
+            segments = []
+            for name in self.segmentNames():
+                segment = FrameLogSegment(os.path.join(self.m_connection_string, name))
+                size = os.path.getsize(segment.m_path)
+                if size % record_size:
+                    with open(segment.m_path, "r+b") as segment_file:
+                        segment_file.truncate(size - size % record_size)
+                segment.m_count = size // record_size
+                segment_map = segment.getMap(record_size)
+                for record in range(0, segment.m_count, self.m_index_interval):
+                    segment.m_index.append(struct.unpack_from("<q", segment_map, record * record_size)[0])
+                segments.append(segment)
+            self.m_segments = segments
+            if segments and segments[-1].m_count < self.m_segment_records:
+                self.m_file = open(segments[-1].m_path, "ab")
+
+    def closeLog(self):
+        """ Close the open segment and memory maps. """
+        with self.m_lock:
+            if self.m_file is not None:
+                self.m_file.close()
+                self.m_file = None
+            for segment in self.m_segments or []:
+                segment.close()
+            self.m_segments = None
+
+    def appendRecord(self, time_stamp, address, raw_a, raw_b):
+        """ Append one record, rotating to a new segment when full.
+
+        Args:
+            time_stamp (int): Epoch ms.
+            address (str): 12 character meter address.
+            raw_a (str): Raw A read.
+            raw_b (str): Raw B read or empty.
+
+        Returns:
+            bool: True if appended.
+        """
+        try:
+            record = self.m_record.pack(time_stamp, address.encode("latin-1"),
+                                        raw_a.encode("latin-1"), raw_b.encode("latin-1"))
+            with self.m_lock:
+                self.openLog()
+                segments = self.m_segments
+                if not segments or segments[-1].m_count >= self.m_segment_records:
+                    if self.m_file is not None:
+                        self.m_file.close()
+                    number = int(segments[-1].m_path[-10:-4]) + 1 if segments else 1
+                    segments.append(FrameLogSegment(os.path.join(self.m_connection_string,
+                                                                 "frames_%06d.log" % number)))
+                    self.m_file = open(segments[-1].m_path, "ab")
+                segment = segments[-1]
+                self.m_file.write(record)
+                self.m_file.flush()
+                if segment.m_count % self.m_index_interval == 0:
+                    segment.m_index.append(time_stamp)
+                segment.m_count += 1
+            return True
+        except:
+            ekm_log(traceback.format_exc())
+        return False
+
+    def findRecord(self, segment, segment_map, time_stamp, after):
+        """ First record at or after time_stamp, or after it if after is True.  Private. """
+        record_size = self.m_record.size
+        index = segment.m_index
+        if after:
+            block = bisect.bisect_right(index, time_stamp) - 1
+        else:
+            block = bisect.bisect_left(index, time_stamp) - 1
+        record = max(block, 0) * self.m_index_interval
+        while record < segment.m_count:
+            record_time = struct.unpack_from("<q", segment_map, record * record_size)[0]
+            if record_time > time_stamp or (record_time == time_stamp and not after):
+                break
+            record += 1
+        return record
+
+    def getSlices(self, start_time=None, end_time=None):
+        """ Records with start_time <= Time_Stamp <= end_time, without copying.
+
+        Args:
+            start_time (int): Epoch ms, default the first record.
+            end_time (int): Epoch ms, default the last record.
+
+        Returns:
+            list: One memoryview per segment with matching records, each a
+            whole number of records in :attr:`m_record` layout.
+        """
+        slices = []
+        record_size = self.m_record.size
+        with self.m_lock:
+            self.openLog()
+            for segment in self.m_segments:
+                segment_map = segment.getMap(record_size)
+                if segment_map is None:
+                    continue
+                if end_time is not None and segment.m_index[0] > end_time:
+                    break
+                first = 0
+                last = segment.m_count
+                if start_time is not None:
+                    first = self.findRecord(segment, segment_map, start_time, False)
+                if end_time is not None:
+                    last = self.findRecord(segment, segment_map, end_time, True)
+                if first < last:
+                    slices.append(memoryview(segment_map)[first * record_size:last * record_size])
+        return slices
+
+    def readRecords(self, start_time=None, end_time=None, meter=None):
+        """ Stored records in a time range, oldest first.
+
+        Args:
+            start_time (int): Epoch ms, default the first record.
+            end_time (int): Epoch ms, default the last record.
+            meter (str): Optional 12 character meter address.
+
+        Returns:
+            generator: (Time_Stamp, meter address, raw A, raw B) tuples, raw B
+            empty for V3.
+        """
+        empty_b = b"\x00" * 255
+        address_filter = meter.encode("latin-1") if meter else None
+        for records in self.getSlices(start_time, end_time):
+            for time_stamp, address, raw_a, raw_b in self.m_record.iter_unpack(records):
+                if address_filter and address != address_filter:
+                    continue
+                yield (time_stamp, address.decode("latin-1"), raw_a.decode("latin-1"),
+                       "" if raw_b == empty_b else raw_b.decode("latin-1"))
+
+    def decodeRecord(self, time_stamp, raw_a, raw_b):
+        """ Decode one stored record with the V3 or V4 block layout.
+
+        Args:
+            time_stamp (int): Epoch ms.
+            raw_a (str): Raw A read.
+            raw_b (str): Raw B read, empty for V3.
+
+        Returns:
+            ReadSnapshot: The read, with calculated fields.
+        """
+        return ReadSnapshot.fromBlock(self.decodeRaw(raw_a, raw_b), time_stamp)
+
+    def readSnapshots(self, start_time=None, end_time=None, meter=None):
+        """ Stored reads in a time range, decoded one at a time.
+
+        Args:
+            start_time (int): Epoch ms, default the first record.
+            end_time (int): Epoch ms, default the last record.
+            meter (str): Optional 12 character meter address.
+
+        Returns:
+            generator: :class:`~ekmmeters.ReadSnapshot` per read, oldest first.
+        """
+        for time_stamp, address, raw_a, raw_b in self.readRecords(start_time, end_time, meter):
+            yield self.decodeRecord(time_stamp, raw_a, raw_b)
+
+    def decodeColumns(self, meter, start_time=None, end_time=None, check_crc=True):
+        """ Reads of one meter in a time range, decoded with :class:`~ekmmeters.BatchDecoder`.
+
+        The raw reads are taken straight from the memory maps as numpy
+        arrays.  Requires numpy.
+
+        Args:
+            meter (str): 12 character meter address.
+            start_time (int): Epoch ms, default the first record.
+            end_time (int): Epoch ms, default the last record.
+            check_crc (bool): Clear Frame_Ok where a CRC does not match.
+
+        Returns:
+            OrderedDict: Field name to numpy array, with Time_Stamp and Frame_Ok.
+        """
+        import numpy
+        record_type = numpy.dtype([("time_stamp", "<i8"), ("address", "S12"),
+                                   ("raw_a", "u1", (255,)), ("raw_b", "u1", (255,))])
+        records = [numpy.frombuffer(records, dtype=record_type) for records in self.getSlices(start_time, end_time)]
+        records = numpy.concatenate(records) if records else numpy.zeros(0, dtype=record_type)
+        records = records[records["address"] == meter.encode("latin-1")]
+        frame_ok = numpy.ones(len(records), dtype=bool)
+        rows_b = None
+        if len(records) and records["raw_b"][0].any():
+            rows_b = (records["raw_b"], frame_ok)
+        columns = BatchDecoder.decodeReads((records["raw_a"], frame_ok), rows_b, check_crc)
+        columns[Field.Time_Stamp] = records["time_stamp"].copy()
+        return columns
+
+    def getRecordCount(self):
+        """ Records in all segments. """
+        with self.m_lock:
+            self.openLog()
+            return sum(segment.m_count for segment in self.m_segments)
+
+    def getSegmentCount(self):
+        """ Segment files in the log. """
+        with self.m_lock:
+            self.openLog()
+            return len(self.m_segments)
+
+
+class StorageBackend(object):
+    """ Unenforced abstract base class for typed row storage of reads.
+
+    Unlike :class:`~ekmmeters.MeterDB`, a backend never sees SQL text from
+    the library: it receives a schema of :class:`~ekmmeters.StorageColumn`
+    tuples once, then rows as tuples in schema order, and can write them
+    with its fastest bulk path.  Use with :class:`~ekmmeters.BackendMeterDB`.
+    """
+
+    def __init__(self):
+        self.m_schema = []
+
+    @staticmethod
+    def makeSchema(def_buf):
+        """ Read table schema for a field layout: the fields, then Time_Stamp, Raw_A and Raw_B.
+
+        Args:
+            def_buf (SerialBlock): Field layout, ex. MeterDB().m_all_fields.
+
+        Returns:
+            list: :class:`~ekmmeters.StorageColumn` per column.
+        """
+        schema = []
+        for fld in def_buf:
+            compare_fld = fld.upper()
+            if not "RESERVED" in compare_fld and not "CRC" in compare_fld:
+                schema.append(StorageColumn(fld, def_buf[fld][MeterData.TypeValue],
+                                            def_buf[fld][MeterData.SizeValue]))
+        schema.append(StorageColumn(Field.Time_Stamp, FieldType.Int, 13))
+        schema.append(StorageColumn("Raw_A", FieldType.String, 512))
+        schema.append(StorageColumn("Raw_B", FieldType.String, 512))
+        return schema
+
+    def getSchema(self):
+        """ Schema passed to create(). """
+        return self.m_schema
+
+    def getColumnNames(self):
+        """ Column names in row order. """
+        return [column.Column_Name for column in self.m_schema]
+
+    def create(self, schema):
+        """ Set the schema and create the storage if needed.
+
+        Args:
+            schema (list): :class:`~ekmmeters.StorageColumn` per column.
+
+        Returns:
+            bool: True on success.
+        """
+        self.m_schema = list(schema)
+        return True
+
+    def writeRows(self, rows):
+        """ Required override, write rows in one bulk operation.
+
+        Args:
+            rows (list): Tuples in schema order.
+
+        Returns:
+            int: Rows written.
+        """
+        ekm_log("StorageBackend::writeRows called in superclass.")
+        return 0
+
+    def queryRange(self, start_time=None, end_time=None, meter=None):
+        """ Required override, rows with start_time <= Time_Stamp <= end_time.
+
+        Args:
+            start_time (int): Epoch ms, default the first row.
+            end_time (int): Epoch ms, default the last row.
+            meter (str): Optional 12 character meter address.
+
+        Returns:
+            iterable: Tuples in schema order, oldest first.
+        """
+        ekm_log("StorageBackend::queryRange called in superclass.")
+        return []
+
+    def drop(self):
+        """ Remove all stored rows. """
+        pass
+
+    def close(self):
+        """ Release connections or files. """
+        pass
+
+
+class DbApiBackend(StorageBackend):
+    """ :class:`~ekmmeters.StorageBackend` for any DB-API 2.0 driver.
+
+    Rows are written with one executemany() and one commit per batch, or
+    with multi-row INSERT ... VALUES (...), (...) statements when
+    rows_per_statement is above 1, which is much faster for drivers whose
+    executemany() is a loop over execute().  Pass a function which opens a
+    connection and the driver's paramstyle::
+
+        backend = DbApiBackend(lambda: pymysql.connect(**args), pymysql.paramstyle,
+                               rows_per_statement=200)
+    """
+
+    def __init__(self, connect, paramstyle="qmark", table="Meter_Reads", fetch_size=1000,
+                 rows_per_statement=1, max_params=999):
+        """
+        Args:
+            connect (function): No argument function returning a DB-API 2.0 connection.
+            paramstyle (str): Driver paramstyle: qmark, numeric, named, format or pyformat.
+            table (str): Table name.
+            fetch_size (int): Rows per fetchmany() in queryRange().
+            rows_per_statement (int): Rows per multi-row INSERT, 1 to use executemany().
+            max_params (int): Most parameters the database allows in one statement.
+        """
+        super(DbApiBackend, self).__init__()
+        self.m_connect = connect
+        self.m_paramstyle = paramstyle
+        self.m_table = table
+        self.m_fetch_size = fetch_size
+        self.m_rows_per_statement = rows_per_statement
+        self.m_max_params = max_params
+        self.m_values_sql = {}
+        self.m_connection = None
+        self.m_lock = threading.RLock()
+
+    def getConnection(self):
+        """ Open connection, connecting on first use. """
+        if self.m_connection is None:
+            self.m_connection = self.m_connect()
+        return self.m_connection
+
+    def dropConnection(self):
+        """ Roll back and close the connection after an error, so the next call reconnects.  Private. """
+        connection = self.m_connection
+        self.m_connection = None
+        if connection is None:
+            return
+        for call in (connection.rollback, connection.close):
+            try:
+                call()
+            except:
+                pass
+
+    def placeholders(self, names):
+        """ Parameter markers for names in the driver paramstyle.  Private. """
+        style = self.m_paramstyle
+        if style == "numeric":
+            return [":" + str(idx + 1) for idx in range(len(names))]
+        if style == "named":
+            return [":" + name for name in names]
+        if style == "format":
+            return ["%s"] * len(names)
+        if style == "pyformat":
+            return ["%(" + name + ")s" for name in names]
+        return ["?"] * len(names)
+
+    def params(self, names, values):
+        """ Parameters for one statement, a dict for named styles.  Private. """
+        if self.m_paramstyle in ("named", "pyformat"):
+            return dict(zip(names, values))
+        return tuple(values)
+
+    def columnSql(self, column):
+        """ SQL type for a column, BIGINT for integers too wide for INT. """
+        if column.Field_Type == FieldType.Int and column.Size > 9:
+            return "BIGINT"
+        return MeterDB.mapTypeToSql(column.Field_Type, column.Size)
+
+    def sqlCreate(self):
+        """ CREATE TABLE statement for the schema. """
+        return ("CREATE TABLE " + self.m_table + " (" +
+                ", ".join([column.Column_Name + " " + self.columnSql(column) for column in self.m_schema]) + ")")
+
+    def sqlCreateIndex(self):
+        """ CREATE INDEX statement for range queries. """
+        return ("CREATE INDEX idx_" + self.m_table.lower() + "_time ON " + self.m_table +
+                " (" + Field.Meter_Address + ", " + Field.Time_Stamp + ")")
+
+    def execute(self, statements):
+        """ Run statements in order and commit.  On error the connection is
+        rolled back and closed, and the next call reconnects.  Private.
+
+        Returns:
+            bool: True if every statement ran.
+        """
+        with self.m_lock:
+            try:
+                connection = self.getConnection()
+                cursor = connection.cursor()
+                try:
+                    for statement in statements:
+                        cursor.execute(statement)
+                    connection.commit()
+                finally:
+                    cursor.close()
+                return True
+            except:
+                ekm_log(traceback.format_exc(), priority=4)
+                self.dropConnection()
+        return False
+
+    def create(self, schema):
+        """ Create the table and its index.  An existing table is kept.
+
+        Args:
+            schema (list): :class:`~ekmmeters.StorageColumn` per column.
+
+        Returns:
+            bool: True if created or already present.
+        """
+        super(DbApiBackend, self).create(schema)
+        self.m_values_sql = {}
+        try:
+            if self.execute([self.sqlCreate()]):
+                self.execute([self.sqlCreateIndex()])
+            return True
+        except:
+            ekm_log(traceback.format_exc())
+            return False
+
+    def sqlInsertValues(self, row_count):
+        """ INSERT statement for row_count rows and its parameter names.  Private.
+
+        Returns:
+            tuple: (statement, names), cached per row_count.
+        """
+        if row_count not in self.m_values_sql:
+            names = self.getColumnNames()
+            flat_names = [name + "_" + str(idx) for idx in range(row_count) for name in names]
+            markers = self.placeholders(flat_names)
+            width = len(names)
+            values = ", ".join(["(" + ", ".join(markers[idx:idx + width]) + ")"
+                                for idx in range(0, len(markers), width)])
+            self.m_values_sql[row_count] = ("INSERT INTO " + self.m_table + " (" + ", ".join(names) +
+                                            ") VALUES " + values, flat_names)
+        return self.m_values_sql[row_count]
+
+    def getRowsPerStatement(self):
+        """ Rows per multi-row INSERT, limited by max_params. """
+        return max(1, min(self.m_rows_per_statement, self.m_max_params // max(1, len(self.m_schema))))
+
+    def bulkWrite(self, cursor, rows):
+        """ Send rows on an open cursor, committed by the caller.
+
+        Override to use a driver's bulk load path.  Uses executemany(),
+        or multi-row INSERT statements if rows_per_statement is above 1.
+
+        Args:
+            cursor (object): DB-API cursor.
+            rows (list): Tuples in schema order.
+        """
+        if self.m_rows_per_statement <= 1:
+            names = self.getColumnNames()
+            qry_str = ("INSERT INTO " + self.m_table + " (" + ", ".join(names) + ") VALUES (" +
+                       ", ".join(self.placeholders(names)) + ")")
+            cursor.executemany(qry_str, [self.params(names, row) for row in rows])
+            return
+        chunk = self.getRowsPerStatement()
+        for start in range(0, len(rows), chunk):
+            batch = rows[start:start + chunk]
+            qry_str, flat_names = self.sqlInsertValues(len(batch))
+            cursor.execute(qry_str, self.params(flat_names, [value for row in batch for value in row]))
+
+    def writeRows(self, rows):
+        """ Insert rows with bulkWrite() and one commit.  On error the
+        connection is rolled back and closed, and the next call reconnects.
+
+        Args:
+            rows (list): Tuples in schema order.
+
+        Returns:
+            int: Rows written, 0 on failure.
+        """
+        if not rows:
+            return 0
+        with self.m_lock:
+            try:
+                connection = self.getConnection()
+                cursor = connection.cursor()
+                try:
+                    self.bulkWrite(cursor, rows)
+                    connection.commit()
+                finally:
+                    cursor.close()
+                return len(rows)
+            except:
+                ekm_log(traceback.format_exc())
+                self.dropConnection()
+        return 0
+
+    def queryRange(self, start_time=None, end_time=None, meter=None):
+        """ Rows with start_time <= Time_Stamp <= end_time, fetched fetch_size at a time.
+
+        Args:
+            start_time (int): Epoch ms, default the first row.
+            end_time (int): Epoch ms, default the last row.
+            meter (str): Optional 12 character meter address.
+
+        Returns:
+            generator: Tuples in schema order, oldest first.
+        """
+        names = self.getColumnNames()
+        conditions = []
+        values = []
+        for name, operator_str, value in ((Field.Time_Stamp, " >= ", start_time),
+                                          (Field.Time_Stamp, " <= ", end_time),
+                                          (Field.Meter_Address, " = ", meter)):
+            if value is not None:
+                values.append(value)
+                conditions.append((name, operator_str))
+        markers = self.placeholders(["p" + str(idx) for idx in range(len(values))])
+        qry_str = "SELECT " + ", ".join(names) + " FROM " + self.m_table
+        if conditions:
+            qry_str += " WHERE " + " AND ".join([name + operator_str + marker for (name, operator_str), marker
+                                                 in zip(conditions, markers)])
+        qry_str += " ORDER BY " + Field.Time_Stamp
+        params = self.params(["p" + str(idx) for idx in range(len(values))], values)
+        with self.m_lock:
+            cursor = self.getConnection().cursor()
+            cursor.execute(qry_str, params)
+            rows = cursor.fetchmany(self.m_fetch_size)
+        try:
+            while rows:
+                for row in rows:
+                    yield tuple(row)
+                with self.m_lock:
+                    rows = cursor.fetchmany(self.m_fetch_size)
+        finally:
+            cursor.close()
+
+    def drop(self):
+        """ Drop the table. """
+        self.execute(["DROP TABLE " + self.m_table])
+
+    def close(self):
+        """ Close the connection. """
+        with self.m_lock:
+            if self.m_connection is not None:
+                try:
+                    self.m_connection.close()
+                except:
+                    ekm_log(traceback.format_exc())
+                self.m_connection = None
+
+
+class SqliteBackend(DbApiBackend):
+    """ :class:`~ekmmeters.DbApiBackend` for a sqlite file. """
+
+    def __init__(self, connection_string="default.db", table="Meter_Reads", rows_per_statement=1):
+        """
+        Args:
+            connection_string (str): Name of sqlite database file.
+            table (str): Table name.
+            rows_per_statement (int): Rows per multi-row INSERT, 1 to use executemany().
+        """
+        super(SqliteBackend, self).__init__(
+            lambda: sqlite3.connect(connection_string, check_same_thread=False), "qmark", table,
+            rows_per_statement=rows_per_statement)
+        self.m_connection_string = connection_string
+
+    def sqlCreate(self):
+        """ CREATE TABLE IF NOT EXISTS statement for the schema. """
+        return super(SqliteBackend, self).sqlCreate().replace("CREATE TABLE ", "CREATE TABLE IF NOT EXISTS ", 1)
+
+    def sqlCreateIndex(self):
+        """ CREATE INDEX IF NOT EXISTS statement for range queries. """
+        return super(SqliteBackend, self).sqlCreateIndex().replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", 1)
+
+    def drop(self):
+        """ Drop the table if it exists. """
+        self.execute(["DROP TABLE IF EXISTS " + self.m_table])
+
+
+class PostgresBackend(DbApiBackend):
+    """ :class:`~ekmmeters.DbApiBackend` loading batches with PostgreSQL COPY.
+
+    Each batch is streamed as one COPY ... FROM STDIN in CSV format, through
+    copy_expert() with psycopg2 or copy() with psycopg 3.  Other drivers, or
+    use_copy=False, fall back to multi-row INSERT ... VALUES statements::
+
+        backend = PostgresBackend(lambda: psycopg2.connect(dsn))
+        backend_db = BackendMeterDB(backend, batch_size=5000)
+    """
+
+    def __init__(self, connect, table="Meter_Reads", use_copy=True, rows_per_statement=500,
+                 paramstyle="format"):
+        """
+        Args:
+            connect (function): No argument function returning a DB-API 2.0 connection.
+            table (str): Table name.
+            use_copy (bool): Use COPY when the driver supports it.
+            rows_per_statement (int): Rows per multi-row INSERT without COPY.
+            paramstyle (str): Driver paramstyle, format for psycopg2 and psycopg 3.
+        """
+        super(PostgresBackend, self).__init__(connect, paramstyle, table,
+                                              rows_per_statement=rows_per_statement, max_params=65535)
+        self.m_use_copy = use_copy
+
+    def sqlCreate(self):
+        """ CREATE TABLE IF NOT EXISTS statement for the schema. """
+        return super(PostgresBackend, self).sqlCreate().replace("CREATE TABLE ", "CREATE TABLE IF NOT EXISTS ", 1)
+
+    def sqlCreateIndex(self):
+        """ CREATE INDEX IF NOT EXISTS statement for range queries. """
+        return super(PostgresBackend, self).sqlCreateIndex().replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", 1)
+
+    def sqlCopy(self):
+        """ COPY statement reading CSV rows from the client. """
+        return ("COPY " + self.m_table + " (" + ", ".join(self.getColumnNames()) +
+                ") FROM STDIN WITH (FORMAT csv)")
+
+    @staticmethod
+    def copyData(rows):
+        """ COPY CSV text for rows.  Strings are always quoted so None, written
+        as an empty unquoted value, loads as NULL and "" as an empty string.
+
+        Args:
+            rows (list): Tuples in schema order.
+
+        Returns:
+            str: One line per row.
+        """
+        lines = []
+        for row in rows:
+            values = []
+            for value in row:
+                if value is None:
+                    values.append("")
+                elif isinstance(value, str):
+                    values.append('"' + value.replace('"', '""') + '"')
+                else:
+                    values.append(repr(value))
+            lines.append(",".join(values))
+        lines.append("")
+        return "\n".join(lines)
+
+    def bulkWrite(self, cursor, rows):
+        """ Send rows with COPY if available, else multi-row INSERT.
+
+        Args:
+            cursor (object): DB-API cursor.
+            rows (list): Tuples in schema order.
+        """
+        if self.m_use_copy and hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(self.sqlCopy(), io.StringIO(self.copyData(rows)))
+        elif self.m_use_copy and hasattr(cursor, "copy"):
+            with cursor.copy(self.sqlCopy()) as copy:
+                copy.write(self.copyData(rows))
+        else:
+            super(PostgresBackend, self).bulkWrite(cursor, rows)
+
+
+class FileSinkBackend(StorageBackend):
+    """ :class:`~ekmmeters.StorageBackend` appending rows to a CSV or NDJSON file.
+
+    Each batch is one buffered write.  queryRange() scans the whole file,
+    so this backend suits export and archiving rather than queries.
+    """
+
+    def __init__(self, path, fmt=ExportFormat.Ndjson):
+        """
+        Args:
+            path (str): File to append to.
+            fmt (str): ExportFormat.Csv or ExportFormat.Ndjson.
+        """
+        super(FileSinkBackend, self).__init__()
+        self.m_path = path
+        self.m_format = fmt
+        self.m_lock = threading.Lock()
+
+    def create(self, schema):
+        """ Set the schema, writing a CSV header if the file is new.
+
+        Args:
+            schema (list): :class:`~ekmmeters.StorageColumn` per column.
+
+        Returns:
+            bool: True on success.
+        """
+        super(FileSinkBackend, self).create(schema)
+        try:
+            with self.m_lock:
+                if self.m_format == ExportFormat.Csv and not os.path.exists(self.m_path):
+                    with open(self.m_path, "w", newline="") as sink:
+                        csv.writer(sink).writerow(self.getColumnNames())
+            return True
+        except:
+            ekm_log(traceback.format_exc())
+            return False
+
+    def writeRows(self, rows):
+        """ Append rows with one write.
+
+        Args:
+            rows (list): Tuples in schema order.
+
+        Returns:
+            int: Rows written, 0 on failure.
+        """
+        try:
+            with self.m_lock:
+                if self.m_format == ExportFormat.Csv:
+                    with open(self.m_path, "a", newline="") as sink:
+                        csv.writer(sink).writerows(rows)
+                else:
+                    names = self.getColumnNames()
+                    with open(self.m_path, "a") as sink:
+                        sink.write("".join([json.dumps(dict(zip(names, row))) + "\n" for row in rows]))
+            return len(rows)
+        except:
             ekm_log(traceback.format_exc())
+        return 0
+
+    def parseRow(self, values):
+        """ Typed row from CSV strings, empty as None.  Private. """
+        row = []
+        for column, value in zip(self.m_schema, values):
+            if value == "":
+                row.append(None)
+            elif column.Field_Type == FieldType.Float:
+                row.append(float(value))
+            elif column.Field_Type == FieldType.Int:
+                row.append(int(value))
+            else:
+                row.append(value)
+        return tuple(row)
 
-        return response_str
+    def queryRange(self, start_time=None, end_time=None, meter=None):
+        """ Rows with start_time <= Time_Stamp <= end_time, scanning the file.
 
+        Args:
+            start_time (int): Epoch ms, default the first row.
+            end_time (int): Epoch ms, default the last row.
+            meter (str): Optional 12 character meter address.
 
-class MeterDB(object):
-    """ Base class for single-table reads database abstraction."""
+        Returns:
+            generator: Tuples in schema order, in file order.
+        """
+        names = self.getColumnNames()
+        time_idx = names.index(Field.Time_Stamp)
+        address_idx = names.index(Field.Meter_Address)
+        if not os.path.exists(self.m_path):
+            return
+        with open(self.m_path, newline="" if self.m_format == ExportFormat.Csv else None) as sink:
+            if self.m_format == ExportFormat.Csv:
+                reader = csv.reader(sink)
+                next(reader, None)
+                rows = (self.parseRow(values) for values in reader)
+            else:
+                rows = (tuple(json.loads(line).get(name) for name in names) for line in sink if line.strip())
+            for row in rows:
+                if start_time is not None and row[time_idx] < start_time:
+                    continue
+                if end_time is not None and row[time_idx] > end_time:
+                    continue
+                if meter is not None and row[address_idx] != meter:
+                    continue
+                yield row
+
+    def drop(self):
+        """ Delete the file. """
+        with self.m_lock:
+            if os.path.exists(self.m_path):
+                os.remove(self.m_path)
+
+
+class BackendMeterDB(MeterDB):
+    """ MeterDB which stores reads through a :class:`~ekmmeters.StorageBackend`.
+
+    Meter.insert() rows are buffered and written in one bulk call when
+    batch_size rows are waiting or the oldest has waited flush_seconds,
+    and on flush() or close().  There is no SQL, so dbExec() and the
+    summary table calls return False.
+
+    After a failed write, inserts only buffer for flush_seconds before the
+    next try, and at most max_rows rows are kept, the oldest dropped and
+    counted in getDroppedCount().  This rides out a brief hiccup without
+    blocking polling; to keep reads through a real outage, put a
+    :class:`~ekmmeters.SpoolMeterDB` in front.
+    """
 
-    def __init__(self, connection_string):
+    def __init__(self, backend, batch_size=100, flush_seconds=5.0, max_rows=10000):
         """
         Args:
-            connection_string (str): database appropriate connection string
+            backend (StorageBackend): Where rows are written.
+            batch_size (int): Rows per bulk write.
+            flush_seconds (float): Longest a buffered row waits for an insert to flush it,
+                and the wait after a failed write.
+            max_rows (int): Most rows buffered while writes fail.
         """
-        self.m_connection_string = connection_string
-        self.m_all_fields = SerialBlock()
-        self.combineAB()
-        pass
+        super(BackendMeterDB, self).__init__("")
+        self.m_backend = backend
+        self.m_batch_size = batch_size
+        self.m_flush_seconds = flush_seconds
+        self.m_max_rows = max(batch_size, max_rows)
+        self.m_schema = StorageBackend.makeSchema(self.m_all_fields)
+        self.m_rows = []
+        self.m_first_buffered = 0.0
+        self.m_retry_at = 0.0
+        self.m_dropped = 0
+        self.m_lock = threading.Lock()
+        if not backend.getSchema():
+            backend.m_schema = list(self.m_schema)
+
+    def getBackend(self):
+        """ :class:`~ekmmeters.StorageBackend` in use. """
+        return self.m_backend
+
+    def dbExec(self, query_str):
+        """ No SQL through a backend.
+
+        Returns:
+            bool: Always False.
+        """
+        ekm_log("BackendMeterDB does not run SQL: " + query_str, priority=4)
+        return False
+
+    def dbCreate(self):
+        """ Create backend storage for the read schema. """
+        return self.m_backend.create(self.m_schema)
+
+    def dbDropReads(self):
+        """ Remove all rows from the backend. """
+        with self.m_lock:
+            self.m_rows = []
+        self.m_backend.drop()
+
+    def makeRow(self, def_buf, raw_a, raw_b, time_stamp=None):
+        """ Schema order row for one read.  Private. """
+        row = []
+        native = MeterData.NativeValue
+        for column in self.m_schema[:-3]:
+            val = def_buf.get(column.Column_Name)
+            row.append(val[native] if val is not None else None)
+        row.append(int(time.time() * 1000) if time_stamp is None else int(time_stamp))
+        row.append(str2hex(raw_a))
+        row.append(str2hex(raw_b))
+        return tuple(row)
+
+    def dbInsert(self, def_buf, raw_a, raw_b, time_stamp=None):
+        """ Buffer one read, writing the batch when full or old enough.
 
-    def setConnectString(self, connection_string):
-        """ Setter for connection string.
         Args:
-            connection_string (str): Connection string.
+            def_buf (SerialBlock): Read buffer.
+            raw_a (str): Raw A read.
+            raw_b (str): Raw B read or empty.
+            time_stamp (int): Optional epoch ms of the read, default now.
+
+        Returns:
+            bool: True if buffered, and written if a write was due.
         """
-        self.m_connection_string = connection_string
-        pass
+        row = self.makeRow(def_buf, raw_a, raw_b, time_stamp)
+        with self.m_lock:
+            now = time.time()
+            if not self.m_rows:
+                self.m_first_buffered = now
+            self.m_rows.append(row)
+            self.trimRows()
+            due = (now >= self.m_retry_at and
+                   (len(self.m_rows) >= self.m_batch_size or
+                    now - self.m_first_buffered >= self.m_flush_seconds))
+        if due:
+            return self.flush()
+        return True
 
-    def combineAB(self):
-        """ Use the serial block definitions in V3 and V4 to create one field list. """
-        v4definition_meter = V4Meter()
-        v4definition_meter.makeAB()
-        defv4 = v4definition_meter.getReadBuffer()
+    def trimRows(self):
+        """ Drop the oldest buffered rows past max_rows.  Private, call with m_lock held. """
+        over = len(self.m_rows) - self.m_max_rows
+        if over > 0:
+            del self.m_rows[:over]
+            self.m_dropped += over
+            ekm_log("BackendMeterDB buffer full, dropped %d rows.", over)
 
-        v3definition_meter = V3Meter()
-        v3definition_meter.makeReturnFormat()
-        defv3 = v3definition_meter.getReadBuffer()
+    def flush(self):
+        """ Write buffered rows now.
 
-        for fld in defv3:
-            if fld not in self.m_all_fields:
-                compare_fld = fld.upper()
-                if not "RESERVED" in compare_fld and not "CRC" in compare_fld:
-                    self.m_all_fields[fld] = defv3[fld]
+        Returns:
+            bool: True if every buffered row was written.  Rows which failed
+            stay buffered, up to max_rows, and inserts wait flush_seconds
+            before the next try.
+        """
+        metrics = ekmmeters_metrics
+        with self.m_lock:
+            rows = self.m_rows
+            self.m_rows = []
+        if not rows:
+            return True
+        if metrics:
+            start = time.perf_counter()
+        written = self.m_backend.writeRows(rows)
+        if metrics:
+            metrics.observe(Metric.DbInsertSeconds, time.perf_counter() - start, "")
+        if written != len(rows):
+            with self.m_lock:
+                self.m_rows = rows + self.m_rows
+                self.m_retry_at = time.time() + self.m_flush_seconds
+                self.trimRows()
+            return False
+        self.m_retry_at = 0.0
+        return True
 
-        for fld in defv4:
-            if fld not in self.m_all_fields:
-                compare_fld = fld.upper()
-                if not "RESERVED" in compare_fld and not "CRC" in compare_fld:
-                    self.m_all_fields[fld] = defv4[fld]
-        pass
+    def dbInsertBatch(self, reads):
+        """ Write buffered rows, then several reads in one backend write.
 
-    @staticmethod
-    def mapTypeToSql(fld_type=FieldType.NoType, fld_len=0):
-        """ Translate FieldType to portable SQL Type.  Override if needful.
         Args:
-            fld_type (int): :class:`~ekmmeters.FieldType` in serial block.
-            fld_len (int): Binary length in serial block
+            reads (iterable): (def_buf, raw_a, raw_b, time_stamp) per read.
 
         Returns:
-            string: Portable SQL type and length where appropriate.
+            int: Reads written, all or none.
         """
-        if fld_type == FieldType.Float:
-            return "FLOAT"
-        elif fld_type == FieldType.String:
-            return "VARCHAR(" + str(fld_len) + ")"
-        elif fld_type == FieldType.Int:
-            return "INT"
-        elif fld_type == FieldType.Hex:
-            return "VARCHAR(" + str(fld_len * 2) + ")"
-        elif fld_type == FieldType.PowerFactor:
-            return "VARCHAR(" + str(fld_len) + ")"
-        else:
-            ekm_log("Type " + str(type) + " not handled by mapTypeToSql, returned VARCHAR(255)")
-            return "VARCHAR(255)"
+        if not self.flush():
+            return 0
+        rows = [self.makeRow(def_buf, raw_a, raw_b, time_stamp) for def_buf, raw_a, raw_b, time_stamp in reads]
+        if rows and self.m_backend.writeRows(rows) != len(rows):
+            return 0
+        return len(rows)
+
+    def getBufferedCount(self):
+        """ Rows waiting for the next write. """
+        return len(self.m_rows)
+
+    def getDroppedCount(self):
+        """ Rows dropped to stay under max_rows since construction. """
+        return self.m_dropped
+
+    def queryRange(self, start_time=None, end_time=None, meter=None):
+        """ Flush, then rows from the backend with start_time <= Time_Stamp <= end_time.
 
-    def fillCreate(self, qry_str):
-        """ Return query portion below CREATE.
         Args:
-            qry_str (str): String as built.
+            start_time (int): Epoch ms, default the first row.
+            end_time (int): Epoch ms, default the last row.
+            meter (str): Optional 12 character meter address.
 
         Returns:
-            string: Passed string with fields appended.
+            iterable: Tuples in :func:`~ekmmeters.BackendMeterDB.getColumnNames` order.
         """
-        count = 0
-        for fld in self.m_all_fields:
-            fld_type = self.m_all_fields[fld][MeterData.TypeValue]
-            fld_len = self.m_all_fields[fld][MeterData.SizeValue]
-            qry_spec = self.mapTypeToSql(fld_type, fld_len)
-            if count > 0:
-                qry_str += ", \n"
-            qry_str = qry_str + '   ' + fld + ' ' + qry_spec
-            count += 1
+        self.flush()
+        return self.m_backend.queryRange(start_time, end_time, meter)
+
+    def getColumnNames(self):
+        """ Column names of queryRange() rows. """
+        return [column.Column_Name for column in self.m_schema]
+
+    def close(self):
+        """ Flush and close the backend. """
+        self.flush()
+        self.m_backend.close()
+
+
+class SpoolMeterDB(MeterDB):
+    """ MeterDB subclass spooling reads to local files in front of another MeterDB.
+
+    dbInsert() only appends the read to the newest spool segment, so
+    polling never waits on the database.  A drain thread sends spooled
+    reads to the wrapped MeterDB with dbInsertBatch(), batch_size at a
+    time, and deletes each segment once all of its reads are stored.  While
+    the database is unreachable reads accumulate, and draining is retried
+    with a backoff doubling from retry_seconds to max_retry_seconds.
+
+    Each record is struct "<IIqH" (CRC-32, raw length, Time_Stamp in ms,
+    raw A length) followed by the raw A and B reads, which are decoded
+    again for the wrapped MeterDB with their original Time_Stamp.  The
+    drain position is saved after every batch, so delivery is at least
+    once: a batch stored just before a crash is sent again on restart.
+    When the spool would grow past max_bytes the oldest segment is deleted
+    and its reads counted in Metric.SpoolDropped.  A read which does not
+    decode is appended to spool.dead.  A read the database refuses is
+    retried with the same backoff, and only once it has been refused on
+    max_refusals drain passes, with a later read stored on the last, is it
+    moved to spool.dead so it cannot hold up the reads behind it.  A
+    transient error therefore never costs a good read.  The connection
+    string is the spool directory.  dbExec() goes straight to the wrapped
+    MeterDB.
+    """
 
-        qry_str += (",\n\t" + Field.Time_Stamp + " BIGINT,\n\t" +
-                    "Raw_A VARCHAR(512),\n\t" +
-                    "Raw_B VARCHAR(512)\n)")
+    m_header = struct.Struct("<IIqH")
 
-        return qry_str
+    def __init__(self, meter_db, connection_string="spool", max_bytes=256 * 1024 * 1024,
+                 segment_bytes=8 * 1024 * 1024, batch_size=500, drain_seconds=1.0,
+                 retry_seconds=5.0, max_retry_seconds=300.0, sync=False, start=True, max_refusals=3):
+        """
+        Args:
+            meter_db (MeterDB): Database the spooled reads are drained to.
+            connection_string (str): Directory for the spool segments.
+            max_bytes (int): Most disk used by the spool.
+            segment_bytes (int): Segment size before starting a new one.
+            batch_size (int): Reads per dbInsertBatch() call.
+            drain_seconds (float): Drain thread wake interval.
+            retry_seconds (float): First wait after a failed batch.
+            max_retry_seconds (float): Longest wait between retries.
+            sync (bool): fsync() after every record, for power loss safety.
+            start (bool): Start the drain thread.
+            max_refusals (int): Drain passes a read may be refused before it is dead lettered.
+        """
+        super(SpoolMeterDB, self).__init__(connection_string)
+        self.m_meter_db = meter_db
+        self.m_max_bytes = max_bytes
+        self.m_segment_bytes = min(segment_bytes, max(1, max_bytes // 2))
+        self.m_batch_size = batch_size
+        self.m_drain_seconds = drain_seconds
+        self.m_retry_seconds = retry_seconds
+        self.m_max_retry_seconds = max_retry_seconds
+        self.m_max_refusals = max(1, max_refusals)
+        self.m_refused = (None, 0)
+        self.m_sync = sync
+        self.m_segments = None
+        self.m_file = None
+        self.m_read_offset = 0
+        self.m_read_index = 0
+        self.m_pending = 0
+        self.m_bytes = 0
+        self.m_drained = 0
+        self.m_dropped = 0
+        self.m_failures = 0
+        self.m_dead_letters = 0
+        self.m_rejected = 0
+        self.m_backoff = 0.0
+        self.m_retry_at = 0.0
+        self.m_lock = threading.RLock()
+        self.m_drain_lock = threading.Lock()
+        self.m_wake = threading.Event()
+        self.m_stopped = False
+        self.m_thread = None
+        try:
+            self.openSpool()
+        except:
+            ekm_log(traceback.format_exc())
+        if start:
+            self.m_thread = threading.Thread(target=self.drainLoop, name="ekm-spool")
+            self.m_thread.daemon = True
+            self.m_thread.start()
+
+    def getMeterDB(self):
+        """ Wrapped :class:`~ekmmeters.MeterDB`. """
+        return self.m_meter_db
+
+    def segmentPath(self, number):
+        """ Path of a spool segment.  Private. """
+        return os.path.join(self.m_connection_string, "spool_%06d.dat" % number)
+
+    def scanSegment(self, path):
+        """ Count the whole records in a segment, truncating anything after them.  Private.
 
-    def sqlCreate(self):
-        """ Reasonably portable SQL CREATE for defined fields.
         Returns:
-            string: Portable as possible SQL Create for all-reads table.
+            tuple: (records, bytes).
         """
+        with open(path, "rb") as segment_file:
+            data = segment_file.read()
+        offset = 0
         count = 0
-        qry_str = "CREATE TABLE Meter_Reads ( \n\r"
-        qry_str = self.fillCreate(qry_str)
-        ekm_log(qry_str, 4)
-        return qry_str
+        header = self.m_header
+        while offset + header.size <= len(data):
+            crc, raw_len, time_stamp, len_a = header.unpack_from(data, offset)
+            end = offset + header.size + raw_len
+            if end > len(data) or zlib.crc32(data[offset + 4:end]) != crc:
+                break
+            offset = end
+            count += 1
+        if offset < len(data):
+            ekm_log("Spool segment " + path + " truncated to " + str(offset) + " bytes.")
+            with open(path, "r+b") as segment_file:
+                segment_file.truncate(offset)
+        return count, offset
+
+    def openSpool(self):
+        """ Open the spool directory, resuming from the saved drain position.  Private. """
+        with self.m_lock:
+            if self.m_segments is not None:
+                return
+            if not os.path.isdir(self.m_connection_string):
+                os.makedirs(self.m_connection_string)
+            position = (0, 0, 0)
+            position_path = os.path.join(self.m_connection_string, "spool.pos")
+            if os.path.exists(position_path):
+                with open(position_path) as position_file:
+                    position = tuple(int(val) for val in position_file.read().split())
+            segments = []
+            for name in sorted(os.listdir(self.m_connection_string)):
+                if not (name.startswith("spool_") and name.endswith(".dat")):
+                    continue
+                number = int(name[6:-4])
+                path = os.path.join(self.m_connection_string, name)
+                if number < position[0]:
+                    os.remove(path)
+                    continue
+                count, size = self.scanSegment(path)
+                segments.append([number, count, size])
+            self.m_segments = segments
+            if segments and segments[0][0] == position[0]:
+                self.m_read_offset = min(position[1], segments[0][2])
+                self.m_read_index = min(position[2], segments[0][1])
+            self.m_pending = sum(segment[1] for segment in segments) - self.m_read_index
+            self.m_bytes = sum(segment[2] for segment in segments)
+            if segments:
+                self.m_file = open(self.segmentPath(segments[-1][0]), "ab")
+            self.updateGauges()
+
+    def writePosition(self):
+        """ Save the drain position: head segment, byte offset and record index.  Private. """
+        number = self.m_segments[0][0] if self.m_segments else 0
+        position_path = os.path.join(self.m_connection_string, "spool.pos")
+        with open(position_path + ".tmp", "w") as position_file:
+            position_file.write("%d %d %d\n" % (number, self.m_read_offset, self.m_read_index))
+        os.replace(position_path + ".tmp", position_path)
+
+    def updateGauges(self):
+        """ Publish pending reads and disk use.  Private. """
+        metrics = ekmmeters_metrics
+        if metrics:
+            metrics.setGauge(Metric.SpoolPending, self.m_pending, self.m_connection_string)
+            metrics.setGauge(Metric.SpoolBytes, self.m_bytes, self.m_connection_string)
+
+    def removeHead(self):
+        """ Delete the oldest segment and reset the drain position.  Private.
+
+        Returns:
+            int: Reads in it which were not drained.
+        """
+        number, count, size = self.m_segments.pop(0)
+        lost = count - self.m_read_index
+        self.m_pending -= lost
+        self.m_bytes -= size
+        self.m_read_offset = 0
+        self.m_read_index = 0
+        os.remove(self.segmentPath(number))
+        self.writePosition()
+        return lost
+
+    def dbInsert(self, def_buf, raw_a, raw_b, time_stamp=None):
+        """ Append one read to the spool.  Never waits on the wrapped MeterDB.
 
-    @staticmethod
-    def sqlInsert(def_buf, raw_a, raw_b):
-        """ Reasonably portable SQL INSERT for from combined read buffer.
         Args:
-            def_buf (SerialBlock): Database only serial block of all fields.
-            raw_a (str): Raw A read as hex string.
-            raw_b (str): Raw B read (if exists, otherwise empty) as hex string.
+            def_buf (SerialBlock): Read buffer, unused as the raw reads are kept.
+            raw_a (str): Raw A read.
+            raw_b (str): Raw B read or empty.
+            time_stamp (int): Optional epoch ms of the read, default now.
 
         Returns:
-            str: SQL insert for passed read buffer
+            bool: True if spooled, False if the raw reads are not 255
+            characters (raw_b may be empty) or the spool cannot be written.
         """
-        count = 0
-        qry_str = "INSERT INTO  Meter_Reads ( \n\t"
-        for fld in def_buf:
-            if count > 0:
-                qry_str += ", \n\t"
-            qry_str = qry_str + fld
-            count += 1
-        qry_str += (",\n\t" + Field.Time_Stamp + ", \n\t" +
-                    "Raw_A,\n\t" +
-                    "Raw_B\n) \n" +
-                    "VALUES( \n\t")
-        count = 0
-        for fld in def_buf:
-            if count > 0:
-                qry_str += ", \n\t"
-            fld_type = def_buf[fld][MeterData.TypeValue]
-            fld_str_content = def_buf[fld][MeterData.StringValue]
-            delim = ""
-            if (fld_type == FieldType.Hex) or \
-                    (fld_type == FieldType.String) or \
-                    (fld_type == FieldType.PowerFactor):
-                delim = "'"
-            qry_str = qry_str + delim + fld_str_content + delim
-            count += 1
-        time_val = int(time.time() * 1000)
-        qry_str = (qry_str + ",\n\t" + str(time_val) + ",\n\t'" +
-                   str2hex(raw_a) + "'" + ",\n\t'" +
-                   str2hex(raw_b) + "'\n);")
-        ekm_log(qry_str, 4)
-        return qry_str
+        if len(raw_a) != 255 or len(raw_b) not in (0, 255):
+            self.m_rejected += 1
+            ekm_log("Spool rejected read with raw lengths " + str(len(raw_a)) + ", " + str(len(raw_b)) + ".")
+            return False
+        if time_stamp is None:
+            time_stamp = int(time.time() * 1000)
+        try:
+            raw = raw_a.encode("latin-1") + raw_b.encode("latin-1")
+            body = self.m_header.pack(0, len(raw), time_stamp, len(raw_a))[4:] + raw
+            record = struct.pack("<I", zlib.crc32(body)) + body
+            with self.m_lock:
+                self.openSpool()
+                segments = self.m_segments
+                if not segments or (segments[-1][1] and segments[-1][2] + len(record) > self.m_segment_bytes):
+                    if self.m_file is not None:
+                        self.m_file.close()
+                    segments.append([segments[-1][0] + 1 if segments else 1, 0, 0])
+                    self.m_file = open(self.segmentPath(segments[-1][0]), "ab")
+                while self.m_bytes + len(record) > self.m_max_bytes and len(segments) > 1:
+                    lost = self.removeHead()
+                    self.m_dropped += lost
+                    ekm_log("Spool full, dropped " + str(lost) + " reads.")
+                    if ekmmeters_metrics:
+                        ekmmeters_metrics.inc(Metric.SpoolDropped, self.m_connection_string, lost)
+                self.m_file.write(record)
+                self.m_file.flush()
+                if self.m_sync:
+                    os.fsync(self.m_file.fileno())
+                segments[-1][1] += 1
+                segments[-1][2] += len(record)
+                self.m_pending += 1
+                self.m_bytes += len(record)
+                self.updateGauges()
+                if self.m_pending >= self.m_batch_size:
+                    self.m_wake.set()
+            return True
+        except:
+            ekm_log(traceback.format_exc())
+        return False
+
+    def readBatch(self):
+        """ Up to batch_size undrained records from the oldest segment.  Private.
 
-    @staticmethod
-    def sqlIdxMeterTime():
-        """ Reasonably portable Meter_Address and Time_Stamp index SQL create.
         Returns:
-            str: SQL CREATE INDEX statement.
+            tuple: (segment number, [(time_stamp, raw_a, raw_b, end offset, record), ...]).
         """
-        return ("CREATE INDEX idx_meter_time " +
-                "ON Meter_Reads('" + Field.Meter_Address + "', '" +
-                Field.Time_Stamp + "')")
+        with self.m_lock:
+            self.openSpool()
+            segments = self.m_segments
+            while len(segments) > 1 and self.m_read_index >= segments[0][1]:
+                self.removeHead()
+            if not segments or self.m_read_index >= segments[0][1]:
+                return 0, []
+            number, count, size = segments[0]
+            with open(self.segmentPath(number), "rb") as segment_file:
+                segment_file.seek(self.m_read_offset)
+                data = segment_file.read(size - self.m_read_offset)
+        records = []
+        header = self.m_header
+        offset = 0
+        for idx in range(min(self.m_batch_size, count - self.m_read_index)):
+            crc, raw_len, time_stamp, len_a = header.unpack_from(data, offset)
+            end = offset + header.size + raw_len
+            raw = data[offset + header.size:end].decode("latin-1")
+            records.append((time_stamp, raw[:len_a], raw[len_a:], self.m_read_offset + end, data[offset:end]))
+            offset = end
+        return number, records
+
+    def advance(self, number, end_offset, count):
+        """ Move the drain position past count records ending at end_offset.  Private. """
+        with self.m_lock:
+            if count and self.m_segments and self.m_segments[0][0] == number:
+                self.m_read_offset = end_offset
+                self.m_read_index += count
+                self.m_pending -= count
+                self.writePosition()
+            self.updateGauges()
+
+    def deadLetter(self, record):
+        """ Append a record which cannot be decoded or stored to spool.dead.  Private. """
+        self.m_dead_letters += 1
+        ekm_log("Spooled read moved to dead letter file.")
+        try:
+            with open(os.path.join(self.m_connection_string, "spool.dead"), "ab") as dead_file:
+                dead_file.write(record)
+        except:
+            ekm_log(traceback.format_exc())
+        if ekmmeters_metrics:
+            ekmmeters_metrics.inc(Metric.SpoolDeadLetters, self.m_connection_string)
+
+    def insertOne(self, record):
+        """ Store one spooled record alone.  Private.
 
-    @staticmethod
-    def sqlIdxMeter():
-        """ Reasonably portable Meter_Address index SQL create.
         Returns:
-            str: SQL CREATE INDEX statement.
+            bool: True if stored, False if refused, None if it does not decode.
         """
-        return ("CREATE INDEX idx_meter " +
-                "ON Meter_Reads('" + Field.Meter_Address + "')")
+        time_stamp, raw_a, raw_b = record[:3]
+        try:
+            def_buf = self.decodeRaw(raw_a, raw_b)
+        except:
+            ekm_log(traceback.format_exc())
+            return None
+        try:
+            return self.m_meter_db.dbInsertBatch([(def_buf, raw_a, raw_b, time_stamp)]) == 1
+        except:
+            ekm_log(traceback.format_exc())
+        return False
+
+    def drainBatch(self, number, records):
+        """ Store one batch, falling back to one record at a time if the batch fails.  Private.
+
+        A record which does not decode is moved to the dead letter file.  A
+        refused record stops draining there, for a retry after the backoff.
+        Once the same record has been refused max_refusals times, the next
+        decodable record is tried: if it is stored the refused record is
+        moved to the dead letter file, if not the database is down.
 
-    @staticmethod
-    def sqlDrop():
-        """ Reasonably portable drop of reads table.
         Returns:
-            str: SQL DROP TABLE statement.
+            tuple: (records stored, True if the batch was used up).
         """
-        qry_str = 'DROP TABLE Meter_Reads'
-        return qry_str
+        undecodable = []
+
+        def reads():
+            for time_stamp, raw_a, raw_b, end, record in records:
+                try:
+                    def_buf = self.decodeRaw(raw_a, raw_b)
+                except:
+                    ekm_log(traceback.format_exc())
+                    undecodable.append(record)
+                    return
+                yield def_buf, raw_a, raw_b, time_stamp
+
+        try:
+            stored = self.m_meter_db.dbInsertBatch(reads())
+        except:
+            ekm_log(traceback.format_exc())
+            stored = 0
+        if stored:
+            self.advance(number, records[stored - 1][3], stored)
+        idx = stored
+        while idx < len(records):
+            result = self.insertOne(records[idx])
+            if result:
+                stored += 1
+                self.advance(number, records[idx][3], 1)
+                idx += 1
+                continue
+            if result is None:
+                self.deadLetter(records[idx][4])
+                self.advance(number, records[idx][3], 1)
+                idx += 1
+                continue
+            position = (number, records[idx][3])
+            refusals = self.m_refused[1] + 1 if self.m_refused[0] == position else 1
+            self.m_refused = (position, refusals)
+            if refusals < self.m_max_refusals:
+                return stored, False
+            probe = idx + 1
+            while probe < len(records):
+                result = self.insertOne(records[probe])
+                if result is not None:
+                    break
+                probe += 1
+            if probe >= len(records) or not result:
+                return stored, False
+            for dead_idx in range(idx, probe):
+                self.deadLetter(records[dead_idx][4])
+            self.m_refused = (None, 0)
+            stored += 1
+            self.advance(number, records[probe][3], probe + 1 - idx)
+            idx = probe + 1
+        return stored, True
+
+    def drain(self):
+        """ Send spooled reads to the wrapped MeterDB until empty or the database refuses them.
+
+        Returns:
+            int: Reads stored.
+        """
+        metrics = ekmmeters_metrics
+        total = 0
+        with self.m_drain_lock:
+            while True:
+                number, records = self.readBatch()
+                if not records:
+                    break
+                count, used = self.drainBatch(number, records)
+                self.m_drained += count
+                total += count
+                if metrics and count:
+                    metrics.inc(Metric.SpoolDrained, self.m_connection_string, count)
+                if not used:
+                    self.m_failures += 1
+                    self.m_backoff = min(max(self.m_backoff * 2, self.m_retry_seconds), self.m_max_retry_seconds)
+                    self.m_retry_at = time.time() + self.m_backoff
+                    ekm_log("Spool drain failed, retry in " + str(self.m_backoff) + "s.")
+                    if metrics:
+                        metrics.inc(Metric.SpoolFailures, self.m_connection_string)
+                    return total
+            self.m_backoff = 0.0
+            self.m_retry_at = 0.0
+        return total
+
+    def drainLoop(self):
+        """ Drain thread body.  Private. """
+        while not self.m_stopped:
+            self.m_wake.wait(self.m_drain_seconds)
+            self.m_wake.clear()
+            if self.m_stopped or time.time() < self.m_retry_at:
+                continue
+            try:
+                self.drain()
+            except:
+                ekm_log(traceback.format_exc())
+
+    def stop(self, drain=True, wait=None):
+        """ Stop the drain thread and close the spool.  Spooled reads are kept for the next start.
 
-    def dbInsert(self, def_buf, raw_a, raw_b):
-        """ Call overridden dbExec() with built insert statement.
         Args:
-            def_buf (SerialBlock): Block of read buffer fields to write.
-            raw_a (str): Hex string of raw A read.
-            raw_b (str): Hex string of raw B read or empty.
+            drain (bool): Try one last drain first.
+            wait (float): Optional seconds to wait for the thread.
         """
-        self.dbExec(self.sqlInsert(def_buf, raw_a, raw_b))
+        self.m_stopped = True
+        self.m_wake.set()
+        if self.m_thread is not None:
+            self.m_thread.join(wait)
+            self.m_thread = None
+        if drain:
+            self.drain()
+        with self.m_lock:
+            if self.m_file is not None:
+                self.m_file.close()
+                self.m_file = None
+            self.m_segments = None
+
+    def getPendingCount(self):
+        """ Reads waiting to be drained. """
+        return self.m_pending
+
+    def getSpoolBytes(self):
+        """ Bytes in spool segments, including drained reads in the oldest. """
+        return self.m_bytes
+
+    def getDrainedCount(self):
+        """ Reads stored in the wrapped MeterDB since construction. """
+        return self.m_drained
+
+    def getDroppedCount(self):
+        """ Reads dropped to stay under max_bytes since construction. """
+        return self.m_dropped
+
+    def getFailureCount(self):
+        """ Drain batches which failed since construction. """
+        return self.m_failures
+
+    def getDeadLetterCount(self):
+        """ Reads moved to spool.dead since construction. """
+        return self.m_dead_letters
+
+    def getRejectedCount(self):
+        """ Reads refused by dbInsert() since construction. """
+        return self.m_rejected
 
     def dbCreate(self):
-        """ Call overridden dbExec() with built create statement. """
-        self.dbExec(self.sqlCreate())
+        """ Create the wrapped MeterDB table. """
+        return self.m_meter_db.dbCreate()
 
     def dbDropReads(self):
-        """ Call overridden dbExec() with build drop statement. """
-        self.dbExec(self.sqlDrop())
+        """ Drop the wrapped MeterDB reads.  The spool is kept. """
+        return self.m_meter_db.dbDropReads()
 
     def dbExec(self, query_str):
-        """ Required override for MeterDB subclass, run a query.
+        """ Run a query on the wrapped MeterDB.
+
         Args:
             query_str (str): SQL Query to run.
         """
-        pass
+        return self.m_meter_db.dbExec(query_str)
 
 
-class SqliteMeterDB(MeterDB):
-    """MeterDB subclass for simple sqlite database"""
+class CommandFrame(object):
+    """ Encoder for one command frame type, ex. a CT ratio write.
 
-    def __init__(self, connection_string="default.db"):
-        """
-        Args:
-            connection_string (str): name of sqlite database file.
-        """
-        super(SqliteMeterDB, self).__init__(connection_string)
+    The constant start of the frame, SOH command "1" STX register "(", is
+    built once with its running CRC.  Building a frame only joins the
+    zero filled payload values and CRCs the payload and the closing ")" ETX.
+    Templates are shared through :func:`~ekmmeters.CommandFrame.get`.
+    """
+    m_templates = {}
 
-    def dbExec(self, query_str):
-        """ Required override of dbExec() from MeterDB(), run query.
+    def __init__(self, command, register="", widths=(), pad=0):
+        """
         Args:
-            query_str (str): query to run
+            command (str): "W" write, "R" settings read or "P" password.
+            register (str): Four character register, empty for a password frame.
+            widths (tuple): Zero fill width of each payload value, 0 for none.
+            pad (int): Zeros appended after the values.
         """
-        try:
-            connection = sqlite3.connect(self.m_connection_string)
-            cursor = connection.cursor()
-            cursor.execute(query_str)
-            connection.commit()
-            cursor.close()
-            connection.close()
-            return True
-        except:
-            ekm_log(traceback.format_exc())
-            return False
-        pass
+        self.m_command = command
+        self.m_register = register
+        self.m_widths = tuple(widths)
+        self.m_pad = "0" * pad
+        self.m_start = "\x01" + command + "1\x02" + register + "("
+        self.m_start_crc = ekm_crc16_update(0xffff, self.m_start[1:])
 
-    def dict_factory(self, cursor, row):
-        """ Sqlite callback accepting the cursor and the original row as a tuple.
-
-        Simple return of JSON safe types.
+    @staticmethod
+    def get(command, register="", widths=(), pad=0):
+        """ Shared template for a command type, created on first use.
 
         Args:
-            cursor (sqlite cursor):  Original cursory
-            row (sqlite row tuple): Original row.
+            command (str): "W" write, "R" settings read or "P" password.
+            register (str): Four character register, empty for a password frame.
+            widths (tuple): Zero fill width of each payload value, 0 for none.
+            pad (int): Zeros appended after the values.
 
         Returns:
-            dict: modified row.
+            CommandFrame: Template for the command type.
         """
-        d = {}
-        for idx, col in enumerate(cursor.description):
-            val = row[idx]
-            name = col[0]
-            if name == Field.Time_Stamp:
-                d[col[0]] = str(val)
-                continue
-            if name == "Raw_A" or name == "Raw_B":  # or name == Field.Meter_Time:
-                continue
-            if name not in self.m_all_fields:
-                continue
-            if (str(val) != "None"):
-                d[name] = str(val)
-        return d
+        key = (command, register, widths, pad)
+        template = CommandFrame.m_templates.get(key)
+        if template is None:
+            template = CommandFrame(command, register, widths, pad)
+            CommandFrame.m_templates[key] = template
+        return template
 
-    @staticmethod
-    def raw_dict_factory(cursor, row):
-        """ Sqlite callback accepting the cursor and the original row as a tuple.
+    def build(self, *values):
+        """ Complete frame for the payload values, zero filled per template.
 
-        Simple return of JSON safe types, including raw read hex strings.
+        Returns:
+            str: Frame ready for :func:`~ekmmeters.SerialPort.write`.
+        """
+        payload = "".join([str(value).zfill(width) for value, width in zip(values, self.m_widths)])
+        return self.buildPayload(payload + self.m_pad)
+
+    def buildPayload(self, payload):
+        """ Complete frame for an already formatted payload.
 
         Args:
-            cursor (sqlite cursor):  Original cursory
-            row (sqlite row tuple): Original row.
+            payload (str): Characters between the parentheses.
 
         Returns:
-            dict: modified row.
+            str: Frame ready for :func:`~ekmmeters.SerialPort.write`.
         """
-        d = {}
-        for idx, col in enumerate(cursor.description):
-            val = row[idx]
-            name = col[0]
-            if name == Field.Time_Stamp or name == Field.Meter_Address:
-                d[name] = str(val)
-                continue
-            if name == "Raw_A" or name == "Raw_B":
-                d[name] = str(val)
-                continue
-        return d
+        end = payload + ")\x03"
+        crc = ekm_crc16_final(ekm_crc16_update(self.m_start_crc, end))
+        return self.m_start + end + chr(crc >> 8) + chr(crc & 0xff)
 
-    def renderJsonReadsSince(self, timestamp, meter):
-        """ Simple since Time_Stamp query returned as JSON records.
+    def getRegister(self):
+        """ Register written or read, empty for a password frame. """
+        return self.m_register
 
-        Args:
-            timestamp (int): Epoch time in seconds.
-            meter (str): 12 character meter address to query
 
-        Returns:
-            str: JSON rendered read records.
+class MeterSession(object):
+    """ One open conversation with a meter, returned by :func:`~ekmmeters.Meter.openSession`.
+
+    While a session is open, set and read commands on its meter skip their
+    wake read, password step and termination string: the meter is read once,
+    authenticated once, and terminated once when the session closes.  A
+    failed command, or more than idle_timeout seconds between commands,
+    ends the conversation and the next command starts a new one.
+    """
 
+    def __init__(self, meter, password="00000000", idle_timeout=5.0):
         """
-        result = ""
-        try:
-            connection = sqlite3.connect(self.m_connection_string)
-            connection.row_factory = self.dict_factory
-            select_cursor = connection.cursor()
-            select_cursor.execute("select * from Meter_Reads where " + Field.Time_Stamp +
-                                  " > " + str(timestamp) + " and " + Field.Meter_Address +
-                                  "= '" + meter + "';")
-            reads = select_cursor.fetchall()
-            result = json.dumps(reads, indent=4)
+        Args:
+            meter (Meter): Meter with an attached port.
+            password (str): Password sent once for set commands, None to send none.
+            idle_timeout (float): Seconds between commands before the meter is woken again.
+        """
+        self.m_meter = meter
+        self.m_password = password
+        self.m_idle_timeout = idle_timeout
+        self.m_active = False
+        self.m_authenticated = None
+        self.m_last = 0.0
+        self.m_commands = 0
+        self.m_wakes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+        return False
 
-        except:
-            ekm_log(traceback.format_exc())
-        return result
+    def open(self):
+        """ Wake and authenticate the meter.  A password failure is only logged.
 
-    def renderRawJsonReadsSince(self, timestamp, meter):
-        """ Simple Time_Stamp query returned as JSON, with raw hex string fields.
+        With password None, as for read only sessions, no password is sent.
+
+        Returns:
+            bool: True if the meter answered the wake read.
+        """
+        self.m_meter.m_session = self
+        if not self.wake(self.m_meter.requestA):
+            return False
+        if self.m_password is not None and not self.m_meter.serialCmdPwdAuth(self.m_password):
+            ekm_log("Session password failure (%s)", self.m_meter.getMeterAddress())
+        return True
+
+    def wake(self, wake_func):
+        """ Issue the wake read unless the conversation is still open.  Private.
 
         Args:
-            timestamp (int): Epoch time in seconds.
-            meter (str): 12 character meter address to query
+            wake_func (function): Zero argument read returning bool.
 
         Returns:
-            str: JSON rendered read records including raw hex fields.
-
+            bool: True if the meter is awake.
         """
-        result = ""
-        try:
-            connection = sqlite3.connect(self.m_connection_string)
-            connection.row_factory = self.raw_dict_factory
-            select_cursor = connection.cursor()
-            select_cursor.execute("select " + Field.Time_Stamp + ", Raw_A, Raw_B, " +
-                                  Field.Meter_Address + " from Meter_Reads where " +
-                                  Field.Time_Stamp + " > " + str(timestamp) + " and " +
-                                  Field.Meter_Address + " = '" + meter + "';")
-            reads = select_cursor.fetchall()
-            result = json.dumps(reads, indent=4)
-        except:
-            ekm_log(traceback.format_exc())
-        return result
+        if self.m_active and time.time() - self.m_last < self.m_idle_timeout:
+            return True
+        self.m_authenticated = None
+        self.m_active = bool(wake_func())
+        self.m_last = time.time()
+        self.m_wakes += 1
+        return self.m_active
+
+    def close(self):
+        """ Send the termination string and detach from the meter. """
+        if self.m_meter.m_session is self:
+            self.m_meter.m_session = None
+        if self.m_active:
+            self.m_active = False
+            self.m_meter.serialPostEnd()
+
+    def isActive(self):
+        """ True if the meter is awake within this session. """
+        return self.m_active
+
+    def getCommandCount(self):
+        """ Commands completed in this session. """
+        return self.m_commands
+
+    def getWakeCount(self):
+        """ Wake reads issued by this session, 1 if no conversation was lost. """
+        return self.m_wakes
 
 
 class Meter(object):
     """ Abstract base class.  Encapuslates serial operations and buffers. """
 
+    #: Registers written by set commands which may be skipped by diff writes.
+    m_diff_registers = frozenset(["0050", "00D5", "00D0", "00D2", "00D4", "00A0", "00A1", "00A2",
+                                  "0070", "0071", "0072", "0073", "0074", "0075", "0080", "00B0", "00C0"])
+
+    #: Read buffer fields holding the value written to a register, and payload width.
+    m_block_registers = ((Field.Max_Demand_Period, ("0050", 1)),
+                         (Field.CT_Ratio, ("00D0", 4)),
+                         (Field.Pulse_Ratio_1, ("00A0", 4)),
+                         (Field.Pulse_Ratio_2, ("00A1", 4)),
+                         (Field.Pulse_Ratio_3, ("00A2", 4)),
+                         (Field.CF_Ratio, ("00D4", 4)))
+
+    #: Settings read register to (write register, fields, zero pad) for each table it holds.
+    m_table_registers = {
+        "0070": [("007" + str(schd), ["Schedule_" + str(schd + 1) + "_Period_" + str(period) + "_" + part
+                                     for period in range(1, 5) for part in ("Hour", "Min", "Tariff")], 24)
+                 for schd in range(4)] +
+                [("0080", ["Season_" + str(season) + "_" + part
+                           for season in range(1, 5) for part in ("Month", "Day", "Schedule")], 24)],
+        "0071": [("007" + str(schd), ["Schedule_" + str(schd + 1) + "_Period_" + str(period) + "_" + part
+                                     for period in range(1, 5) for part in ("Hour", "Min", "Tariff")], 24)
+                 for schd in range(4, 6)],
+        "00B0": [("00B0", ["Holiday_" + str(holiday) + "_" + part
+                           for holiday in range(1, 21) for part in ("Mon", "Day")], 0),
+                 ("00C0", ["Weekend_Schd", "Holiday_Schd"], 0)]}
+
     def __init__(self, meter_address="000000000000"):
         """
         Args:
@@ -1414,6 +5578,20 @@ class Meter(object):
         self.m_serial_port = None
         self.m_command_msg = ""
         self.m_context = ""
+        self.m_req = SerialBlock()
+        self.m_snapshot = None
+        self.m_snapshot_keys = ()
+        self.m_snapshot_index = {}
+        self.m_read_time = 0
+        self.m_accessors = {}
+        self.m_latency = None
+        self.m_command_start = 0
+        self.m_retry_policy = None
+        self.m_read_error = ReadError.NoError
+        self.m_session = None
+        self.m_settings = None
+        self.m_diff_writes = False
+        self.m_known_settings = {}
 
         self.m_schd_1_to_4 = SerialBlock()
         self.initSchd_1_to_4()
@@ -1489,6 +5667,73 @@ class Meter(object):
         ekm_log("Meter::request called in superclass.")
         return False
 
+    def getSnapshot(self):
+        """ Immutable copy of the last read, built at most once per read.
+
+        The snapshot is stamped with the time the read completed, and is
+        rebuilt whenever the read buffer changes, including after a failed
+        read or a direct requestA() or requestB().
+
+        Returns:
+            ReadSnapshot: Snapshot of :func:`~ekmmeters.Meter.getReadBuffer`.
+        """
+        if self.m_snapshot is None:
+            keys = tuple(self.m_req.keys())
+            if keys != self.m_snapshot_keys:
+                self.m_snapshot_keys = keys
+                self.m_snapshot_index = ReadSnapshot.makeIndex(keys)
+            self.m_snapshot = ReadSnapshot.fromBlock(self.m_req, self.m_read_time or None,
+                                                     self.m_snapshot_keys, self.m_snapshot_index)
+        return self.m_snapshot
+
+    def getNative(self, fld_name):
+        """ Native (scaled int, float or str) value of a field from the last read.
+
+        Unlike getField(), a miss is not logged.
+
+        Args:
+            fld_name (str): A :class:`~ekmmeters.Field` value.
+
+        Returns:
+            Native value, None if the field is not in the read.
+        """
+        return self.getSnapshot().getNative(fld_name)
+
+    def getFields(self, fld_names):
+        """ Native values of several fields from the last read in one call.
+
+        The :class:`~ekmmeters.FieldAccessor` for each distinct list of
+        fields is kept on the meter, so repeated calls only index a tuple.
+
+        Args:
+            fld_names (list): :class:`~ekmmeters.Field` values.
+
+        Returns:
+            tuple: Native value of each field, None where not in the read.
+        """
+        fld_names = tuple(fld_names)
+        accessor = self.m_accessors.get(fld_names)
+        if accessor is None:
+            accessor = FieldAccessor(fld_names)
+            self.m_accessors[fld_names] = accessor
+        return accessor(self.getSnapshot())
+
+    def updateObservers(self):
+        """ Fire update method in all attached observers in order of attachment.
+
+        Called internally after request().  Observers with m_snapshot_update set
+        receive the :class:`~ekmmeters.ReadSnapshot`, all others the read buffer.
+        """
+        self.m_snapshot = None
+        for observer in self.m_observers:
+            try:
+                if getattr(observer, "m_snapshot_update", False):
+                    observer.update(self.getSnapshot())
+                else:
+                    observer.update(self.m_req)
+            except:
+                ekm_log(traceback.format_exc())
+
     def serialPostEnd(self):
         """ Required override, issue termination string to port. """
         ekm_log("Meter::serialPostEnd called in superclass.")
@@ -1500,11 +5745,38 @@ class Meter(object):
         Args:
             context_str (str): Command specific string.
         """
-        if (len(self.m_context) == 0) and (len(context_str) >= 7):
-            if context_str[0:7] != "request":
-                ekm_log("Context: " + context_str)
+        if (not self.m_context) and (len(context_str) >= 7) and ekm_log_enabled():
+            if not context_str.startswith("request"):
+                ekm_log("Context: %s", context_str)
+        if self.m_latency and not context_str.startswith("request"):
+            if context_str and not self.m_context:
+                self.m_command_start = time.perf_counter()
+            elif self.m_context and not context_str and not self.m_context.startswith("request"):
+                self.m_latency.lap(self.m_context, self.m_command_start)
         self.m_context = context_str
 
+    def enableLatencyStats(self, callback=None):
+        """ Record per stage read times and settings command times for this meter.
+
+        Off by default, when off the read path only tests m_latency.
+
+        Args:
+            callback (function): Optional, called as callback(meter_address, stage, seconds).
+
+        Returns:
+            LatencyStats: Stats object, also returned by getLatencyStats().
+        """
+        self.m_latency = LatencyStats(self.m_meter_address, callback)
+        return self.m_latency
+
+    def disableLatencyStats(self):
+        """ Stop recording meter latency. """
+        self.m_latency = None
+
+    def getLatencyStats(self):
+        """ Meter :class:`~ekmmeters.LatencyStats`, None if not enabled. """
+        return self.m_latency
+
     def getContext(self):
         """ Get context string for current serial command.  Private getter.
 
@@ -1513,6 +5785,285 @@ class Meter(object):
         """
         return self.m_context
 
+    def setRetryPolicy(self, policy=None):
+        """ Retry failed reads, commands and settings reads on this meter.
+
+        Without a policy a read is tried once, except the V4 B read which is
+        tried twice as before.
+
+        Args:
+            policy (RetryPolicy): Policy to use, None for a single try.
+        """
+        self.m_retry_policy = policy
+
+    def getRetryPolicy(self):
+        """ :class:`~ekmmeters.RetryPolicy` in use, None if not set. """
+        return self.m_retry_policy
+
+    def getReadError(self):
+        """ :class:`~ekmmeters.ReadError` for the last read or command on this meter. """
+        return self.m_read_error
+
+    def classifyRead(self, raw_read, crc_ok, match_ok=True):
+        """ Set m_read_error from the result of one read.  Private.
+
+        Args:
+            raw_read (str): Response from the port.
+            crc_ok (bool): CRC result for raw_read.
+            match_ok (bool): Address and request type matched.
+
+        Returns:
+            bool: True if the read was good.
+        """
+        if not raw_read:
+            self.m_read_error = ReadError.Timeout
+        elif len(raw_read) != 255:
+            self.m_read_error = ReadError.Length
+        elif not crc_ok:
+            self.m_read_error = ReadError.Crc
+        elif not match_ok:
+            self.m_read_error = ReadError.Address
+        else:
+            self.m_read_error = ReadError.NoError
+            return True
+        return False
+
+    def retryRead(self, read_func, min_attempts=1):
+        """ Call read_func until it succeeds or the retry policy gives up.
+
+        read_func must set m_read_error on failure.  If the port has a
+        :class:`~ekmmeters.CircuitBreaker` and this meter's circuit is open,
+        read_func is not called.
+
+        Args:
+            read_func (function): Zero argument read or command, returning bool.
+            min_attempts (int): Tries made even without a policy.
+
+        Returns:
+            bool: Result of the last call.
+        """
+        breaker = self.m_serial_port.m_breaker if self.m_serial_port else None
+        address = self.m_meter_address
+        metrics = ekmmeters_metrics
+        if breaker and not breaker.allow(address):
+            self.m_read_error = ReadError.Circuit
+            if metrics:
+                metrics.inc(Metric.CircuitSkips, address)
+            return False
+        policy = self.m_retry_policy
+        attempt = 0
+        while True:
+            attempt += 1
+            self.m_read_error = ReadError.NoError
+            result = read_func()
+            if result:
+                self.m_read_error = ReadError.NoError
+                if breaker:
+                    breaker.recordSuccess(address)
+                return result
+            error = self.m_read_error or ReadError.Timeout
+            if attempt < min_attempts:
+                delay = 0.0
+            elif policy and policy.shouldRetry(error, attempt):
+                delay = policy.getDelay(error, attempt)
+            else:
+                break
+            ekm_log("(%s) Retry %d after %s error", self.m_context, attempt, error)
+            if metrics:
+                metrics.inc(Metric.Retries, address)
+            if delay > 0:
+                time.sleep(delay)
+        if breaker:
+            breaker.recordFailure(address)
+        return result
+
+    def serialCmdAck(self, req_str):
+        """ Write a command frame and wait for ACK, retried per the retry policy.
+
+        Args:
+            req_str (str): Complete command frame, see :class:`~ekmmeters.CommandFrame`.
+
+        Returns:
+            bool: True if the meter answered with ACK.
+        """
+
+        def sendCmd():
+            self.m_serial_port.write(req_str)
+            response = self.m_serial_port.getResponse(self.getContext())
+            if str2hex(response) == "06":
+                return True
+            self.m_read_error = ReadError.Reply if response else ReadError.Timeout
+            return False
+
+        result = self.retryRead(sendCmd)
+        if req_str[1:2] == "W":
+            self.cacheSetting(req_str[4:8], req_str[9:-4] if result else None)
+        if not result and self.m_session is not None:
+            self.m_session.m_active = False
+        return result
+
+    def serialCmdRead(self, req_str):
+        """ Write a settings read frame and return a block with a good CRC if possible.
+
+        Retried per the retry policy.  The block is not unpacked here.
+
+        Args:
+            req_str (str): Complete read frame, see :class:`~ekmmeters.CommandFrame`.
+
+        Returns:
+            str: Last response, empty on timeout.
+        """
+        response = [""]
+
+        def sendRead():
+            self.m_serial_port.write(req_str)
+            raw_ret = self.m_serial_port.getResponse(self.getContext())
+            response[0] = raw_ret
+            crc_ok = False
+            if len(raw_ret) == 255:
+                crc_ok = int(self.calc_crc16(raw_ret[1:-2]), 16) == int(str2hex(raw_ret[-2:]), 16)
+            return self.classifyRead(raw_ret, crc_ok)
+
+        if not self.retryRead(sendRead) and self.m_session is not None:
+            self.m_session.m_active = False
+        return response[0]
+
+    def openSession(self, password="00000000", idle_timeout=5.0):
+        """ Open the meter once for a batch of set and read commands.
+
+        Each set command otherwise costs a wake read, a password step and a
+        termination string.  Use as a context manager::
+
+            with my_meter.openSession(password) as session:
+                my_meter.setCTRatio(CTRatio.Amps_400)
+                my_meter.setMaxDemandPeriod(MaxDemandPeriod.At_15_Minutes)
+
+        The password argument of each set command is still checked, and a
+        command with a different password authenticates again.
+
+        Args:
+            password (str): Password sent once for set commands.
+            idle_timeout (float): Seconds between commands before the meter is woken again.
+
+        Returns:
+            MeterSession: Open session, closed on leaving the with block.
+        """
+        if self.m_session is not None:
+            self.m_session.close()
+        session = MeterSession(self, password, idle_timeout)
+        session.open()
+        return session
+
+    def setDiffWrites(self, enabled=True):
+        """ Skip set commands which would write what the meter already holds.
+
+        Known settings are kept per meter from successful writes, settings
+        reads and the read buffer, see :func:`~ekmmeters.Meter.getKnownSettings`.
+        A skipped command returns True without touching the port.  Time,
+        password, relay and reset commands are always sent.
+
+        Args:
+            enabled (bool): False sends every command.
+        """
+        self.m_diff_writes = enabled
+
+    def getDiffWrites(self):
+        """ True if unchanged set commands are skipped. """
+        return self.m_diff_writes
+
+    def getKnownSettings(self):
+        """ Last known settings payload by four character register.
+
+        Returns:
+            dict: Register, ex. "00D0", to payload string as written, ex. "0200".
+        """
+        return dict(self.m_known_settings)
+
+    def clearKnownSettings(self):
+        """ Forget known settings, so the next set commands are all sent. """
+        self.m_known_settings = {}
+
+    def cacheSetting(self, register, payload):
+        """ Record a known settings payload.  Private.
+
+        Args:
+            register (str): Four character register.
+            payload (str): Payload as written, or None to forget the register.
+        """
+        if register not in self.m_diff_registers:
+            return
+        if payload is None:
+            self.m_known_settings.pop(register, None)
+        else:
+            self.m_known_settings[register] = payload
+
+    def cacheBlockSettings(self, def_buf):
+        """ Record known settings from a read buffer.  Private.
+
+        Args:
+            def_buf (SerialBlock): Read buffer after a good read.
+        """
+        for fld, (register, width) in self.m_block_registers:
+            if fld in def_buf:
+                value = def_buf[fld][MeterData.StringValue]
+                if value:
+                    self.m_known_settings[register] = value.zfill(width)
+
+    def cacheTableSettings(self, def_buf, registers):
+        """ Record known settings from a settings read.  Private.
+
+        Args:
+            def_buf (SerialBlock): Settings buffer after a good read.
+            registers (list): (register, field names, zero pad) for each table in def_buf.
+        """
+        for register, names, pad in registers:
+            payload = "".join([def_buf[name][MeterData.StringValue].zfill(2) for name in names])
+            self.m_known_settings[register] = payload + "0" * pad
+
+    def serialCmdUnchanged(self, req_str):
+        """ True if diff writes are on and req_str writes a known value.  Private.
+
+        Args:
+            req_str (str): Complete command frame, see :class:`~ekmmeters.CommandFrame`.
+        """
+        if not self.m_diff_writes:
+            return False
+        register = req_str[4:8]
+        if register not in self.m_diff_registers:
+            return False
+        if self.m_known_settings.get(register) != req_str[9:-4]:
+            return False
+        self.writeCmdMsg("Unchanged(" + self.getContext() + "): not sent.")
+        return True
+
+    def getSession(self):
+        """ Open :class:`~ekmmeters.MeterSession`, None outside a session. """
+        return self.m_session
+
+    def serialCmdWake(self, wake_func=None):
+        """ Wake read before a command, skipped while a session is awake.
+
+        Args:
+            wake_func (function): Zero argument read, request(False) if None.
+
+        Returns:
+            bool: True if the meter answered.
+        """
+        if wake_func is None:
+            wake_func = lambda: self.request(False)
+        if self.m_session is not None:
+            return self.m_session.wake(wake_func)
+        return wake_func()
+
+    def serialCmdEnd(self):
+        """ Termination string after a command, deferred to close() in a session. """
+        session = self.m_session
+        if session is not None and session.m_active:
+            session.m_last = time.time()
+            session.m_commands += 1
+            return
+        self.serialPostEnd()
+
     @staticmethod
     def calc_crc16(buf):
         """ Drop in pure python replacement for ekmcrc.c extension.
@@ -1523,48 +6074,7 @@ class Meter(object):
         Returns:
             str: 16 bit CRC per EKM Omnimeters formatted as hex string.
         """
-        crc_table = [0x0000, 0xc0c1, 0xc181, 0x0140, 0xc301, 0x03c0, 0x0280, 0xc241,
-                     0xc601, 0x06c0, 0x0780, 0xc741, 0x0500, 0xc5c1, 0xc481, 0x0440,
-                     0xcc01, 0x0cc0, 0x0d80, 0xcd41, 0x0f00, 0xcfc1, 0xce81, 0x0e40,
-                     0x0a00, 0xcac1, 0xcb81, 0x0b40, 0xc901, 0x09c0, 0x0880, 0xc841,
-                     0xd801, 0x18c0, 0x1980, 0xd941, 0x1b00, 0xdbc1, 0xda81, 0x1a40,
-                     0x1e00, 0xdec1, 0xdf81, 0x1f40, 0xdd01, 0x1dc0, 0x1c80, 0xdc41,
-                     0x1400, 0xd4c1, 0xd581, 0x1540, 0xd701, 0x17c0, 0x1680, 0xd641,
-                     0xd201, 0x12c0, 0x1380, 0xd341, 0x1100, 0xd1c1, 0xd081, 0x1040,
-                     0xf001, 0x30c0, 0x3180, 0xf141, 0x3300, 0xf3c1, 0xf281, 0x3240,
-                     0x3600, 0xf6c1, 0xf781, 0x3740, 0xf501, 0x35c0, 0x3480, 0xf441,
-                     0x3c00, 0xfcc1, 0xfd81, 0x3d40, 0xff01, 0x3fc0, 0x3e80, 0xfe41,
-                     0xfa01, 0x3ac0, 0x3b80, 0xfb41, 0x3900, 0xf9c1, 0xf881, 0x3840,
-                     0x2800, 0xe8c1, 0xe981, 0x2940, 0xeb01, 0x2bc0, 0x2a80, 0xea41,
-                     0xee01, 0x2ec0, 0x2f80, 0xef41, 0x2d00, 0xedc1, 0xec81, 0x2c40,
-                     0xe401, 0x24c0, 0x2580, 0xe541, 0x2700, 0xe7c1, 0xe681, 0x2640,
-                     0x2200, 0xe2c1, 0xe381, 0x2340, 0xe101, 0x21c0, 0x2080, 0xe041,
-                     0xa001, 0x60c0, 0x6180, 0xa141, 0x6300, 0xa3c1, 0xa281, 0x6240,
-                     0x6600, 0xa6c1, 0xa781, 0x6740, 0xa501, 0x65c0, 0x6480, 0xa441,
-                     0x6c00, 0xacc1, 0xad81, 0x6d40, 0xaf01, 0x6fc0, 0x6e80, 0xae41,
-                     0xaa01, 0x6ac0, 0x6b80, 0xab41, 0x6900, 0xa9c1, 0xa881, 0x6840,
-                     0x7800, 0xb8c1, 0xb981, 0x7940, 0xbb01, 0x7bc0, 0x7a80, 0xba41,
-                     0xbe01, 0x7ec0, 0x7f80, 0xbf41, 0x7d00, 0xbdc1, 0xbc81, 0x7c40,
-                     0xb401, 0x74c0, 0x7580, 0xb541, 0x7700, 0xb7c1, 0xb681, 0x7640,
-                     0x7200, 0xb2c1, 0xb381, 0x7340, 0xb101, 0x71c0, 0x7080, 0xb041,
-                     0x5000, 0x90c1, 0x9181, 0x5140, 0x9301, 0x53c0, 0x5280, 0x9241,
-                     0x9601, 0x56c0, 0x5780, 0x9741, 0x5500, 0x95c1, 0x9481, 0x5440,
-                     0x9c01, 0x5cc0, 0x5d80, 0x9d41, 0x5f00, 0x9fc1, 0x9e81, 0x5e40,
-                     0x5a00, 0x9ac1, 0x9b81, 0x5b40, 0x9901, 0x59c0, 0x5880, 0x9841,
-                     0x8801, 0x48c0, 0x4980, 0x8941, 0x4b00, 0x8bc1, 0x8a81, 0x4a40,
-                     0x4e00, 0x8ec1, 0x8f81, 0x4f40, 0x8d01, 0x4dc0, 0x4c80, 0x8c41,
-                     0x4400, 0x84c1, 0x8581, 0x4540, 0x8701, 0x47c0, 0x4680, 0x8641,
-                     0x8201, 0x42c0, 0x4380, 0x8341, 0x4100, 0x81c1, 0x8081, 0x4040]
-
-        crc = 0xffff
-        for c in buf:
-            index = (crc ^ ord(c)) & 0xff
-            crct = crc_table[index]
-            crc = (crc >> 8) ^ crct
-        crc = (crc << 8) | (crc >> 8)
-        crc &= 0x7F7F
-
-        return "%04x" % crc
+        return "%04x" % ekm_crc16_final(ekm_crc16_update(0xffff, buf))
 
     @staticmethod
     def calcPF(pf):
@@ -1604,19 +6114,20 @@ class Meter(object):
                 self.setContext("")
                 return result
 
-            if not self.request(False):
+            req_str = CommandFrame.get("W", "0050", (1,)).build(period)
+            if self.serialCmdUnchanged(req_str):
+                self.setContext("")
+                return True
+
+            if not self.serialCmdWake():
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
-                
-                req_str = "015731023030353028" + str2hex(str(period)).zfill(2) + "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success(setMaxDemandPeriod): 06 returned.")
                     result = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -1641,19 +6152,20 @@ class Meter(object):
                 self.setContext("")
                 return result
 
-            if not self.request(False):
+            req_str = CommandFrame.get("W", "00D5", (1,)).build(interval)
+            if self.serialCmdUnchanged(req_str):
+                self.setContext("")
+                return True
+
+            if not self.serialCmdWake():
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
-                
-                req_str = "015731023030443528" + str2hex(str(interval).zfill(1)) + "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success (setMaxDemandResetInterval): 06 returned.")
                     result = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -1678,20 +6190,17 @@ class Meter(object):
                 self.setContext("")
                 return result
 
-            if not self.request(False):
+            if not self.serialCmdWake():
                 self.writeCmdMsg("Pre command read failed: check serial line.")
             else:
                 if not self.serialCmdPwdAuth(pwd):
                     self.writeCmdMsg("Password failure")
                 
-                req_pwd = str2hex(new_pwd.zfill(8))
-                req_str = "015731023030323028" + req_pwd + "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                req_str = CommandFrame.get("W", "0020", (8,)).build(new_pwd)
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success(setMeterPassword): 06 returned.")
                     result = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -1716,6 +6225,8 @@ class Meter(object):
             contents = struct.unpack(struct_str, str(data).encode())
         else:
             self.writeCmdMsg("Length error.  Len() size = " + str(len(data)))
+            if ekmmeters_metrics and len(data):
+                ekmmeters_metrics.inc(Metric.LengthErrors, self.m_meter_address)
             contents = ()
         return contents
 
@@ -1730,7 +6241,7 @@ class Meter(object):
         Returns:
             bool: True on completion.
         """
-        log_str = ""
+        self.m_snapshot = None
         count = 0
 
         # getting scale does not require a full read.  It does require that the
@@ -1805,10 +6316,8 @@ class Meter(object):
                 else:
                     ekm_log("Unrecognized field type")
 
-                log_str = log_str + '"' + fld + '":  "' + def_buf[fld][MeterData.StringValue] + '"\n'
-
             except:
-                ekm_log("Exception on Field:" + str(fld))
+                ekm_log("Exception on Field:%s", fld)
                 ekm_log(traceback.format_exc())
                 self.writeCmdMsg("Exception on Field:" + str(fld))
 
@@ -1849,14 +6358,18 @@ class Meter(object):
         """
         try:
             if len(raw_read) == 0:
-                ekm_log("(" + self.m_context + ") Empty return read.")
+                ekm_log("(%s) Empty return read.", self.m_context)
+                return False
+            if len(raw_read) != 255:
+                # Already counted as a length error by unpackStruct().
                 return False
             sent_crc = self.calc_crc16(raw_read[1:-2])
-            logstr = "(" + self.m_context + ")CRC sent = " + str(def_buf["crc16"][MeterData.StringValue])
-            logstr += " CRC calc = " + sent_crc
-            ekm_log(logstr)
+            ekm_log("(%s)CRC sent = %s CRC calc = %s",
+                    self.m_context, def_buf["crc16"][MeterData.StringValue], sent_crc)
             if int(def_buf["crc16"][MeterData.StringValue], 16) == int(sent_crc, 16):
                 return True
+            if ekmmeters_metrics:
+                ekmmeters_metrics.inc(Metric.CrcFailures, self.m_meter_address)
 
         # A cross simple test lines on a USB serial adapter, these occur every
         # 1000 to 2000 reads, and they show up here as a bad unpack or
@@ -1869,6 +6382,8 @@ class Meter(object):
             for frame in traceback.extract_tb(sys.exc_info()[2]):
                 fname, lineno, fn, text = frame
                 ekm_log("Error in %s on line %d" % (fname, lineno))
+            if ekmmeters_metrics:
+                ekmmeters_metrics.inc(Metric.CrcFailures, self.m_meter_address)
             return False
 
         except TypeError:
@@ -1876,6 +6391,8 @@ class Meter(object):
             for frame in traceback.extract_tb(sys.exc_info()[2]):
                 fname, lineno, fn, text = frame
                 ekm_log("Error in %s on line %d" % (fname, lineno))
+            if ekmmeters_metrics:
+                ekmmeters_metrics.inc(Metric.CrcFailures, self.m_meter_address)
             return False
 
         except ValueError:
@@ -1883,6 +6400,8 @@ class Meter(object):
             for frame in traceback.extract_tb(sys.exc_info()[2]):
                 fname, lineno, fn, text = frame
                 ekm_log("Error in %s on line %d" % (fname, lineno))
+            if ekmmeters_metrics:
+                ekmmeters_metrics.inc(Metric.CrcFailures, self.m_meter_address)
             return False
 
         return False
@@ -1947,13 +6466,37 @@ class Meter(object):
     def unregisterObserver(self, observer):
         """ Remove an observer from the meter update() chain.
 
+        A :class:`~ekmmeters.QueuedObserver` is stopped when removed, and
+        may be removed by passing either the wrapper or the wrapped observer.
+
         Args:
             observer (MeterObserver): Subclassed MeterObserver.
         """
-        if observer in self.m_observers:
-            self.m_observers.remove(observer)
+        for registered in list(self.m_observers):
+            if registered is observer or getattr(registered, "m_observer", None) is observer:
+                self.m_observers.remove(registered)
+                if isinstance(registered, QueuedObserver):
+                    registered.stop(drain=False)
         pass
 
+    def registerQueuedObserver(self, observer, max_queue=16, policy=DispatchPolicy.DropOldest,
+                               timeout=0, loop=None):
+        """ Place an observer in the update() chain, dispatched on its own worker thread.
+
+        Args:
+            observer (MeterObserver): Subclassed MeterObserver.
+            max_queue (int): Undelivered reads held before the policy applies.
+            policy (str): A :class:`~ekmmeters.DispatchPolicy` value.
+            timeout (float): Seconds the worker waits for each update(), zero for no limit.
+            loop (asyncio loop): Optional event loop for coroutine observers.
+
+        Returns:
+            QueuedObserver: The registered wrapper, for getStats() and stop().
+        """
+        queued = QueuedObserver(observer, max_queue, policy, timeout, loop)
+        self.registerObserver(queued)
+        return queued
+
     def initSchd_1_to_4(self):
         """ Initialize first tariff schedule :class:`~ekmmeters.SerialBlock`. """
         self.m_schd_1_to_4["reserved_40"] = [6, FieldType.Hex, ScaleType.No, "", 0, False, False]
@@ -2240,19 +6783,17 @@ class Meter(object):
                 self.setContext("")
                 return result
 
-            if not self.request(False):
+            if not self.serialCmdWake():
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
                 
-                req_str = "015731023030343028" + str2hex(str(0).zfill(6)) + "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                req_str = CommandFrame.get("W", "0040", pad=6).build()
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success(setMaxDemandResetNow): 06 returned.")
                     result = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -2307,7 +6848,7 @@ class Meter(object):
                 self.setContext("")
                 return result
 
-            if not self.request(False):
+            if not self.serialCmdWake():
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
@@ -2318,21 +6859,12 @@ class Meter(object):
                 dayofweek = dt_buf.date().isoweekday()
                 ekm_log("Calculated weekday " + str(dayofweek))
 
-                req_str = "015731023030363028"
-                req_str += str2hex(str(yy)[-2:])
-                req_str += str2hex(str(mm).zfill(2))
-                req_str += str2hex(str(dd).zfill(2))
-                req_str += str2hex(str(dayofweek).zfill(2))
-                req_str += str2hex(str(hh).zfill(2))
-                req_str += str2hex(str(minutes).zfill(2))
-                req_str += str2hex(str(ss).zfill(2))
-                req_str += "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                req_str = CommandFrame.get("W", "0060", (0, 2, 2, 2, 2, 2, 2)).build(
+                    str(yy)[-2:], mm, dd, dayofweek, hh, minutes, ss)
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success(setTime): 06 returned.")
                     result = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -2369,19 +6901,20 @@ class Meter(object):
                 self.setContext("")
                 return ret
 
-            if not self.request(False):
+            req_str = CommandFrame.get("W", "00D0", (4,)).build(new_ct)
+            if self.serialCmdUnchanged(req_str):
+                self.setContext("")
+                return True
+
+            if not self.serialCmdWake():
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
-                
-                req_str = "015731023030443028" + str2hex(str(new_ct).zfill(4)) + "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success(setCTRatio): 06 returned.")
                     ret = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
 
         except:
             ekm_log(traceback.format_exc())
@@ -2445,38 +6978,25 @@ class Meter(object):
         if not cmd_dict:
             cmd_dict = self.m_schedule_params
 
-        try:
-            if not self.request(False):
+        try:
+            values = [cmd_dict[name + "_" + str(i)] for i in range(1, 5)
+                      for name in ("Hour", "Min", "Tariff")]
+            register = "007" + str(cmd_dict["Schedule"])
+            req_str = CommandFrame.get("W", register, (2,) * 12, 24).build(*values)
+            if self.serialCmdUnchanged(req_str):
+                self.setContext("")
+                return True
+
+            if not self.serialCmdWake():
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
-                
-                req_table = ""
-                req_table += str2hex(str(cmd_dict["Hour_1"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Min_1"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Tariff_1"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Hour_2"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Min_2"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Tariff_2"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Hour_3"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Min_3"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Tariff_3"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Hour_4"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Min_4"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Tariff_4"]).zfill(2))
-                req_table += str2hex(str(0).zfill(24))
-
-                table = str2hex(str(cmd_dict["Schedule"]).zfill(1))
-
-                req_str = "01573102303037" + table + "28" + req_table + "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success(setSchedule): 06 returned.")
                     result = True
 
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -2559,33 +7079,22 @@ class Meter(object):
             cmd_dict = self.m_seasons_sched_params
 
         try:
-            if not self.request(False):
+            values = [cmd_dict["Season_" + str(i) + "_" + name] for i in range(1, 5)
+                      for name in ("Start_Month", "Start_Day", "Schedule")]
+            req_str = CommandFrame.get("W", "0080", (2,) * 12, 24).build(*values)
+            if self.serialCmdUnchanged(req_str):
+                self.setContext("")
+                return True
+
+            if not self.serialCmdWake():
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
-                
-                req_table = ""
-                req_table += str2hex(str(cmd_dict["Season_1_Start_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Season_1_Start_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Season_1_Schedule"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Season_2_Start_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Season_2_Start_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Season_2_Schedule"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Season_3_Start_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Season_3_Start_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Season_3_Schedule"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Season_4_Start_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Season_4_Start_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Season_4_Schedule"]).zfill(2))
-                req_table += str2hex(str(0).zfill(24))
-                req_str = "015731023030383028" + req_table + "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success(setSeasonSchedules): 06 returned.")
                     result = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -2641,60 +7150,22 @@ class Meter(object):
             cmd_dict = self.m_holiday_date_params
 
         try:
-            if not self.request(False):
+            values = [cmd_dict["Holiday_" + str(i) + "_" + name] for i in range(1, 21)
+                      for name in ("Month", "Day")]
+            req_str = CommandFrame.get("W", "00B0", (2,) * 40).build(*values)
+            if self.serialCmdUnchanged(req_str):
+                self.setContext("")
+                return True
+
+            if not self.serialCmdWake():
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
-                
-                req_table = ""
-                req_table += str2hex(str(cmd_dict["Holiday_1_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_1_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_2_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_2_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_3_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_3_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_4_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_4_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_5_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_5_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_6_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_6_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_7_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_7_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_8_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_8_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_9_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_9_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_10_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_10_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_11_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_11_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_12_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_12_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_13_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_13_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_14_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_14_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_15_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_15_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_16_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_16_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_17_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_17_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_18_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_18_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_19_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_19_Day"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_20_Month"]).zfill(2))
-                req_table += str2hex(str(cmd_dict["Holiday_20_Day"]).zfill(2))
-                req_str = "015731023030423028" + req_table + "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success(setHolidayDates: 06 returned.")
                     result = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -2715,21 +7186,20 @@ class Meter(object):
         result = False
         self.setContext("setWeekendHolidaySchedules")
         try:
-            if not self.request(False):
+            req_str = CommandFrame.get("W", "00C0", (2, 2)).build(new_wknd, new_hldy)
+            if self.serialCmdUnchanged(req_str):
+                self.setContext("")
+                return True
+
+            if not self.serialCmdWake():
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
-                
-                req_wkd = str2hex(str(new_wknd).zfill(2))
-                req_hldy = str2hex(str(new_hldy).zfill(2))
-                req_str = "015731023030433028" + req_wkd + req_hldy + "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success(setWeekendHolidaySchedules): 06 returned.")
                     result = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -2747,15 +7217,10 @@ class Meter(object):
         """
         self.setContext("readSchedules")
         try:
-            req_table = str2hex(str(tableset).zfill(1))
-            req_str = "01523102303037" + req_table + "282903"
-
-            self.request(False)
-            req_crc = self.calc_crc16(hex2str(req_str[2:]))
-            req_str += req_crc
-            self.m_serial_port.write(hex2str(req_str))
-            raw_ret = self.m_serial_port.getResponse(self.getContext())
-            self.serialPostEnd()
+            req_str = CommandFrame.get("R", "007" + str(tableset)).build()
+            self.serialCmdWake()
+            raw_ret = self.serialCmdRead(req_str)
+            self.serialCmdEnd()
             return_crc = self.calc_crc16(raw_ret[1:-2])
 
             if tableset == ReadSchedules.Schedules_1_To_4:
@@ -2763,6 +7228,7 @@ class Meter(object):
                 self.convertData(unpacked_read, self.m_schd_1_to_4, self.m_kwh_precision)
                 if str(return_crc) == str(self.m_schd_1_to_4["crc16"][MeterData.StringValue]):
                     ekm_log("Schedules 1 to 4 CRC success (06 return")
+                    self.cacheTableSettings(self.m_schd_1_to_4, self.m_table_registers["0070"])
                     self.setContext("")
                     return True
 
@@ -2771,6 +7237,7 @@ class Meter(object):
                 self.convertData(unpacked_read, self.m_schd_5_to_6, self.m_kwh_precision)
                 if str(return_crc) == str(self.m_schd_5_to_6["crc16"][MeterData.StringValue]):
                     ekm_log("Schedules 5 to 8 CRC success (06 return)")
+                    self.cacheTableSettings(self.m_schd_5_to_6, self.m_table_registers["0071"])
                     self.setContext("")
                     return True
         except:
@@ -2863,24 +7330,19 @@ class Meter(object):
         """
         self.setContext("readMonthTariffs")
         try:
-
-            req_type = str2hex(str(months_type).zfill(1))
-            req_str = "01523102303031" + req_type + "282903"
+            req_str = CommandFrame.get("R", "001" + str(months_type)).build()
             work_table = self.m_mons
             if months_type == ReadMonths.kWhReverse:
                 work_table = self.m_rev_mons
 
-            self.request(False)
-            req_crc = self.calc_crc16(hex2str(req_str[2:]))
-            req_str += req_crc
-            self.m_serial_port.write(hex2str(req_str))
-            raw_ret = self.m_serial_port.getResponse(self.getContext())
-            self.serialPostEnd()
+            self.serialCmdWake()
+            raw_ret = self.serialCmdRead(req_str)
+            self.serialCmdEnd()
             unpacked_read = self.unpackStruct(raw_ret, work_table)
             self.convertData(unpacked_read, work_table, self.m_kwh_precision)
             return_crc = self.calc_crc16(raw_ret[1:-2])
             if str(return_crc) == str(work_table["crc16"][MeterData.StringValue]):
-                ekm_log("Months CRC success, type = " + str(req_type))
+                ekm_log("Months CRC success, type = " + str(months_type))
                 self.setContext("")
                 return True
         except:
@@ -2946,18 +7408,16 @@ class Meter(object):
         """
         self.setContext("readHolidayDates")
         try:
-            req_str = "0152310230304230282903"
-            self.request(False)
-            req_crc = self.calc_crc16(hex2str(req_str[2:]))
-            req_str += req_crc
-            self.m_serial_port.write(hex2str(req_str))
-            raw_ret = self.m_serial_port.getResponse(self.getContext())
-            self.serialPostEnd()
+            req_str = CommandFrame.get("R", "00B0").build()
+            self.serialCmdWake()
+            raw_ret = self.serialCmdRead(req_str)
+            self.serialCmdEnd()
             unpacked_read = self.unpackStruct(raw_ret, self.m_hldy)
             self.convertData(unpacked_read, self.m_hldy, self.m_kwh_precision)
             return_crc = self.calc_crc16(raw_ret[1:-2])
             if str(return_crc) == str(self.m_hldy["crc16"][MeterData.StringValue]):
                 ekm_log("Holidays and Schedules CRC success")
+                self.cacheTableSettings(self.m_hldy, self.m_table_registers["00B0"])
                 self.setContext("")
                 return True
         except:
@@ -3020,26 +7480,98 @@ class Meter(object):
         result.Holiday = self.m_hldy["Holiday_Schd"][MeterData.StringValue]
         return result
 
-    def readSettings(self):
+    def readSettings(self, single_session=False):
         """Recommended call to read all meter settings at once.
 
+        With single_session the five settings reads share one wake read and
+        one termination string, as in :func:`~ekmmeters.Meter.openSession`.
+        On success the settings are cached for :func:`~ekmmeters.Meter.getSettings`.
+
+        Args:
+            single_session (bool): Read all five blocks in one session.
+
         Returns:
             bool: True if all subsequent serial calls completed with ACK.
         """
-        success = (self.readHolidayDates() and
-                   self.readMonthTariffs(ReadMonths.kWh) and
-                   self.readMonthTariffs(ReadMonths.kWhReverse) and
-                   self.readSchedules(ReadSchedules.Schedules_1_To_4) and
-                   self.readSchedules(ReadSchedules.Schedules_5_To_6))
+        session = None
+        if single_session and self.m_session is None:
+            session = MeterSession(self, None)
+            session.open()
+        try:
+            success = (self.readHolidayDates() and
+                       self.readMonthTariffs(ReadMonths.kWh) and
+                       self.readMonthTariffs(ReadMonths.kWhReverse) and
+                       self.readSchedules(ReadSchedules.Schedules_1_To_4) and
+                       self.readSchedules(ReadSchedules.Schedules_5_To_6))
+        finally:
+            if session is not None:
+                session.close()
+        if success:
+            try:
+                self.m_settings = self.makeSettings()
+            except:
+                ekm_log(traceback.format_exc())
+                self.m_settings = None
+                success = False
         return success
 
+    def getSettings(self, refresh=False, single_session=True):
+        """ Typed meter settings, read once and cached.
+
+        Args:
+            refresh (bool): Read the meter even if settings are cached.
+            single_session (bool): Passed to :func:`~ekmmeters.Meter.readSettings`.
+
+        Returns:
+            MeterSettings: Settings namedtuple, None if the read failed.
+        """
+        if refresh or self.m_settings is None:
+            if not self.readSettings(single_session):
+                return None
+        return self.m_settings
+
+    def makeSettings(self):
+        """ Build a :data:`~ekmmeters.MeterSettings` from the settings buffers.  Private.
+
+        Returns:
+            MeterSettings: Settings from the last readSettings().
+        """
+        schedules = []
+        for schedule in range(Extents.Schedules):
+            periods = []
+            for period in range(Extents.Periods):
+                ret = self.extractSchedule(schedule, period)
+                periods.append((int(ret.Hour), int(ret.Min), int(ret.Tariff)))
+            schedules.append(tuple(periods))
+        seasons = []
+        for season in range(Extents.Seasons):
+            ret = self.extractSeason(season)
+            seasons.append((int(ret.Month), int(ret.Day), int(ret.Schedule)))
+        holidays = []
+        for holiday in range(Extents.Holidays):
+            ret = self.extractHolidayDate(holiday)
+            holidays.append((int(ret.Month), int(ret.Day)))
+        wknd_hldy = self.extractHolidayWeekendSchedules()
+        months_kwh = []
+        months_rev_kwh = []
+        for month in range(Extents.Months):
+            ret = self.extractMonthTariff(month)
+            months_kwh.append((float(ret.kWh_Tariff_1), float(ret.kWh_Tariff_2), float(ret.kWh_Tariff_3),
+                               float(ret.kWh_Tariff_4), float(ret.kWh_Tot)))
+            months_rev_kwh.append((float(ret.Rev_kWh_Tariff_1), float(ret.Rev_kWh_Tariff_2),
+                                   float(ret.Rev_kWh_Tariff_3), float(ret.Rev_kWh_Tariff_4),
+                                   float(ret.Rev_kWh_Tot)))
+        return MeterSettings(self.m_meter_address, tuple(schedules), tuple(seasons), tuple(holidays),
+                             int(wknd_hldy.Weekend), int(wknd_hldy.Holiday), tuple(months_kwh),
+                             tuple(months_rev_kwh), int(time.time() * 1000))
+
     def writeCmdMsg(self, msg):
         """ Internal method to set the command result string.
 
         Args:
             msg (str): Message built during command.
         """
-        ekm_log("(writeCmdMsg | " + self.getContext() + ") " + msg)
+        ekm_log("(writeCmdMsg | %s) %s", self.m_context, msg)
         self.m_command_msg = msg
 
     def readCmdMsg(self):
@@ -3068,14 +7600,17 @@ class Meter(object):
             bool: True on completion and ACK.
         """
         result = False
+        session = self.m_session
+        if session is not None and session.m_active and session.m_authenticated == password_str:
+            return True
         try:
-            req_start = "0150310228" + str2hex(password_str) + "2903"
-            req_crc = self.calc_crc16(hex2str(req_start[2:]))
-            req_str = req_start + req_crc
-            self.m_serial_port.write(hex2str(req_str))
+            req_str = CommandFrame.get("P").buildPayload(password_str)
+            self.m_serial_port.write(req_str)
             if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
                 ekm_log("Password accepted (" + self.getContext() + ")")
                 result = True
+                if session is not None:
+                    session.m_authenticated = password_str
             else:
                 ekm_log("Password call failure no 06(" + self.getContext() + ")")
         except:
@@ -3089,45 +7624,1016 @@ class Meter(object):
 class MeterObserver(object):
     """ Unenforced abstract base class for implementations of the observer pattern.
 
-    To use, you must override the constructor and update().
+    To use, you must override the constructor and update().  Set
+    m_snapshot_update to True to be passed an immutable
+    :class:`~ekmmeters.ReadSnapshot` instead of the live read buffer.
     """
 
+    m_snapshot_update = False
+
     def __init__(self):
         pass
 
-    def update(self, definition_buffer):
-        """ Called by attached :class:`~ekmmeters.Meter` on every :func:`~ekmmeters.Meter.request`.
+    def update(self, definition_buffer):
+        """ Called by attached :class:`~ekmmeters.Meter` on every :func:`~ekmmeters.Meter.request`.
+
+        Args:
+            definition_buffer (SerialBlock): SerialBlock for request, or a
+                ReadSnapshot if m_snapshot_update is set.
+        """
+        pass
+
+
+class IntervalObserver(MeterObserver):
+    """ Simplest possible MeterObserver subclass.  Use as template. """
+
+    def __init__(self, interval):
+        """
+
+        Args:
+            interval (int): Interval to summarize
+        """
+        super(IntervalObserver, self).__init__()
+        self.m_interval = interval
+        self.m_summary = SerialBlock()
+        pass
+
+    def update(self, def_buf):
+        """ Required override of update method called by meter.
+
+        No op in this example subclass.
+
+        Args:
+            def_buf (SerialBlock): Buffer from last read.
+        """
+        ekm_log("Example update() in IntervalObserver called.")
+        pass
+
+
+class QueuedObserver(MeterObserver):
+    """ Non-blocking wrapper which runs another observer on its own worker thread.
+
+    The meter polling thread only queues the read snapshot.  The wrapped
+    observer's update() is called on a daemon worker, so a slow database write or
+    HTTP push no longer delays the next serial request.  When the queue is full,
+    the :class:`~ekmmeters.DispatchPolicy` decides what is discarded.
+
+    With a timeout, each update() runs on its own call thread and the worker
+    stops waiting for it when the timeout expires, so a hung observer cannot
+    stall delivery.  Python cannot kill the abandoned call, so while it is
+    still running later reads wait up to the timeout for it and are skipped,
+    counted in timeouts, rather than calling update() concurrently.
+
+    If an asyncio loop is passed, the wrapped observer's update() must be a
+    coroutine function.  It is scheduled on the loop and cancelled when it runs
+    past the timeout.
+    """
+
+    def __init__(self, observer, max_queue=16, policy=DispatchPolicy.DropOldest, timeout=0, loop=None):
+        """
+        Args:
+            observer (MeterObserver): Observer to run off the polling thread.
+            max_queue (int): Undelivered reads held before the policy applies.
+            policy (str): A :class:`~ekmmeters.DispatchPolicy` value.
+            timeout (float): Seconds the worker waits for each update(), zero for no limit.
+            loop (asyncio loop): Optional event loop for coroutine observers.
+        """
+        super(QueuedObserver, self).__init__()
+        self.m_observer = observer
+        self.m_max_queue = max(1, int(max_queue))
+        self.m_policy = policy
+        self.m_timeout = timeout
+        self.m_loop = loop
+        self.m_pending = deque()
+        self.m_cond = threading.Condition()
+        self.m_stopped = False
+        self.m_enqueued = 0
+        self.m_dispatched = 0
+        self.m_dropped = 0
+        self.m_coalesced = 0
+        self.m_timeouts = 0
+        self.m_errors = 0
+        self.m_lag_last = 0.0
+        self.m_lag_max = 0.0
+        self.m_lag_sum = 0.0
+        self.m_call = None
+        self.m_worker = threading.Thread(target=self.dispatchLoop, name="ekm-observer")
+        self.m_worker.daemon = True
+        self.m_worker.start()
+
+    def getObserver(self):
+        """ Getter for the wrapped observer.
+
+        Returns:
+            MeterObserver: Observer passed at construction.
+        """
+        return self.m_observer
+
+    m_snapshot_update = True
+
+    def update(self, def_buf):
+        """ Queue the read snapshot for the worker.  Called on the polling thread.
+
+        Args:
+            def_buf (ReadSnapshot): Snapshot of last read.  A SerialBlock is copied.
+        """
+        if not isinstance(def_buf, ReadSnapshot):
+            def_buf = ReadSnapshot.fromBlock(def_buf)
+        item = (time.time(), def_buf)
+        with self.m_cond:
+            if self.m_stopped:
+                return
+            if self.m_policy == DispatchPolicy.Coalesce:
+                if self.m_pending:
+                    self.m_pending.clear()
+                    self.m_coalesced += 1
+            elif len(self.m_pending) >= self.m_max_queue:
+                if self.m_policy == DispatchPolicy.DropOldest:
+                    self.m_pending.popleft()
+                    self.m_dropped += 1
+                elif self.m_policy == DispatchPolicy.Block:
+                    deadline = time.time() + self.m_timeout
+                    while len(self.m_pending) >= self.m_max_queue and not self.m_stopped:
+                        if not self.m_timeout:
+                            self.m_cond.wait()
+                            continue
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            break
+                        self.m_cond.wait(remaining)
+                    if len(self.m_pending) >= self.m_max_queue:
+                        self.m_dropped += 1
+                        return
+                else:
+                    self.m_dropped += 1
+                    return
+            self.m_pending.append(item)
+            self.m_enqueued += 1
+            self.m_cond.notify_all()
+
+    def dispatchLoop(self):
+        """ Worker thread body.  Delivers queued reads until stopped and drained. """
+        while True:
+            with self.m_cond:
+                while not self.m_pending and not self.m_stopped:
+                    self.m_cond.wait()
+                if not self.m_pending:
+                    return
+                queued_at, snap = self.m_pending.popleft()
+                self.m_cond.notify_all()
+
+            start = time.time()
+            lag = start - queued_at
+            self.m_lag_last = lag
+            self.m_lag_sum += lag
+            if lag > self.m_lag_max:
+                self.m_lag_max = lag
+
+            try:
+                if self.m_loop is not None:
+                    self.dispatchAsync(snap)
+                elif self.m_timeout:
+                    self.dispatchTimed(snap)
+                else:
+                    self.m_observer.update(snap)
+            except:
+                self.m_errors += 1
+                ekm_log(traceback.format_exc())
+            self.m_dispatched += 1
+
+    def dispatchTimed(self, snap):
+        """ Run update() on a call thread, abandoning it on timeout.
+
+        Args:
+            snap (ReadSnapshot): Read to deliver.
+        """
+        if self.m_call is not None:
+            self.m_call.join(self.m_timeout)
+            if self.m_call.is_alive():
+                self.m_timeouts += 1
+                ekm_log("Observer update still running, read skipped.")
+                return
+        errors = []
+
+        def call():
+            try:
+                self.m_observer.update(snap)
+            except:
+                errors.append(traceback.format_exc())
+
+        self.m_call = threading.Thread(target=call, name="ekm-observer-call")
+        self.m_call.daemon = True
+        self.m_call.start()
+        self.m_call.join(self.m_timeout)
+        if self.m_call.is_alive():
+            self.m_timeouts += 1
+            ekm_log("Observer update abandoned after " + str(self.m_timeout) + "s timeout.")
+            return
+        self.m_call = None
+        if errors:
+            self.m_errors += 1
+            ekm_log(errors[0])
+
+    def dispatchAsync(self, snap):
+        """ Run a coroutine update() on the attached loop, cancelling it on timeout.
+
+        Args:
+            snap (ReadSnapshot): Read to deliver.
+        """
+        import asyncio
+        future = asyncio.run_coroutine_threadsafe(self.m_observer.update(snap), self.m_loop)
+        try:
+            future.result(self.m_timeout if self.m_timeout else None)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self.m_timeouts += 1
+            ekm_log("Observer update cancelled after " + str(self.m_timeout) + "s timeout.")
+
+    def stop(self, drain=True, wait=None):
+        """ Stop the worker thread.
+
+        Args:
+            drain (bool): Deliver reads already queued before stopping.
+            wait (float): Optional seconds to wait for the worker to finish.
+        """
+        with self.m_cond:
+            self.m_stopped = True
+            if not drain:
+                self.m_dropped += len(self.m_pending)
+                self.m_pending.clear()
+            self.m_cond.notify_all()
+        if self.m_worker is not threading.current_thread():
+            self.m_worker.join(wait)
+
+    def getStats(self):
+        """ Delivery and lag counters for this observer.
+
+        Returns:
+            dict: Counts, current queue depth and lag in seconds.
+        """
+        with self.m_cond:
+            depth = len(self.m_pending)
+        lag_mean = 0.0
+        if self.m_dispatched > 0:
+            lag_mean = self.m_lag_sum / self.m_dispatched
+        return {"queued": depth,
+                "enqueued": self.m_enqueued,
+                "dispatched": self.m_dispatched,
+                "dropped": self.m_dropped,
+                "coalesced": self.m_coalesced,
+                "timeouts": self.m_timeouts,
+                "errors": self.m_errors,
+                "lag_last": self.m_lag_last,
+                "lag_max": self.m_lag_max,
+                "lag_mean": lag_mean}
+
+
+class WindowAccumulator(object):
+    """ Running count, min, max, mean, standard deviation, last and delta for one field.
+
+    Every add() is O(1) amortized.  With no interval the accumulator keeps totals
+    until reset(), for tumbling windows.  With an interval it keeps a trailing
+    sample ring, subtracting expired samples from the sums and holding monotonic
+    queues for min and max, for sliding windows.  Sums are kept relative to the
+    first sample so large register values do not lose variance precision.
+    """
+
+    def __init__(self, interval=0):
+        """
+        Args:
+            interval (float): Sliding window length in seconds, zero for tumbling.
+        """
+        self.m_interval = interval
+        self.m_samples = deque()
+        self.m_min_queue = deque()
+        self.m_max_queue = deque()
+        self.reset()
+
+    def reset(self):
+        """ Discard all samples. """
+        self.m_count = 0
+        self.m_shift = None
+        self.m_sum = 0.0
+        self.m_sum_sq = 0.0
+        self.m_min = None
+        self.m_max = None
+        self.m_first = None
+        self.m_last = None
+        self.m_samples.clear()
+        self.m_min_queue.clear()
+        self.m_max_queue.clear()
+
+    def add(self, sample_time, value):
+        """ Add one sample.
+
+        Args:
+            sample_time (float): Epoch seconds.
+            value (float): Sample value.
+        """
+        if self.m_shift is None:
+            self.m_shift = value
+        offset = value - self.m_shift
+        self.m_count += 1
+        self.m_sum += offset
+        self.m_sum_sq += offset * offset
+        self.m_last = value
+
+        if not self.m_interval:
+            if self.m_first is None:
+                self.m_first = self.m_min = self.m_max = value
+            elif value < self.m_min:
+                self.m_min = value
+            elif value > self.m_max:
+                self.m_max = value
+            return
+
+        sample = (sample_time, value)
+        self.m_samples.append(sample)
+        while self.m_max_queue and self.m_max_queue[-1][1] <= value:
+            self.m_max_queue.pop()
+        self.m_max_queue.append(sample)
+        while self.m_min_queue and self.m_min_queue[-1][1] >= value:
+            self.m_min_queue.pop()
+        self.m_min_queue.append(sample)
+        self.expire(sample_time)
+
+    def expire(self, now):
+        """ Drop sliding window samples older than the interval.
+
+        Args:
+            now (float): Epoch seconds.
+        """
+        if not self.m_interval:
+            return
+        cutoff = now - self.m_interval
+        samples = self.m_samples
+        while samples and samples[0][0] <= cutoff:
+            sample = samples.popleft()
+            offset = sample[1] - self.m_shift
+            self.m_count -= 1
+            self.m_sum -= offset
+            self.m_sum_sq -= offset * offset
+            if self.m_max_queue and self.m_max_queue[0] is sample:
+                self.m_max_queue.popleft()
+            if self.m_min_queue and self.m_min_queue[0] is sample:
+                self.m_min_queue.popleft()
+        if not samples:
+            self.reset()
+
+    def summarize(self, meter_address, fld, start_time, end_time):
+        """ Current window as a record.
+
+        Args:
+            meter_address (str): 12 character meter address.
+            fld (str): Summarized :class:`~ekmmeters.Field`.
+            start_time (float): Window start, epoch seconds.
+            end_time (float): Window end, epoch seconds.
+
+        Returns:
+            WindowSummary: Statistics, or None if the window is empty.
+        """
+        if self.m_count <= 0:
+            return None
+        mean_offset = self.m_sum / self.m_count
+        variance = (self.m_sum_sq / self.m_count) - (mean_offset * mean_offset)
+        if self.m_interval:
+            low = self.m_min_queue[0][1]
+            high = self.m_max_queue[0][1]
+            first = self.m_samples[0][1]
+        else:
+            low = self.m_min
+            high = self.m_max
+            first = self.m_first
+        return WindowSummary(meter_address, fld, int(start_time * 1000), int(end_time * 1000),
+                             self.m_count, low, high, self.m_shift + mean_offset,
+                             math.sqrt(max(0.0, variance)), self.m_last, self.m_last - first)
+
+
+class SummaryObserver(MeterObserver):
+    """ Windowed statistics over any set of numeric fields, per meter.
+
+    Emits one :class:`~ekmmeters.WindowSummary` per field for each window,
+    to an optional callback and an optional :class:`~ekmmeters.MeterDB`
+    (see :func:`~ekmmeters.MeterDB.dbCreateSummary`).  One observer may be
+    registered on many meters; windows are kept by meter address.
+    """
+
+    m_snapshot_update = True
+
+    def __init__(self, interval, fields, window_type=WindowType.Tumbling, hop=0,
+                 callback=None, meter_db=None):
+        """
+        Args:
+            interval (float): Window length in seconds.
+            fields (list): :class:`~ekmmeters.Field` values to summarize.
+            window_type (str): A :class:`~ekmmeters.WindowType` value.
+            hop (float): Sliding windows only, seconds between summaries.  Zero is every read.
+            callback (function): Optional, called with the list of summaries for a window.
+            meter_db (MeterDB): Optional, summaries are inserted with dbInsertSummary().
+        """
+        super(SummaryObserver, self).__init__()
+        self.m_interval = interval
+        self.m_fields = list(fields)
+        self.m_window_type = window_type
+        self.m_hop = hop
+        self.m_callback = callback
+        self.m_meter_db = meter_db
+        self.m_windows = {}
+        self.m_window_index = {}
+        self.m_last_emit = {}
+        self.m_summaries = []
+
+    def update(self, def_buf):
+        """ Add the read to the meter's windows, emitting any completed window.
+
+        Args:
+            def_buf (ReadSnapshot): Snapshot of last read.
+        """
+        if isinstance(def_buf, ReadSnapshot):
+            now = def_buf.getTimeStamp() / 1000.0
+        else:
+            now = time.time()
+        address = def_buf[Field.Meter_Address][MeterData.StringValue]
+
+        windows = self.m_windows.get(address)
+        if windows is None:
+            sliding_interval = self.m_interval if self.m_window_type == WindowType.Sliding else 0
+            windows = [WindowAccumulator(sliding_interval) for fld in self.m_fields]
+            self.m_windows[address] = windows
+
+        if self.m_window_type == WindowType.Sliding:
+            self.addSamples(windows, def_buf, now)
+            last_emit = self.m_last_emit.get(address)
+            if last_emit is None or (now - last_emit) >= self.m_hop:
+                self.m_last_emit[address] = now
+                self.emit(address, now - self.m_interval, now)
+            return
+
+        window_index = int(now // self.m_interval)
+        current_index = self.m_window_index.get(address)
+        if current_index is not None and current_index != window_index:
+            self.emit(address, current_index * self.m_interval, (current_index + 1) * self.m_interval)
+            for window in windows:
+                window.reset()
+        self.m_window_index[address] = window_index
+        self.addSamples(windows, def_buf, now)
+
+    def addSamples(self, windows, def_buf, now):
+        """ Add the numeric native value of each summarized field present in the read. """
+        for idx, fld in enumerate(self.m_fields):
+            if fld not in def_buf:
+                continue
+            value = def_buf[fld][MeterData.NativeValue]
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                windows[idx].add(now, value)
+
+    def emit(self, address, start_time, end_time):
+        """ Summarize one meter's windows and deliver the records.
+
+        Args:
+            address (str): 12 character meter address.
+            start_time (float): Window start, epoch seconds.
+            end_time (float): Window end, epoch seconds.
+        """
+        summaries = []
+        for idx, fld in enumerate(self.m_fields):
+            summary = self.m_windows[address][idx].summarize(address, fld, start_time, end_time)
+            if summary is not None:
+                summaries.append(summary)
+        self.m_summaries = summaries
+        if not summaries:
+            return
+        if self.m_callback:
+            self.m_callback(summaries)
+        if self.m_meter_db:
+            for summary in summaries:
+                self.m_meter_db.dbInsertSummary(summary)
+
+    def flush(self):
+        """ Emit partially filled tumbling windows, as at shutdown. """
+        if self.m_window_type != WindowType.Tumbling:
+            return
+        for address in list(self.m_window_index.keys()):
+            window_index = self.m_window_index[address]
+            self.emit(address, window_index * self.m_interval, (window_index + 1) * self.m_interval)
+            for window in self.m_windows[address]:
+                window.reset()
+
+    def getSummaries(self):
+        """ Records from the most recently emitted window.
+
+        Returns:
+            list: :class:`~ekmmeters.WindowSummary` records.
+        """
+        return self.m_summaries
+
+
+class ReadHistory(object):
+    """ Fixed capacity, array backed history of numeric fields for one meter.
+
+    Times (epoch seconds) and each field's values are kept in array('d')
+    rings which store every sample twice, at its slot and one capacity
+    later, so the samples always sit in one contiguous run.  append() is
+    O(1) and getWindow() finds its bounds with bisect over that run, with
+    no copying until the window is sliced out.  Samples must arrive in time
+    order; an older sample than the last is dropped.
+    """
+
+    def __init__(self, fields, capacity=3600):
+        """
+        Args:
+            fields (list): Numeric :class:`~ekmmeters.Field` values to keep.
+            capacity (int): Samples kept; the oldest is dropped when full.
+        """
+        self.m_fields = tuple(fields)
+        self.m_capacity = capacity
+        self.m_times = array("d", [0.0]) * (capacity * 2)
+        self.m_values = [array("d", [0.0]) * (capacity * 2) for fld in self.m_fields]
+        self.m_accessor = FieldAccessor(self.m_fields)
+        self.m_lock = threading.Lock()
+        self.m_start = 0
+        self.m_count = 0
+
+    def __len__(self):
+        return self.m_count
+
+    def getFieldNames(self):
+        """ Fields kept, in getWindow() order. """
+        return self.m_fields
+
+    def getCapacity(self):
+        """ Maximum samples kept. """
+        return self.m_capacity
+
+    def clear(self):
+        """ Discard all samples. """
+        with self.m_lock:
+            self.m_start = 0
+            self.m_count = 0
+
+    def append(self, sample_time, values):
+        """ Add one sample.
+
+        Args:
+            sample_time (float): Epoch seconds.
+            values (sequence): One number per field, None for NaN.
+
+        Returns:
+            bool: False if the sample was older than the last and dropped.
+        """
+        capacity = self.m_capacity
+        with self.m_lock:
+            if self.m_count:
+                last = self.m_start + self.m_count - 1
+                if sample_time < self.m_times[last]:
+                    return False
+            if self.m_count == capacity:
+                self.m_start = (self.m_start + 1) % capacity
+            else:
+                self.m_count += 1
+            slot = (self.m_start + self.m_count - 1) % capacity
+            self.m_times[slot] = self.m_times[slot + capacity] = sample_time
+            for column, value in zip(self.m_values, values):
+                if value is None:
+                    value = float("nan")
+                column[slot] = column[slot + capacity] = value
+        return True
+
+    def addRead(self, def_buf, sample_time=None):
+        """ Add the native values of the kept fields from one read.
+
+        Args:
+            def_buf (ReadSnapshot): Read, or a :class:`~ekmmeters.SerialBlock`.
+            sample_time (float): Optional epoch seconds, defaults to the
+                snapshot time stamp or now.
+
+        Returns:
+            bool: False if the sample was dropped.
+        """
+        if isinstance(def_buf, ReadSnapshot):
+            values = self.m_accessor(def_buf)
+            if sample_time is None:
+                sample_time = def_buf.getTimeStamp() / 1000.0
+        else:
+            native = MeterData.NativeValue
+            values = [def_buf[fld][native] if fld in def_buf else None for fld in self.m_fields]
+        if sample_time is None:
+            sample_time = time.time()
+        numbers = []
+        for value in values:
+            try:
+                numbers.append(float(value))
+            except (TypeError, ValueError):
+                numbers.append(None)
+        return self.append(sample_time, numbers)
+
+    def findWindow(self, start_time=None, end_time=None):
+        """ Physical bounds of the samples with start_time <= time <= end_time.  Private.
+
+        Returns:
+            tuple: lo and hi indexes into the doubled arrays.
+        """
+        lo = self.m_start
+        hi = self.m_start + self.m_count
+        if start_time is not None:
+            lo = bisect.bisect_left(self.m_times, start_time, lo, hi)
+        if end_time is not None:
+            hi = bisect.bisect_right(self.m_times, end_time, lo, hi)
+        return lo, hi
+
+    def getWindow(self, start_time=None, end_time=None, as_numpy=False):
+        """ Samples with start_time <= time <= end_time, oldest first.
+
+        Args:
+            start_time (float): Epoch seconds, default the oldest sample.
+            end_time (float): Epoch seconds, default the newest sample.
+            as_numpy (bool): Return numpy arrays instead of array('d').
+
+        Returns:
+            tuple: Times and a list of value arrays in getFieldNames() order.
+        """
+        with self.m_lock:
+            lo, hi = self.findWindow(start_time, end_time)
+            times = self.m_times[lo:hi]
+            values = [column[lo:hi] for column in self.m_values]
+        if as_numpy:
+            import numpy
+            times = numpy.frombuffer(times, dtype=numpy.float64)
+            values = [numpy.frombuffer(column, dtype=numpy.float64) for column in values]
+        return times, values
+
+    def getLast(self, seconds, as_numpy=False):
+        """ Samples in the trailing seconds before the newest sample.
+
+        Args:
+            seconds (float): Window length.
+            as_numpy (bool): Return numpy arrays instead of array('d').
+
+        Returns:
+            tuple: As :func:`~ekmmeters.ReadHistory.getWindow`.
+        """
+        with self.m_lock:
+            newest = self.m_times[self.m_start + self.m_count - 1] if self.m_count else 0.0
+        return self.getWindow(newest - seconds, None, as_numpy)
+
+    def getField(self, fld, start_time=None, end_time=None):
+        """ Values of one field in a window.
+
+        Args:
+            fld (str): A kept :class:`~ekmmeters.Field` value.
+            start_time (float): Epoch seconds, default the oldest sample.
+            end_time (float): Epoch seconds, default the newest sample.
+
+        Returns:
+            array: array('d') of values, oldest first.
+        """
+        column = self.m_values[self.m_fields.index(fld)]
+        with self.m_lock:
+            lo, hi = self.findWindow(start_time, end_time)
+            return column[lo:hi]
+
+    def export(self, path, start_time=None, end_time=None, fmt=None):
+        """ Write a window to a columnar file with :class:`~ekmmeters.ReadExporter`.
+
+        Every kept field is written as a float column, with Time_Stamp in ms.
+
+        Args:
+            path (str): File to write, format extension added if none.
+            start_time (float): Epoch seconds, default the oldest sample.
+            end_time (float): Epoch seconds, default the newest sample.
+            fmt (str): Optional :class:`~ekmmeters.ExportFormat` value.
+
+        Returns:
+            str: Path written.
+        """
+        layout = SerialBlock()
+        for fld in self.m_fields:
+            layout[fld] = [8, FieldType.Float, ScaleType.No, "", 0.0, False, False]
+        times, values = self.getWindow(start_time, end_time)
+        with ReadExporter(path, layout, fmt) as exporter:
+            time_stamps = [int(sample_time * 1000) for sample_time in times]
+            exporter.writeRows(zip(*(values + [time_stamps])))
+        return exporter.getPath()
+
+    def countWindow(self, start_time=None, end_time=None):
+        """ Number of samples in a window, without copying.
+
+        Args:
+            start_time (float): Epoch seconds, default the oldest sample.
+            end_time (float): Epoch seconds, default the newest sample.
+        """
+        with self.m_lock:
+            lo, hi = self.findWindow(start_time, end_time)
+        return hi - lo
+
+
+class HistoryObserver(MeterObserver):
+    """ Keeps a :class:`~ekmmeters.ReadHistory` per meter address.
+
+    One observer may be registered on many meters.
+    """
+
+    m_snapshot_update = True
+
+    def __init__(self, fields, capacity=3600):
+        """
+        Args:
+            fields (list): Numeric :class:`~ekmmeters.Field` values to keep.
+            capacity (int): Samples kept per meter.
+        """
+        super(HistoryObserver, self).__init__()
+        self.m_fields = list(fields)
+        self.m_capacity = capacity
+        self.m_histories = {}
+
+    def update(self, def_buf):
+        """ Add the read to its meter's history.
+
+        Args:
+            def_buf (ReadSnapshot): Snapshot of last read.
+        """
+        address = def_buf[Field.Meter_Address][MeterData.StringValue]
+        history = self.m_histories.get(address)
+        if history is None:
+            history = ReadHistory(self.m_fields, self.m_capacity)
+            self.m_histories[address] = history
+        history.addRead(def_buf)
+
+    def getHistory(self, address):
+        """ History for one meter, None before its first read.
+
+        Args:
+            address (str): 12 character meter address.
+
+        Returns:
+            ReadHistory: History of the meter.
+        """
+        return self.m_histories.get(address)
+
+    def getAddresses(self):
+        """ Addresses of meters with a history. """
+        return list(self.m_histories.keys())
+
+
+class EventRule(object):
+    """ Declarative rule for :class:`~ekmmeters.EventObserver`.
+
+    Threshold and rate rules raise when the test holds for debounce consecutive
+    reads, and clear when the value crosses back past clear_level for debounce
+    reads.  Transition rules fire when a masked state field holds a new value
+    for debounce reads, filtered by optional from and to states.
+    """
+
+    def __init__(self, name, fld, rule_type, level=0, clear_level=None, debounce=1,
+                 mask=None, from_state=None, to_state=None):
+        """
+        Args:
+            name (str): Rule name, returned in each :class:`~ekmmeters.MeterEvent`.
+            fld (str): :class:`~ekmmeters.Field` to test.
+            rule_type (str): An :class:`~ekmmeters.EventRuleType` value.
+            level (float): Threshold, or change per second for rate rules.
+            clear_level (float): Hysteresis level to clear, defaults to level.
+            debounce (int): Consecutive reads required to raise, clear or change.
+            mask (int): Transition only, bits of the state value to compare.
+            from_state (int or list): Transition only, prior states to match, None for any.
+            to_state (int or list): Transition only, new states to match, None for any.
+        """
+        self.m_name = name
+        self.m_field = fld
+        self.m_rule_type = rule_type
+        self.m_level = level
+        self.m_clear_level = level if clear_level is None else clear_level
+        self.m_debounce = max(1, int(debounce))
+        self.m_mask = mask
+        self.m_from_state = self.stateSet(from_state)
+        self.m_to_state = self.stateSet(to_state)
+
+    @staticmethod
+    def stateSet(state):
+        """ Normalize a from/to state argument to a tuple or None. """
+        if state is None:
+            return None
+        if isinstance(state, (list, tuple, set, frozenset)):
+            return tuple(state)
+        return (state,)
+
+
+class EventObserver(MeterObserver):
+    """ Rule based alarms and state change detection.
+
+    The rule list is compiled once per meter field layout into a single
+    straight line Python function, so each read costs one call and a few
+    comparisons per rule rather than a rule object dispatch.  Each rule runs
+    in its own try block, so a rule which raises, as when comparing a string
+    field with a numeric level, is counted in getRuleErrors() and does not
+    stop the rules after it.  Rule state is kept per meter address, so one
+    observer may be registered on many meters.
+    """
+
+    m_snapshot_update = True
+    m_state_slots = 4
+
+    def __init__(self, rules, callback=None):
+        """
+        Args:
+            rules (list): :class:`~ekmmeters.EventRule` instances.
+            callback (function): Called with each :class:`~ekmmeters.MeterEvent`.
+        """
+        super(EventObserver, self).__init__()
+        self.m_rules = list(rules)
+        self.m_callback = callback
+        self.m_evaluators = {}
+        self.m_meters = {}
+        self.m_events = []
+        self.m_rule_errors = {}
+
+    def compileRules(self, keys, index):
+        """ Generate the evaluator for one field layout.
+
+        Rules on fields not in the layout are left out.  The generated function is
+        evaluate(fields, s, now, emit, fail), where fields are the snapshot value
+        tuples, s is the per meter state list, emit(rule_index, event, value, previous)
+        and fail(rule_index) is called when a rule raises.
+
+        Args:
+            keys (tuple): Field names in read order.
+            index (dict): Field name to position in keys.
+
+        Returns:
+            function: Compiled evaluator.
+        """
+        constants = {"Raise": EventState.Raise, "Clear": EventState.Clear,
+                     "Change": EventState.Change}
+        lines = ["def evaluate(fields, s, now, emit, fail):"]
+        for idx, rule in enumerate(self.m_rules):
+            if rule.m_field not in index:
+                continue
+            base = idx * self.m_state_slots
+            active, count, prev, prev_time = ["s[%d]" % (base + slot) for slot in range(4)]
+            level = "L%d" % idx
+            clear_level = "C%d" % idx
+            constants[level] = rule.m_level
+            constants[clear_level] = rule.m_clear_level
+            body = ["v = fields[%d][%d]" % (index[rule.m_field], MeterData.NativeValue)]
+
+            if rule.m_rule_type == EventRuleType.Transition:
+                if rule.m_mask is not None:
+                    body.append("v = v & %d" % int(rule.m_mask))
+                match = []
+                if rule.m_from_state is not None:
+                    constants["F%d" % idx] = rule.m_from_state
+                    match.append("p in F%d" % idx)
+                if rule.m_to_state is not None:
+                    constants["T%d" % idx] = rule.m_to_state
+                    match.append("v in T%d" % idx)
+                body += ["if %s is None:" % active,
+                         "    %s = v" % active,
+                         "elif v != %s:" % active,
+                         "    if v == %s:" % prev,
+                         "        %s += 1" % count,
+                         "    else:",
+                         "        %s = v" % prev,
+                         "        %s = 1" % count,
+                         "    if %s >= %d:" % (count, rule.m_debounce),
+                         "        p = %s" % active,
+                         "        %s = v" % active,
+                         "        %s = 0" % count]
+                if match:
+                    body += ["        if %s:" % " and ".join(match),
+                             "            emit(%d, Change, v, p)" % idx]
+                else:
+                    body.append("        emit(%d, Change, v, p)" % idx)
+                body += ["else:",
+                         "    %s = 0" % count]
+            else:
+                if rule.m_rule_type in (EventRuleType.Above, EventRuleType.RateAbove):
+                    raise_test = "v > %s" % level
+                    clear_test = "v < %s" % clear_level
+                else:
+                    raise_test = "v < %s" % level
+                    clear_test = "v > %s" % clear_level
+                test = ["if %s:" % active,
+                        "    if %s:" % clear_test,
+                        "        %s += 1" % count,
+                        "        if %s >= %d:" % (count, rule.m_debounce),
+                        "            %s = 0" % active,
+                        "            %s = 0" % count,
+                        "            emit(%d, Clear, v, None)" % idx,
+                        "    else:",
+                        "        %s = 0" % count,
+                        "elif %s:" % raise_test,
+                        "    %s += 1" % count,
+                        "    if %s >= %d:" % (count, rule.m_debounce),
+                        "        %s = 1" % active,
+                        "        %s = 0" % count,
+                        "        emit(%d, Raise, v, None)" % idx,
+                        "else:",
+                        "    %s = 0" % count]
+                if rule.m_rule_type in (EventRuleType.RateAbove, EventRuleType.RateBelow):
+                    body += ["pv = %s" % prev,
+                             "pt = %s" % prev_time,
+                             "%s = v" % prev,
+                             "%s = now" % prev_time,
+                             "if pt is not None and now > pt:",
+                             "    v = (v - pv) / (now - pt)"]
+                    body += ["    " + line for line in test]
+                else:
+                    body += test
+            lines.append("    try:")
+            lines += ["        " + line for line in body]
+            lines += ["    except Exception:",
+                      "        fail(%d)" % idx]
+        lines.append("    return")
+
+        source = "\n".join(lines) + "\n"
+        ekm_log("EventObserver compiled " + str(len(self.m_rules)) + " rules for " +
+                str(len(keys)) + " fields", priority=4)
+        code = compile(source, "<EventObserver>", "exec")
+        exec(code, constants)
+        return constants["evaluate"]
+
+    def newState(self):
+        """ Fresh per meter rule state list. """
+        state = []
+        for rule in self.m_rules:
+            if rule.m_rule_type == EventRuleType.Transition:
+                state += [None, 0, None, None]
+            else:
+                state += [0, 0, None, None]
+        return state
+
+    def update(self, def_buf):
+        """ Evaluate all rules against the read and deliver any events.
 
         Args:
-            definition_buffer (SerialBlock): SerialBlock for request
+            def_buf (ReadSnapshot): Snapshot of last read.
         """
-        pass
+        if not isinstance(def_buf, ReadSnapshot):
+            def_buf = ReadSnapshot.fromBlock(def_buf)
+        address = def_buf.getMeterAddress()
+
+        meter = self.m_meters.get(address)
+        if meter is None or meter[0] is not def_buf.m_keys:
+            evaluator = self.m_evaluators.get(def_buf.m_keys)
+            if evaluator is None:
+                evaluator = self.compileRules(def_buf.m_keys, def_buf.m_index)
+                self.m_evaluators[def_buf.m_keys] = evaluator
+            state = meter[2] if meter is not None else self.newState()
+            meter = (def_buf.m_keys, evaluator, state)
+            self.m_meters[address] = meter
+
+        events = []
+        time_stamp = def_buf.getTimeStamp()
+        rules = self.m_rules
+
+        def emit(rule_idx, event, value, previous):
+            rule = rules[rule_idx]
+            events.append(MeterEvent(address, rule.m_name, rule.m_field, event, value, previous, time_stamp))
+
+        def fail(rule_idx):
+            rule = rules[rule_idx]
+            count = self.m_rule_errors.get(rule.m_name, 0)
+            if not count:
+                ekm_log("EventObserver rule " + rule.m_name + " failed on " + address + ":\n" +
+                        traceback.format_exc())
+            self.m_rule_errors[rule.m_name] = count + 1
 
+        try:
+            meter[1](def_buf.m_fields, meter[2], time_stamp / 1000.0, emit, fail)
+        except:
+            ekm_log(traceback.format_exc())
 
-class IntervalObserver(MeterObserver):
-    """ Simplest possible MeterObserver subclass.  Use as template. """
+        if events:
+            self.m_events = events
+            if self.m_callback:
+                for event in events:
+                    self.m_callback(event)
 
-    def __init__(self, interval):
-        """
+    def getEvents(self):
+        """ Events from the most recent read which produced any.
 
-        Args:
-            interval (int): Interval to summarize
+        Returns:
+            list: :class:`~ekmmeters.MeterEvent` records.
         """
-        super(IntervalObserver, self).__init__()
-        self.m_interval = interval
-        self.m_summary = SerialBlock()
-        pass
+        return self.m_events
 
-    def update(self, def_buf):
-        """ Required override of update method called by meter.
+    def getRuleErrors(self):
+        """ Reads on which each failing rule raised, by rule name.  Only the
+        first failure of each rule is logged.
 
-        No op in this example subclass.
+        Returns:
+            dict: Rule name to error count.
+        """
+        return dict(self.m_rule_errors)
+
+    def resetMeter(self, address):
+        """ Forget rule state for one meter, as after a rewire or meter swap.
 
         Args:
-            def_buf (SerialBlock): Buffer from last read.
+            address (str): 12 character meter address.
         """
-        ekm_log("Example update() in IntervalObserver called.")
-        pass
+        if address in self.m_meters:
+            del self.m_meters[address]
 
 
 class V3Meter(Meter):
@@ -3227,32 +8733,72 @@ class V3Meter(Meter):
         self.m_a_crc = False
         start_context = self.getContext()
         self.setContext("request[v3A]")
+        latency = self.m_latency
+        if latency:
+            request_start = time.perf_counter()
+        metrics = ekmmeters_metrics
+        if metrics:
+            metrics.inc(Metric.ReadsAttempted, self.m_meter_address)
         try:
-            self.m_serial_port.write(hex2str("2f3f") +
-                                     self.m_meter_address +
-                                     hex2str("210d0a"))
-            self.m_raw_read_a = self.m_serial_port.getResponse(self.getContext())
-            unpacked_read_a = self.unpackStruct(self.m_raw_read_a, self.m_blk_a)
-            self.convertData(unpacked_read_a, self.m_blk_a, 1)
-            self.m_a_crc = self.crcMeterRead(self.m_raw_read_a, self.m_blk_a)
+            self.retryRead(self.requestA)
             if send_terminator:
                 self.serialPostEnd()
-            if (
-                self.m_a_crc
-                and self.m_blk_a['Meter_Address'][MeterData.StringValue] != self.m_meter_address
-            ):
+            if self.m_read_error in (ReadError.Address, ReadError.Circuit):
                 return False
+            if latency:
+                stage_start = time.perf_counter()
             self.calculateFields()
             self.makeReturnFormat()
+            self.m_read_time = int(time.time() * 1000)
+            if latency:
+                stage_start = latency.lap(LatencyStage.Calculate, stage_start)
+            if self.m_a_crc:
+                self.cacheBlockSettings(self.m_blk_a)
+                if metrics:
+                    metrics.inc(Metric.ReadsSucceeded, self.m_meter_address)
             self.updateObservers()
+            if latency:
+                latency.lap(LatencyStage.Observers, stage_start)
+                latency.lap(LatencyStage.Request, request_start)
         except:
             ekm_log(traceback.format_exc())
 
         self.setContext(start_context)
         return self.m_a_crc
 
+    def requestA(self):
+        """ Issue an A read on V3 meter, without calculated fields or observers.
+
+        Returns:
+            bool: True if CRC and address match at end of call.
+        """
+        latency = self.m_latency
+        if latency:
+            stage_start = time.perf_counter()
+        self.m_serial_port.write(hex2str("2f3f") +
+                                 self.m_meter_address +
+                                 hex2str("210d0a"))
+        if latency:
+            stage_start = latency.lap(LatencyStage.Write, stage_start)
+        self.m_raw_read_a = self.m_serial_port.getResponse(self.getContext())
+        self.m_read_time = int(time.time() * 1000)
+        if latency:
+            stage_start = latency.lap(LatencyStage.Response, stage_start)
+        unpacked_read_a = self.unpackStruct(self.m_raw_read_a, self.m_blk_a)
+        if latency:
+            stage_start = latency.lap(LatencyStage.Unpack, stage_start)
+        self.convertData(unpacked_read_a, self.m_blk_a, 1)
+        if latency:
+            stage_start = latency.lap(LatencyStage.Convert, stage_start)
+        self.m_a_crc = self.crcMeterRead(self.m_raw_read_a, self.m_blk_a)
+        if latency:
+            latency.lap(LatencyStage.Crc, stage_start)
+        return self.classifyRead(self.m_raw_read_a, self.m_a_crc,
+                                 self.m_blk_a['Meter_Address'][MeterData.StringValue] == self.m_meter_address)
+
     def makeReturnFormat(self):
         """ Strip reserved and CRC for m_req :class:`~ekmmeters.SerialBlock`. """
+        self.m_snapshot = None
         for fld in self.m_blk_a:
             compare_fld = fld.upper()
             if not "RESERVED" in compare_fld and not "CRC" in compare_fld:
@@ -3276,20 +8822,15 @@ class V3Meter(Meter):
 
         Args:
             meter_db (MeterDB): Instance of subclass of MeterDB.
+
+        Returns:
+            The dbInsert() result, False if no MeterDB or the insert failed.
         """
         if meter_db:
-            meter_db.dbInsert(self.m_req, self.m_raw_read_a, self.m_raw_read_b)
+            return meter_db.dbInsert(self.m_req, self.m_raw_read_a, self.m_raw_read_b)
         else:
             ekm_log("Attempt to insert when no MeterDB assigned.")
-        pass
-
-    def updateObservers(self):
-        """ Fire update method in all attached observers in order of attachment. """
-        for observer in self.m_observers:
-            try:
-                observer.update(self.m_req)
-            except:
-                ekm_log(traceback.format_exc())
+        return False
 
     def getField(self, fld_name):
         """ Return :class:`~ekmmeters.Field` content, scaled and formatted.
@@ -3309,7 +8850,7 @@ class V3Meter(Meter):
         return result
 
     def calculateFields(self):
-
+        self.m_snapshot = None
         pf1 = self.m_blk_a[Field.Cos_Theta_Ln_1][MeterData.StringValue]
         pf2 = self.m_blk_a[Field.Cos_Theta_Ln_2][MeterData.StringValue]
         pf3 = self.m_blk_a[Field.Cos_Theta_Ln_3][MeterData.StringValue]
@@ -3334,7 +8875,7 @@ class V3Meter(Meter):
 
     def serialPostEnd(self):
         """ Post termination code to implicitly current meter. """
-        ekm_log("Termination string sent (" + self.m_context + ")")
+        ekm_log("Termination string sent (%s)", self.m_context)
         self.m_serial_port.write(hex2str("0142300375"))
         pass
 
@@ -3548,39 +9089,55 @@ class V4Meter(Meter):
         Returns:
             bool: True on completion.
         """
+        latency = self.m_latency
+        if latency:
+            request_start = time.perf_counter()
+        metrics = ekmmeters_metrics
+        if metrics:
+            metrics.inc(Metric.ReadsAttempted, self.m_meter_address)
         try:
-            retA = self.requestA()
-            
+            retA = self.retryRead(self.requestA)
+            retB = False
+
             if retA == True:
                 try:
                     self.requestBreadCounter[self.m_meter_address] = self.requestBreadCounter[self.m_meter_address] + 1
                 except:
                     self.requestBreadCounter[self.m_meter_address] = self.requestBinterval + 1
-                    
-                if self.requestBreadCounter[self.m_meter_address]>self.requestBinterval:
-                    retB = self.requestB()
-
-                    if retB == False:
-                        try:
-                            self.m_blk_b = self.requestBread[self.m_meter_address]
-                            retB = True
-                        except:
-                            retB = self.requestB()
-                            if retB == True:
-                                self.requestBread[self.m_meter_address] = self.m_blk_b
-                                self.requestBreadCounter[self.m_meter_address] = 0
-                    else:
+
+                cached_b = self.requestBread.get(self.m_meter_address)
+                if self.requestBreadCounter[self.m_meter_address] > self.requestBinterval or cached_b is None:
+                    # without a cached B block, B is tried twice even with no retry policy
+                    retB = self.retryRead(self.requestB, 1 if cached_b is not None else 2)
+                    if retB == True:
                         self.requestBread[self.m_meter_address] = self.m_blk_b
                         self.requestBreadCounter[self.m_meter_address] = 0
+                        self.cacheBlockSettings(self.m_blk_b)
+                    elif cached_b is not None:
+                        self.m_blk_b = cached_b
+                        retB = True
+                        if metrics:
+                            metrics.inc(Metric.BCacheHits, self.m_meter_address)
                 else:
-                    self.m_blk_b = self.requestBread[self.m_meter_address]
+                    self.m_blk_b = cached_b
                     retB = True
-                    
-                    
+                    if metrics:
+                        metrics.inc(Metric.BCacheHits, self.m_meter_address)
+
             if retA and retB:
+                if latency:
+                    stage_start = time.perf_counter()
                 self.makeAB()
                 self.calculateFields()
+                self.m_read_time = int(time.time() * 1000)
+                if latency:
+                    stage_start = latency.lap(LatencyStage.Calculate, stage_start)
+                if metrics:
+                    metrics.inc(Metric.ReadsSucceeded, self.m_meter_address)
                 self.updateObservers()
+                if latency:
+                    latency.lap(LatencyStage.Observers, stage_start)
+                    latency.lap(LatencyStage.Request, request_start)
                 return True
         except:
             ekm_log(traceback.format_exc())
@@ -3595,20 +9152,30 @@ class V4Meter(Meter):
         """
         work_context = self.getContext()
         self.setContext("request[v4A]")
+        latency = self.m_latency
+        if latency:
+            stage_start = time.perf_counter()
         self.m_serial_port.write(hex2str("2f3f") + self.m_meter_address + hex2str("3030210d0a"))
+        if latency:
+            stage_start = latency.lap(LatencyStage.Write, stage_start)
         self.m_raw_read_a = self.m_serial_port.getResponse(self.getContext())
+        self.m_read_time = int(time.time() * 1000)
+        if latency:
+            stage_start = latency.lap(LatencyStage.Response, stage_start)
         unpacked_read_a = self.unpackStruct(self.m_raw_read_a, self.m_blk_a)
+        if latency:
+            stage_start = latency.lap(LatencyStage.Unpack, stage_start)
         self.convertData(unpacked_read_a, self.m_blk_a)
         self.m_kwh_precision = int(self.m_blk_a[Field.kWh_Scale][MeterData.NativeValue])
+        if latency:
+            stage_start = latency.lap(LatencyStage.Convert, stage_start)
         self.m_a_crc = self.crcMeterRead(self.m_raw_read_a, self.m_blk_a)
+        if latency:
+            latency.lap(LatencyStage.Crc, stage_start)
         self.setContext(work_context)
-        if (
-            self.m_a_crc
-            and self.m_blk_a['Request_Type'][MeterData.StringValue] == '3030'
-            and self.m_blk_a['Meter_Address'][MeterData.StringValue] == self.m_meter_address
-        ):
-            return self.m_a_crc
-        return False
+        return self.classifyRead(self.m_raw_read_a, self.m_a_crc,
+                                 self.m_blk_a['Request_Type'][MeterData.StringValue] == '3030'
+                                 and self.m_blk_a['Meter_Address'][MeterData.StringValue] == self.m_meter_address)
 
     def requestB(self):
         """ Issue a B read on V4 meter.
@@ -3618,22 +9185,33 @@ class V4Meter(Meter):
         """
         work_context = self.getContext()
         self.setContext("request[v4B]")
+        latency = self.m_latency
+        if latency:
+            stage_start = time.perf_counter()
         self.m_serial_port.write(hex2str("2f3f") + self.m_meter_address + hex2str("3031210d0a"))
+        if latency:
+            stage_start = latency.lap(LatencyStage.Write, stage_start)
         self.m_raw_read_b = self.m_serial_port.getResponse(self.getContext())
+        self.m_read_time = int(time.time() * 1000)
+        if latency:
+            stage_start = latency.lap(LatencyStage.Response, stage_start)
         unpacked_read_b = self.unpackStruct(self.m_raw_read_b, self.m_blk_b)
+        if latency:
+            stage_start = latency.lap(LatencyStage.Unpack, stage_start)
         self.convertData(unpacked_read_b, self.m_blk_b, self.m_kwh_precision)
+        if latency:
+            stage_start = latency.lap(LatencyStage.Convert, stage_start)
         self.m_b_crc = self.crcMeterRead(self.m_raw_read_b, self.m_blk_b)
+        if latency:
+            latency.lap(LatencyStage.Crc, stage_start)
         self.setContext(work_context)
-        if (
-            self.m_b_crc
-            and self.m_blk_b['Request_Type'][MeterData.StringValue] == '3031'
-            and self.m_blk_b['Meter_Address'][MeterData.StringValue] == self.m_meter_address
-        ):
-            return self.m_b_crc
-        return False
+        return self.classifyRead(self.m_raw_read_b, self.m_b_crc,
+                                 self.m_blk_b['Request_Type'][MeterData.StringValue] == '3031'
+                                 and self.m_blk_b['Meter_Address'][MeterData.StringValue] == self.m_meter_address)
 
     def makeAB(self):
         """ Munge A and B reads into single serial block with only unique fields."""
+        self.m_snapshot = None
         for fld in self.m_blk_b:
             compare_fld = fld.upper()
             if not "RESERVED" in compare_fld and not "CRC" in compare_fld:
@@ -3673,6 +9251,7 @@ class V4Meter(Meter):
 
     def calculateFields(self):
         """Write calculated fields for read buffer."""
+        self.m_snapshot = None
         pf1 = self.m_blk_a[Field.Cos_Theta_Ln_1][MeterData.StringValue]
         pf2 = self.m_blk_a[Field.Cos_Theta_Ln_2][MeterData.StringValue]
         pf3 = self.m_blk_a[Field.Cos_Theta_Ln_3][MeterData.StringValue]
@@ -3750,14 +9329,6 @@ class V4Meter(Meter):
 
         pass
 
-    def updateObservers(self):
-        """ Call the update() method in all attached  observers in order of attachment.
-
-        Called internally after request().
-        """
-        for observer in self.m_observers:
-            observer.update(self.m_req)
-
     def insert(self, meter_db):
         """ Insert to :class:`~ekmmeters.MeterDB`  subclass.
 
@@ -3765,12 +9336,15 @@ class V4Meter(Meter):
 
         Args:
             meter_db (MeterDB): Instance of subclass of MeterDB.
+
+        Returns:
+            The dbInsert() result, False if no MeterDB or the insert failed.
         """
         if meter_db:
-            meter_db.dbInsert(self.m_req, self.m_raw_read_a, self.m_raw_read_b)
+            return meter_db.dbInsert(self.m_req, self.m_raw_read_a, self.m_raw_read_b)
         else:
             ekm_log("Attempt to insert when no MeterDB assigned.")
-        pass
+        return False
 
     def lcdString(self, item_str):
         """Translate a string to corresponding LCD field integer
@@ -3842,24 +9416,17 @@ class V4Meter(Meter):
                 self.setContext("")
                 return result
 
-            if not self.requestA():
+            if not self.serialCmdWake(self.requestA):
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
                 
-                req_str = ""
-                req_str = ("01573102303038" +
-                           str2hex(str(relay)).zfill(2) +
-                           "28" +
-                           str2hex(str(status)).zfill(2) +
-                           str2hex(str(seconds).zfill(4)) + "2903")
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                req_str = CommandFrame.get("W", "008" + str(relay), (1, 4)).build(status, seconds)
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success: 06 returned.")
                     result = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -3868,7 +9435,7 @@ class V4Meter(Meter):
 
     def serialPostEnd(self):
         """ Send termination string to implicit current meter."""
-        ekm_log("Termination string sent (" + self.m_context + ")")
+        ekm_log("Termination string sent (%s)", self.m_context)
 
         try:
             self.m_serial_port.write(hex2str("0142300375"))
@@ -3892,22 +9459,22 @@ class V4Meter(Meter):
         self.setContext("setPulseInputRatio")
 
         try:
-            if not self.requestA():
+            register = "00A" + str(line_in - 1)
+            req_str = CommandFrame.get("W", register, (4,)).build(new_cnst)
+            if self.serialCmdUnchanged(req_str):
+                self.setContext("")
+                return True
+
+            if not self.serialCmdWake(self.requestA):
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
-                
-                req_const = str2hex(str(new_cnst).zfill(4))
-                line_const = str2hex(str(line_in - 1))
-                req_str = "01573102303041" + line_const + "28" + req_const + "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success: 06 returned.")
                     result = True
 
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -3926,19 +9493,17 @@ class V4Meter(Meter):
         result = False
         self.setContext("setZeroResettableKWH")
         try:
-            if not self.requestA():
+            if not self.serialCmdWake(self.requestA):
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
                 
-                req_str = "0157310230304433282903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                req_str = CommandFrame.get("W", "00D3").build()
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success: 06 returned.")
                     result = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -3959,19 +9524,20 @@ class V4Meter(Meter):
         result = False
         self.setContext("setPulseOutputRatio")
         try:
-            if not self.requestA():
+            req_str = CommandFrame.get("W", "00D4", (4,)).build(new_pout)
+            if self.serialCmdUnchanged(req_str):
+                self.setContext("")
+                return True
+
+            if not self.serialCmdWake(self.requestA):
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
-                
-                req_str = "015731023030443428" + str2hex(str(new_pout).zfill(4)) + "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success: 06 returned.")
                     result = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
@@ -4019,32 +9585,933 @@ class V4Meter(Meter):
                 self.setContext("")
                 return result
 
-            if not self.request():
+            req_table = "".join([str(lcdid).zfill(2) for lcdid in self.m_lcd_items])
+            req_table += "00" * (40 - len(self.m_lcd_items))
+            req_str = CommandFrame.get("W", "00D2").buildPayload(req_table)
+            if self.serialCmdUnchanged(req_str):
+                self.setContext("")
+                return True
+
+            if not self.serialCmdWake():
                 self.writeCmdMsg("Invalid meter response")
             else:
                 if not self.serialCmdPwdAuth(password):
                     self.writeCmdMsg("Password failure")
-                
-                req_table = ""
-
-                for lcdid in self.m_lcd_items:
-                    append_val = str2hex(str(lcdid).zfill(2))
-                    req_table += append_val
-
-                fill_len = 40 - len(self.m_lcd_items)
-                for i in range(0, fill_len):
-                    append_val = str2hex(str(0).zfill(2))
-                    req_table += append_val
-
-                req_str = "015731023030443228" + req_table + "2903"
-                req_str += self.calc_crc16(hex2str(req_str[2:]))
-                self.m_serial_port.write(hex2str(req_str))
-                if str2hex(self.m_serial_port.getResponse(self.getContext())) == "06":
+                if self.serialCmdAck(req_str):
                     self.writeCmdMsg("Success: 06 returned.")
                     result = True
-            self.serialPostEnd()
+            self.serialCmdEnd()
         except:
             ekm_log(traceback.format_exc())
 
         self.setContext("")
         return result
+
+
+class FleetConfig(object):
+    """ Target settings to push to many meters with :class:`~ekmmeters.FleetPushEngine`.
+
+    Only settings passed are pushed.  Schedules is a dict of
+    :class:`~ekmmeters.Schedules` value to a list of Extents.Periods
+    (hour, minute, tariff), seasons a list of (month, day, schedule) and
+    holidays a list of (month, day), unlisted holidays are cleared.  Pulse
+    input ratios are a dict of :class:`~ekmmeters.Pulse` value to ratio.
+    Pulse ratios and LCD items are V4 only and ignored for V3 meters.
+    """
+
+    def __init__(self, ct_ratio=None, max_demand_period=None, max_demand_reset_interval=None,
+                 pulse_input_ratios=None, pulse_output_ratio=None, schedules=None, seasons=None,
+                 holidays=None, weekend_schedule=None, holiday_schedule=None, lcd_items=None):
+        self.m_ct_ratio = ct_ratio
+        self.m_max_demand_period = max_demand_period
+        self.m_max_demand_reset_interval = max_demand_reset_interval
+        self.m_pulse_input_ratios = pulse_input_ratios
+        self.m_pulse_output_ratio = pulse_output_ratio
+        self.m_schedules = schedules
+        self.m_seasons = seasons
+        self.m_holidays = holidays
+        self.m_weekend_schedule = weekend_schedule
+        self.m_holiday_schedule = holiday_schedule
+        self.m_lcd_items = lcd_items
+
+    def toDict(self):
+        """ Configured settings as a JSON serializable dict. """
+        result = OrderedDict()
+        for name in ("ct_ratio", "max_demand_period", "max_demand_reset_interval", "pulse_output_ratio",
+                     "seasons", "holidays", "weekend_schedule", "holiday_schedule", "lcd_items"):
+            value = getattr(self, "m_" + name)
+            if value is not None:
+                result[name] = value
+        if self.m_pulse_input_ratios is not None:
+            result["pulse_input_ratios"] = dict((str(k), v) for k, v in self.m_pulse_input_ratios.items())
+        if self.m_schedules is not None:
+            result["schedules"] = dict((str(k), v) for k, v in self.m_schedules.items())
+        return result
+
+    def getFingerprint(self):
+        """ Hash of the configured settings, stored in checkpoints. """
+        return hashlib.sha1(json.dumps(self.toDict(), sort_keys=True).encode()).hexdigest()
+
+    def planCommands(self, meter, password="00000000"):
+        """ Set commands for meter, in send order.
+
+        With diff writes on, each command is skipped when the meter already holds the value.
+
+        Args:
+            meter (Meter): Target meter.
+            password (str): Meter password.
+
+        Returns:
+            list: (command name, zero argument callable returning bool) tuples.
+        """
+        plan = []
+        is_v4 = isinstance(meter, V4Meter)
+        if self.m_ct_ratio is not None:
+            plan.append(("setCTRatio", lambda: meter.setCTRatio(self.m_ct_ratio, password)))
+        if self.m_max_demand_period is not None:
+            plan.append(("setMaxDemandPeriod", lambda: meter.setMaxDemandPeriod(self.m_max_demand_period, password)))
+        if self.m_max_demand_reset_interval is not None:
+            plan.append(("setMaxDemandResetInterval",
+                         lambda: meter.setMaxDemandResetInterval(self.m_max_demand_reset_interval, password)))
+        if is_v4 and self.m_pulse_input_ratios is not None:
+            for line, ratio in sorted(self.m_pulse_input_ratios.items()):
+                plan.append(("setPulseInputRatio[" + str(line) + "]",
+                             lambda line=line, ratio=ratio: meter.setPulseInputRatio(line, ratio, password)))
+        if is_v4 and self.m_pulse_output_ratio is not None:
+            plan.append(("setPulseOutputRatio", lambda: meter.setPulseOutputRatio(self.m_pulse_output_ratio, password)))
+        if self.m_schedules is not None:
+            for schedule, periods in sorted(self.m_schedules.items()):
+                cmd_dict = {"Schedule": schedule}
+                for period in range(Extents.Periods):
+                    hour, minute, tariff = periods[period] if period < len(periods) else (0, 0, 0)
+                    cmd_dict["Hour_" + str(period + 1)] = hour
+                    cmd_dict["Min_" + str(period + 1)] = minute
+                    cmd_dict["Tariff_" + str(period + 1)] = tariff
+                plan.append(("setSchedule[" + str(schedule) + "]",
+                             lambda cmd_dict=cmd_dict: meter.setSchedule(cmd_dict, password)))
+        if self.m_seasons is not None:
+            cmd_dict = {}
+            for season in range(Extents.Seasons):
+                month, day, schedule = self.m_seasons[season] if season < len(self.m_seasons) else (0, 0, 0)
+                cmd_dict["Season_" + str(season + 1) + "_Start_Month"] = month
+                cmd_dict["Season_" + str(season + 1) + "_Start_Day"] = day
+                cmd_dict["Season_" + str(season + 1) + "_Schedule"] = schedule
+            plan.append(("setSeasonSchedules", lambda: meter.setSeasonSchedules(cmd_dict, password)))
+        if self.m_holidays is not None:
+            hldy_dict = {}
+            for holiday in range(Extents.Holidays):
+                month, day = self.m_holidays[holiday] if holiday < len(self.m_holidays) else (0, 0)
+                hldy_dict["Holiday_" + str(holiday + 1) + "_Month"] = month
+                hldy_dict["Holiday_" + str(holiday + 1) + "_Day"] = day
+            plan.append(("setHolidayDates", lambda: meter.setHolidayDates(hldy_dict, password)))
+        if self.m_weekend_schedule is not None or self.m_holiday_schedule is not None:
+            plan.append(("setWeekendHolidaySchedules", lambda: self.setWeekendHoliday(meter, password)))
+        if is_v4 and self.m_lcd_items is not None:
+            plan.append(("setLCDCmd", lambda: meter.setLCDCmd(self.m_lcd_items, password)))
+        return plan
+
+    def setWeekendHoliday(self, meter, password):
+        """ Weekend and holiday schedules, keeping the meter's value for one not configured.  Private. """
+        current = meter.extractHolidayWeekendSchedules()
+        weekend = self.m_weekend_schedule
+        if weekend is None:
+            weekend = int(current.Weekend or 0)
+        holiday = self.m_holiday_schedule
+        if holiday is None:
+            holiday = int(current.Holiday or 0)
+        return meter.setWeekendHolidaySchedules(weekend, holiday, password)
+
+    def apply(self, meter, password="00000000"):
+        """ Bring one meter to this configuration in one session.
+
+        The meter is woken once and its settings read, then only changed
+        settings are written, authenticating once if anything is written.
+
+        Args:
+            meter (Meter): Target meter with an attached port.
+            password (str): Meter password.
+
+        Returns:
+            dict: Lists of command names under "written", "unchanged" and "failed".
+        """
+        result = {"written": [], "unchanged": [], "failed": []}
+        diff_writes = meter.getDiffWrites()
+        meter.setDiffWrites(True)
+        session = MeterSession(meter, None)
+        try:
+            if not session.open():
+                result["failed"].append("open")
+                return result
+            if isinstance(meter, V4Meter):
+                if meter.requestB():
+                    meter.cacheBlockSettings(meter.m_blk_b)
+            elif meter.m_a_crc:
+                meter.cacheBlockSettings(meter.m_blk_a)
+            if (self.m_schedules is not None or self.m_seasons is not None or self.m_holidays is not None or
+                    self.m_weekend_schedule is not None or self.m_holiday_schedule is not None):
+                if not meter.readSettings():
+                    result["failed"].append("readSettings")
+                    return result
+            for name, command in self.planCommands(meter, password):
+                if not command():
+                    result["failed"].append(name)
+                elif meter.readCmdMsg().startswith("Unchanged"):
+                    result["unchanged"].append(name)
+                else:
+                    result["written"].append(name)
+        except:
+            ekm_log(traceback.format_exc())
+            result["failed"].append("exception")
+        finally:
+            session.close()
+            meter.setDiffWrites(diff_writes)
+        return result
+
+
+class FleetPushEngine(object):
+    """ Push a :class:`~ekmmeters.FleetConfig` to many meters on many ports.
+
+    Meters on the same :class:`~ekmmeters.SerialPort` share a bus and are
+    configured one at a time, each port by its own thread.  With a checkpoint
+    path, every finished meter is saved as it completes, and a rerun with the
+    same configuration skips meters already done.
+    """
+
+    def __init__(self, config, meters, password="00000000", checkpoint_path=None, progress=None):
+        """
+        Args:
+            config (FleetConfig): Target settings.
+            meters (list): :class:`~ekmmeters.Meter` objects with attached ports.
+            password (str): Password for every meter.
+            checkpoint_path (str): Optional JSON checkpoint file.
+            progress (function): Optional, called as progress(meter_address, record, done, total).
+        """
+        self.m_config = config
+        self.m_meters = list(meters)
+        self.m_password = password
+        self.m_checkpoint_path = checkpoint_path
+        self.m_progress = progress
+        self.m_results = OrderedDict()
+        self.m_lock = threading.Lock()
+        self.m_stop = threading.Event()
+        self.m_done = 0
+
+    def run(self):
+        """ Configure every meter and wait for all ports to finish.
+
+        Returns:
+            dict: Meter address to record dict with "status" (a :class:`~ekmmeters.PushStatus`),
+            "written", "unchanged", "failed" and "time" (epoch ms).
+        """
+        fingerprint = self.m_config.getFingerprint()
+        checkpoint = self.loadCheckpoint(fingerprint)
+        self.m_results = OrderedDict()
+        self.m_done = 0
+        self.m_stop.clear()
+        ports = OrderedDict()
+        for meter in self.m_meters:
+            address = meter.getMeterAddress()
+            if checkpoint.get(address, {}).get("status") == PushStatus.Done:
+                self.finish(address, {"status": PushStatus.Skipped, "written": [], "unchanged": [],
+                                      "failed": [], "time": checkpoint[address].get("time", 0)},
+                            fingerprint, checkpoint)
+                continue
+            ports.setdefault(id(meter.m_serial_port), []).append(meter)
+        threads = []
+        for port_meters in ports.values():
+            thread = threading.Thread(target=self.runPort, args=(port_meters, fingerprint, checkpoint),
+                                      name="ekm-fleet-push")
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return self.m_results
+
+    def stop(self):
+        """ Stop after the meters now being configured.  Unfinished meters are done on resume. """
+        self.m_stop.set()
+
+    def getResults(self):
+        """ Records by meter address for the current or last run. """
+        with self.m_lock:
+            return OrderedDict(self.m_results)
+
+    def runPort(self, meters, fingerprint, checkpoint):
+        """ Configure the meters on one port in order.  Private. """
+        for meter in meters:
+            if self.m_stop.is_set():
+                break
+            try:
+                record = self.m_config.apply(meter, self.m_password)
+            except:
+                ekm_log(traceback.format_exc())
+                record = {"written": [], "unchanged": [], "failed": ["exception"]}
+            record["status"] = PushStatus.Failed if record["failed"] else PushStatus.Done
+            record["time"] = int(time.time() * 1000)
+            self.finish(meter.getMeterAddress(), record, fingerprint, checkpoint)
+
+    def finish(self, address, record, fingerprint, checkpoint):
+        """ Save one meter result and report progress.  Private. """
+        with self.m_lock:
+            self.m_results[address] = record
+            self.m_done += 1
+            done = self.m_done
+            if record["status"] != PushStatus.Skipped:
+                checkpoint[address] = {"status": record["status"], "time": record["time"],
+                                       "written": record["written"], "failed": record["failed"]}
+                self.saveCheckpoint(fingerprint, checkpoint)
+        if self.m_progress:
+            try:
+                self.m_progress(address, record, done, len(self.m_meters))
+            except:
+                ekm_log(traceback.format_exc())
+
+    def loadCheckpoint(self, fingerprint):
+        """ Meter records from the checkpoint, empty if missing or for another configuration.  Private. """
+        if not self.m_checkpoint_path or not os.path.exists(self.m_checkpoint_path):
+            return {}
+        try:
+            with open(self.m_checkpoint_path) as checkpoint_file:
+                saved = json.load(checkpoint_file)
+            if saved.get("config") == fingerprint:
+                return saved.get("meters", {})
+            ekm_log("Checkpoint is for another configuration, starting over.")
+        except:
+            ekm_log(traceback.format_exc())
+        return {}
+
+    def saveCheckpoint(self, fingerprint, checkpoint):
+        """ Write the checkpoint through a temporary file.  Private, called under lock. """
+        if not self.m_checkpoint_path:
+            return
+        try:
+            tmp_path = self.m_checkpoint_path + ".tmp"
+            with open(tmp_path, "w") as checkpoint_file:
+                json.dump({"config": fingerprint, "meters": checkpoint}, checkpoint_file, indent=1)
+            os.replace(tmp_path, self.m_checkpoint_path)
+        except:
+            ekm_log(traceback.format_exc())
+
+
+class VirtualMeter(object):
+    """ One emulated V3 or V4 Omnimeter for :class:`~ekmmeters.OmnimeterEmulator`.
+
+    Reads are built from the library's own read buffer layouts, so frames
+    always match what :class:`~ekmmeters.V3Meter` and :class:`~ekmmeters.V4Meter`
+    unpack.  Voltage, current, power, frequency and pulse counts vary slowly
+    with time, energy registers integrate power between reads, and
+    Meter_Time follows the host clock plus any offset written with setTime.
+    """
+
+    def __init__(self, address, version=4, password="00000000", volts=120.0, amps=10.0, seed=None):
+        """
+        Args:
+            address (str): 12 character meter address.
+            version (int): 3 or 4.
+            password (str): 8 character meter password.
+            volts (float): Nominal line voltage.
+            amps (float): Mean line current.
+            seed (int): Optional seed for repeatable values.
+        """
+        self.m_address = address.zfill(12)
+        self.m_version = version
+        self.m_password = password
+        self.m_volts = volts
+        self.m_amps = amps
+        self.m_random = random.Random(seed)
+        self.m_layout = V4Meter(self.m_address) if version == 4 else V3Meter(self.m_address)
+        self.m_start = time.time()
+        self.m_last = self.m_start
+        self.m_time_offset = 0.0
+        self.m_kwh = [0.0, 0.0, 0.0]
+        self.m_pulses = [0.0, 0.0, 0.0]
+        self.m_registers = {}
+        self.m_overrides = {}
+        self.m_settings = {Field.CT_Ratio: 200,
+                           Field.Max_Demand_Period: 1,
+                           Field.Pulse_Ratio_1: 1,
+                           Field.Pulse_Ratio_2: 1,
+                           Field.Pulse_Ratio_3: 1,
+                           Field.CF_Ratio: 800,
+                           Field.RMS_Watts_Max_Demand: 0.0}
+        self.m_tables = {}
+        self.m_kwh_reset = 0.0
+
+    def getAddress(self):
+        """ 12 character meter address. """
+        return self.m_address
+
+    def setValue(self, fld, value):
+        """ Pin a read field to a fixed value, or None to restore the simulated value.
+
+        Args:
+            fld (str): A :class:`~ekmmeters.Field` value.
+            value: Native value, or an exact width string.
+        """
+        if value is None:
+            self.m_overrides.pop(fld, None)
+        else:
+            self.m_overrides[fld] = value
+
+    @staticmethod
+    def encodeField(def_buf, fld, value, kwh_scale=ScaleKWH.NoScale):
+        """ Serial representation of one native value, inverse of convertData().
+
+        Args:
+            def_buf (SerialBlock): Layout holding the field.
+            fld (str): Field name.
+            value: Native value, or a string already at field width.
+            kwh_scale (int): :class:`~ekmmeters.ScaleKWH` applied to kWh fields.
+
+        Returns:
+            str: Field content, exactly the field width.
+        """
+        size = def_buf[fld][MeterData.SizeValue]
+        fld_type = def_buf[fld][MeterData.TypeValue]
+        if isinstance(value, str):
+            content = value
+        elif fld_type == FieldType.Float:
+            fld_scale = def_buf[fld][MeterData.ScaleValue]
+            multiplier = 1
+            if fld_scale == ScaleType.KWH:
+                if kwh_scale == ScaleKWH.Scale10:
+                    multiplier = 10
+                elif kwh_scale == ScaleKWH.Scale100:
+                    multiplier = 100
+            elif fld_scale == ScaleType.Div10:
+                multiplier = 10
+            elif fld_scale == ScaleType.Div100:
+                multiplier = 100
+            content = str(min(int(round(abs(value) * multiplier)), 10 ** size - 1)).zfill(size)
+        elif fld_type == FieldType.Int:
+            content = str(min(int(abs(value)), 10 ** size - 1)).zfill(size)
+        else:
+            content = str(value)
+        if len(content) != size:
+            content = content[:size].ljust(size, "0")
+        return content
+
+    @staticmethod
+    def encodeFrame(def_buf, values, kwh_scale=ScaleKWH.NoScale):
+        """ Build a 255 byte frame for a read buffer layout.
+
+        Fields missing from values are zero filled, and power factors
+        default to "C100".  The first byte is STX and the CRC is computed.
+
+        Args:
+            def_buf (SerialBlock): Read or settings layout.
+            values (dict): Field name to native value or exact width string.
+            kwh_scale (int): :class:`~ekmmeters.ScaleKWH` applied to kWh fields.
+
+        Returns:
+            str: Frame, implicit byte string as returned by getResponse().
+        """
+        parts = []
+        for fld in def_buf:
+            spec = def_buf[fld]
+            if spec[MeterData.CalculatedFlag]:
+                continue
+            if fld in values:
+                parts.append(VirtualMeter.encodeField(def_buf, fld, values[fld], kwh_scale))
+            elif spec[MeterData.TypeValue] == FieldType.PowerFactor:
+                parts.append("C100")
+            else:
+                parts.append("0" * spec[MeterData.SizeValue])
+        frame = "\x02" + "".join(parts)[1:]
+        crc = Meter.calc_crc16(frame[1:-2])
+        return frame[:-2] + chr(int(crc[:2], 16)) + chr(int(crc[2:], 16))
+
+    def meterTime(self, now):
+        """ Meter_Time string for host time now plus any set offset. """
+        stamp = datetime.datetime.fromtimestamp(now + self.m_time_offset)
+        return (stamp.strftime("%y%m%d") + str(stamp.isoweekday()).zfill(2) +
+                stamp.strftime("%H%M%S"))
+
+    def simulate(self, now):
+        """ Advance registers to now and return native values for a read.
+
+        Args:
+            now (float): Epoch seconds.
+
+        Returns:
+            dict: Field name to native value.
+        """
+        elapsed = now - self.m_start
+        interval = max(0.0, now - self.m_last)
+        self.m_last = now
+        jitter = self.m_random.uniform
+        values = {Field.Meter_Address: self.m_address,
+                  Field.Model: "\x10\x24" if self.m_version == 4 else "\x10\x17",
+                  Field.Firmware: "\x15" if self.m_version == 4 else "\x13",
+                  Field.Meter_Time: self.meterTime(now),
+                  Field.Line_Freq: 60.0 + jitter(-0.02, 0.02),
+                  Field.State_Watts_Dir: DirectionFlag.ForwardForwardForward,
+                  Field.State_Out: StateOut.OffOff,
+                  Field.kWh_Scale: ScaleKWH.Scale10}
+        watts_total = 0
+        for line in range(3):
+            phase = 2.0 * math.pi * line / 3.0
+            volts = self.m_volts * (1.0 + 0.01 * math.sin(2.0 * math.pi * elapsed / 60.0 + phase))
+            volts += jitter(-0.2, 0.2)
+            amps = self.m_amps * (1.0 + 0.3 * math.sin(2.0 * math.pi * elapsed / 300.0 + phase))
+            amps = max(0.0, amps + jitter(-0.05, 0.05))
+            watts = int(volts * amps * 0.95)
+            watts_total += watts
+            self.m_kwh[line] += watts * interval / 3600000.0
+            self.m_pulses[line] += interval * (line + 1)
+            suffix = str(line + 1)
+            values["RMS_Volts_Ln_" + suffix] = volts
+            values["Amps_Ln_" + suffix] = amps
+            values["RMS_Watts_Ln_" + suffix] = watts
+            values["Cos_Theta_Ln_" + suffix] = CosTheta.InductiveLag + "095"
+            values["Reactive_Pwr_Ln_" + suffix] = int(watts * 0.33)
+            values["kWh_Ln_" + suffix] = self.m_kwh[line]
+            values["Pulse_Cnt_" + suffix] = int(self.m_pulses[line])
+        kwh_total = sum(self.m_kwh)
+        values[Field.RMS_Watts_Tot] = watts_total
+        values[Field.Reactive_Pwr_Tot] = int(watts_total * 0.33)
+        values[Field.kWh_Tot] = kwh_total
+        values[Field.kWh_Tariff_1] = kwh_total
+        values[Field.Reactive_Energy_Tot] = kwh_total * 0.33
+        self.m_settings[Field.RMS_Watts_Max_Demand] = max(self.m_settings[Field.RMS_Watts_Max_Demand],
+                                                          float(watts_total))
+        values.update(self.m_settings)
+        values[Field.kWh_Rst] = max(0.0, kwh_total - self.m_kwh_reset)
+        values.update(self.m_overrides)
+        return values
+
+    def readFrame(self, request_type, now):
+        """ Frame answering a read request.
+
+        Args:
+            request_type (str): "00" for V4 A, "01" for V4 B, "" for V3.
+            now (float): Epoch seconds.
+
+        Returns:
+            str: 255 byte frame.
+        """
+        values = self.simulate(now)
+        if self.m_version == 3:
+            return self.encodeFrame(self.m_layout.m_blk_a, values, ScaleKWH.Scale10)
+        values["Request_Type"] = request_type
+        if request_type == "01":
+            return self.encodeFrame(self.m_layout.m_blk_b, values, ScaleKWH.Scale10)
+        return self.encodeFrame(self.m_layout.m_blk_a, values, ScaleKWH.Scale10)
+
+    def settingsFrame(self, register):
+        """ Frame answering a settings read, or None if unsupported.
+
+        Schedules, seasons, holidays and weekend schedules hold the last
+        values written, other settings fields are zero filled.
+
+        Args:
+            register (str): Four character register, ex. "0070".
+        """
+        layouts = {"0070": self.m_layout.m_schd_1_to_4,
+                   "0071": self.m_layout.m_schd_5_to_6,
+                   "0011": self.m_layout.m_mons,
+                   "0012": self.m_layout.m_rev_mons,
+                   "00B0": self.m_layout.m_hldy}
+        layout = layouts.get(register)
+        if layout is None:
+            return None
+        return self.encodeFrame(layout, self.m_tables, ScaleKWH.Scale10)
+
+    def applyWrite(self, register, payload):
+        """ Update state for a settings write.  Unknown registers are kept in m_registers.
+
+        Args:
+            register (str): Four character register, ex. "00D0".
+            payload (str): Content between the parentheses.
+        """
+        self.m_registers[register] = payload
+        try:
+            if register == "00D0":
+                self.m_settings[Field.CT_Ratio] = int(payload)
+            elif register == "0050":
+                self.m_settings[Field.Max_Demand_Period] = int(payload)
+            elif register in ("00A0", "00A1", "00A2"):
+                self.m_settings["Pulse_Ratio_" + str(int(register[3]) + 1)] = int(payload)
+            elif register == "00D4":
+                self.m_settings[Field.CF_Ratio] = int(payload)
+            elif register == "0020":
+                self.m_password = payload
+            elif register in ("0070", "0071", "0072", "0073", "0074", "0075"):
+                prefix = "Schedule_" + str(int(register[3]) + 1) + "_Period_"
+                names = [prefix + str(period) + "_" + part
+                         for period in range(1, Extents.Periods + 1) for part in ("Hour", "Min", "Tariff")]
+                self.applyTable(names, payload)
+            elif register == "0080":
+                names = ["Season_" + str(season) + "_" + part
+                         for season in range(1, Extents.Seasons + 1) for part in ("Month", "Day", "Schedule")]
+                self.applyTable(names, payload)
+            elif register == "00B0":
+                names = ["Holiday_" + str(holiday) + "_" + part
+                         for holiday in range(1, Extents.Holidays + 1) for part in ("Mon", "Day")]
+                self.applyTable(names, payload)
+            elif register == "00C0":
+                self.applyTable(["Weekend_Schd", "Holiday_Schd"], payload)
+            elif register == "0040":
+                self.m_settings[Field.RMS_Watts_Max_Demand] = 0.0
+            elif register == "00D3":
+                self.m_kwh_reset = sum(self.m_kwh)
+            elif register == "0060" and len(payload) == 14:
+                written = datetime.datetime(2000 + int(payload[0:2]), int(payload[2:4]), int(payload[4:6]),
+                                            int(payload[8:10]), int(payload[10:12]), int(payload[12:14]))
+                self.m_time_offset = time.mktime(written.timetuple()) - time.time()
+        except:
+            ekm_log(traceback.format_exc())
+
+    def applyTable(self, names, payload):
+        """ Store two character settings fields from a write payload.  Private. """
+        for i, name in enumerate(names):
+            self.m_tables[name] = payload[i * 2:i * 2 + 2]
+
+
+class OmnimeterEmulator(object):
+    """ Serial protocol emulator for any number of :class:`~ekmmeters.VirtualMeter` on one bus.
+
+    Answers "/?" reads with valid CRC'd frames and SOH commands the way an
+    Omnimeter does: a read selects the meter, the password frame is ACKed when
+    it matches, writes are ACKed after a good password and settings reads return
+    a settings frame.  Commands with a bad CRC and the termination string get
+    no reply.  Replies can be delayed, paced at the line rate, and corrupted,
+    truncated or dropped at random, for testing timeouts and retries.
+
+    Use :class:`~ekmmeters.EmulatorPort` in process, or startPty() to expose
+    the bus on a pseudo terminal for any SerialPort or other client.
+    """
+
+    def __init__(self, latency=0.0, baudrate=0, seed=None):
+        """
+        Args:
+            latency (float): Seconds between end of request and start of reply.
+            baudrate (int): Pace replies at 10 bits per character, 0 for no pacing.
+            seed (int): Optional seed for repeatable error injection.
+        """
+        self.m_meters = OrderedDict()
+        self.m_latency = latency
+        self.m_baudrate = baudrate
+        self.m_random = random.Random(seed)
+        self.m_bad_crc = 0.0
+        self.m_truncated = 0.0
+        self.m_no_reply = 0.0
+        self.m_rx = ""
+        self.m_selected = None
+        self.m_authorized = False
+        self.m_lock = threading.Lock()
+        self.m_pty_master = None
+        self.m_pty_slave = None
+        self.m_pty_delay = 0.0
+        self.m_thread = None
+        self.m_running = False
+        self.m_stats = {"reads": 0, "commands": 0, "replies": 0, "injected": 0}
+
+    def addMeter(self, address, version=4, password="00000000", **kwargs):
+        """ Add a meter to the bus.
+
+        Args:
+            address (str): 12 character meter address.
+            version (int): 3 or 4.
+            password (str): 8 character meter password.
+            **kwargs: Passed to :class:`~ekmmeters.VirtualMeter`.
+
+        Returns:
+            VirtualMeter: The new meter.
+        """
+        meter = VirtualMeter(address, version, password, **kwargs)
+        self.m_meters[meter.getAddress()] = meter
+        return meter
+
+    def getMeter(self, address):
+        """ VirtualMeter at address, None if not on the bus. """
+        return self.m_meters.get(address.zfill(12))
+
+    def setErrors(self, bad_crc=0.0, truncated=0.0, no_reply=0.0):
+        """ Per reply probabilities of each injected fault.
+
+        Args:
+            bad_crc (float): Corrupt the CRC of a frame.
+            truncated (float): Send only part of a frame.
+            no_reply (float): Send nothing.
+        """
+        self.m_bad_crc = bad_crc
+        self.m_truncated = truncated
+        self.m_no_reply = no_reply
+
+    def getStats(self):
+        """ Counts of reads, commands, replies and injected faults. """
+        return dict(self.m_stats)
+
+    def getLatency(self):
+        """ Seconds before the first reply character. """
+        return self.m_latency
+
+    def charTime(self):
+        """ Seconds per character at the paced baud rate, 0 if not paced. """
+        if not self.m_baudrate:
+            return 0.0
+        return 10.0 / self.m_baudrate
+
+    def receive(self, data, now=None):
+        """ Feed bytes sent to the bus and collect the replies.
+
+        Args:
+            data (str): Characters written by the client.
+            now (float): Optional epoch seconds for simulated values.
+
+        Returns:
+            list: Reply strings, in order.
+        """
+        if now is None:
+            now = time.time()
+        replies = []
+        with self.m_lock:
+            self.m_rx += data
+            while self.m_rx:
+                rx = self.m_rx
+                if rx.startswith("/?"):
+                    end = rx.find("\r\n")
+                    if end < 0:
+                        break
+                    self.m_rx = rx[end + 2:]
+                    reply = self.handleRead(rx[2:end], now)
+                elif rx[0] == "\x01":
+                    end = rx.find("\x03")
+                    if end < 0:
+                        break
+                    trailer = 1 if rx[1:2] == "B" else 2
+                    if len(rx) < end + 1 + trailer:
+                        break
+                    self.m_rx = rx[end + 1 + trailer:]
+                    reply = self.handleCommand(rx[:end + 1 + trailer])
+                else:
+                    self.m_rx = rx[1:]
+                    continue
+                if reply:
+                    reply = self.injectFault(reply)
+                if reply:
+                    self.m_stats["replies"] += 1
+                    replies.append(reply)
+        return replies
+
+    def handleRead(self, body, now):
+        """ Answer "/?" + body + "\\r\\n", selecting the addressed meter. """
+        self.m_stats["reads"] += 1
+        meter = self.m_meters.get(body[:12])
+        self.m_selected = meter
+        self.m_authorized = False
+        if meter is None:
+            return None
+        request_type = body[12:14]
+        if body[12:13] == "!":
+            request_type = ""
+        if (meter.m_version == 3) != (request_type == ""):
+            return None
+        return meter.readFrame(request_type, now)
+
+    def handleCommand(self, frame):
+        """ Answer one SOH command frame for the selected meter. """
+        self.m_stats["commands"] += 1
+        meter = self.m_selected
+        command = frame[1:2]
+        if command == "B":
+            self.m_selected = None
+            self.m_authorized = False
+            return None
+        if meter is None or frame[2:4] != "1\x02":
+            return None
+        crc = Meter.calc_crc16(frame[1:-2])
+        if chr(int(crc[:2], 16)) + chr(int(crc[2:], 16)) != frame[-2:]:
+            return None
+        body = frame[4:-3]
+        if command == "P":
+            if body == "(" + meter.m_password + ")":
+                self.m_authorized = True
+                return "\x06"
+            return None
+        open_paren = body.find("(")
+        register = body[:open_paren]
+        payload = body[open_paren + 1:-1]
+        if command == "R":
+            return meter.settingsFrame(register)
+        if command == "W" and self.m_authorized:
+            meter.applyWrite(register, payload)
+            return "\x06"
+        return None
+
+    def injectFault(self, reply):
+        """ Apply configured error injection to one reply. """
+        if self.m_no_reply and self.m_random.random() < self.m_no_reply:
+            self.m_stats["injected"] += 1
+            return None
+        if len(reply) > 1:
+            if self.m_truncated and self.m_random.random() < self.m_truncated:
+                self.m_stats["injected"] += 1
+                return reply[:self.m_random.randint(1, len(reply) - 1)]
+            if self.m_bad_crc and self.m_random.random() < self.m_bad_crc:
+                self.m_stats["injected"] += 1
+                return reply[:-1] + chr(ord(reply[-1]) ^ 0x01)
+        return reply
+
+    def startPty(self, reply_delay=0.02):
+        """ Serve the bus on a new pseudo terminal, from a daemon thread.  POSIX only.
+
+        SerialPort.write() flushes the input buffer after writing, so a reply
+        sent before that flush is lost.  Replies on the pseudo terminal wait
+        at least reply_delay, as a real meter's would.
+
+        Args:
+            reply_delay (float): Least seconds between request and reply.
+
+        Returns:
+            str: Slave device name to pass to :class:`~ekmmeters.SerialPort`, empty on failure.
+        """
+        try:
+            import os
+            import tty
+            self.m_pty_master, self.m_pty_slave = os.openpty()
+            tty.setraw(self.m_pty_slave)
+            self.m_pty_delay = reply_delay
+            self.m_running = True
+            self.m_thread = threading.Thread(target=self.ptyLoop, name="ekm-emulator")
+            self.m_thread.daemon = True
+            self.m_thread.start()
+            return os.ttyname(self.m_pty_slave)
+        except:
+            ekm_log(traceback.format_exc())
+        return ""
+
+    def ptyLoop(self):
+        """ Pseudo terminal service loop.  Private. """
+        import os
+        import select
+        while self.m_running:
+            try:
+                ready = select.select([self.m_pty_master], [], [], 0.1)[0]
+                if not ready:
+                    continue
+                data = codecs.decode(os.read(self.m_pty_master, 1024), "latin-1")
+                for reply in self.receive(data):
+                    delay = max(self.m_latency, self.m_pty_delay)
+                    if delay:
+                        time.sleep(delay)
+                    out = codecs.encode(reply, "latin-1")
+                    char_time = self.charTime()
+                    if char_time:
+                        for idx in range(0, len(out), 16):
+                            os.write(self.m_pty_master, out[idx:idx + 16])
+                            time.sleep(char_time * len(out[idx:idx + 16]))
+                    else:
+                        os.write(self.m_pty_master, out)
+            except OSError:
+                break
+            except:
+                ekm_log(traceback.format_exc())
+
+    def stop(self):
+        """ Stop the pseudo terminal thread and close it. """
+        import os
+        self.m_running = False
+        if self.m_thread:
+            self.m_thread.join(1.0)
+            self.m_thread = None
+        for fd in (self.m_pty_master, self.m_pty_slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.m_pty_master = self.m_pty_slave = None
+
+
+class EmulatorSerial(object):
+    """ Minimal pyserial stand in connecting :class:`~ekmmeters.EmulatorPort` to an emulator.
+
+    Reply characters become readable at their paced arrival times.
+    """
+
+    def __init__(self, emulator):
+        """
+        Args:
+            emulator (OmnimeterEmulator): Bus to talk to.
+        """
+        self.m_emulator = emulator
+        self.m_pending = deque()
+        self.m_lock = threading.Lock()
+
+    def write(self, data):
+        now = time.time()
+        replies = self.m_emulator.receive(codecs.decode(data, "latin-1"), now)
+        start = now + self.m_emulator.getLatency()
+        char_time = self.m_emulator.charTime()
+        with self.m_lock:
+            self.m_pending.clear()
+            for reply in replies:
+                self.m_pending.append([start, char_time, reply, 0])
+                start += char_time * len(reply)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        pass
+
+    def inWaiting(self):
+        now = time.time()
+        count = 0
+        with self.m_lock:
+            for start, char_time, reply, consumed in self.m_pending:
+                if now < start:
+                    break
+                if char_time:
+                    arrived = min(len(reply), int((now - start) / char_time) + 1)
+                else:
+                    arrived = len(reply)
+                count += arrived - consumed
+        return count
+
+    in_waiting = property(inWaiting)
+
+    def read(self, size=1):
+        available = min(size, self.inWaiting())
+        out = ""
+        with self.m_lock:
+            while available > 0 and self.m_pending:
+                item = self.m_pending[0]
+                take = min(available, len(item[2]) - item[3])
+                out += item[2][item[3]:item[3] + take]
+                item[3] += take
+                available -= take
+                if item[3] >= len(item[2]):
+                    self.m_pending.popleft()
+        return codecs.encode(out, "latin-1")
+
+    def close(self):
+        pass
+
+
+class EmulatorPort(SerialPort):
+    """ :class:`~ekmmeters.SerialPort` wired to an :class:`~ekmmeters.OmnimeterEmulator` in process.
+
+    Everything above the pyserial object, including polling and sleeps, is
+    the unmodified SerialPort code.
+    """
+
+    def __init__(self, emulator, force_wait=0.0):
+        """
+        Args:
+            emulator (OmnimeterEmulator): Bus to talk to.
+            force_wait (float): Post command sleep, as SerialPort.
+        """
+        super(EmulatorPort, self).__init__("emulator", force_wait=force_wait)
+        self.m_emulator = emulator
+        self.m_wait_sleep = 0.001
+        self.m_max_waits = 1000
+
+    def initPort(self):
+        """ Attach the emulated serial line. """
+        self.m_ser = EmulatorSerial(self.m_emulator)
+        return True
@@ -8,8 +8,17 @@ This software is provided under an MIT license:
     https://opensource.org/licenses/MIT
 '''
 import configparser
+import csv
+import io
 import random
+import sqlite3
 import unittest
+import importlib.util
+import os
+import tempfile
+import threading
+import time
+import urllib.request
 
 from ekmmeters import *
 
@@ -1113,5 +1122,921 @@ class AcceptanceTest(unittest.TestCase):
         pass
 
 
+
+class EmulatorTest(unittest.TestCase):
+    '''
+    Offline reads and settings against OmnimeterEmulator.
+    No meter or serial port is required:
+
+        python -m unittest unittest_ekmmeters.EmulatorTest
+    '''
+
+    v3_addr = "000000000026"
+    v4_addr = "000300001463"
+
+    def setUp(self):
+        ekm_set_log(ekm_no_log)
+        self.emulator = OmnimeterEmulator(seed=1)
+        self.emulator.addMeter(self.v4_addr, 4)
+        self.emulator.addMeter(self.v3_addr, 3)
+        self.port = EmulatorPort(self.emulator)
+        self.assertEqual(self.port.initPort(), True)
+        self.port.setPollingValues(100, 0.001)
+
+    def testReadV4(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        self.assertEqual(meter.request(), True)
+        self.assertEqual(meter.getField(Field.Meter_Address), self.v4_addr)
+        self.assertEqual(meter.getField(Field.CT_Ratio), "200")
+        self.assertTrue(110.0 < float(meter.getField(Field.RMS_Volts_Ln_1)) < 130.0)
+
+    def testReadV3(self):
+        meter = V3Meter(self.v3_addr)
+        meter.attachPort(self.port)
+        self.assertEqual(meter.request(), True)
+        self.assertEqual(meter.getField(Field.Meter_Address), self.v3_addr)
+
+    def testUnknownAddress(self):
+        meter = V4Meter("000300009999")
+        meter.attachPort(self.port)
+        self.assertEqual(meter.requestA(), False)
+
+    def testSetCtV4(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        self.assertEqual(meter.setCTRatio(CTRatio.Amps_400), True)
+        self.assertEqual(meter.requestB(), True)
+        self.assertEqual(meter.m_blk_b[Field.CT_Ratio][MeterData.StringValue], "400")
+        self.assertEqual(meter.setCTRatio(CTRatio.Amps_800, password="12345678"), False)
+
+    def testReadSettingsV4(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        self.assertEqual(meter.readSettings(), True)
+
+    def testInjectedFaults(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        self.emulator.setErrors(bad_crc=1.0)
+        self.assertEqual(meter.requestA(), False)
+        self.emulator.setErrors(no_reply=1.0)
+        self.assertEqual(meter.requestA(), False)
+        self.emulator.setErrors()
+        self.assertEqual(meter.requestA(), True)
+
+    def testRetryAndCircuitBreaker(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        self.port.setPollingValues(5, 0.001)
+        self.emulator.setErrors(bad_crc=1.0)
+        self.assertEqual(meter.request(), False)
+        self.assertEqual(meter.getReadError(), ReadError.Crc)
+        meter.setRetryPolicy(RetryPolicy(max_attempts=50, backoff=(0.0,)))
+        self.emulator.setErrors(bad_crc=0.5)
+        self.assertEqual(meter.request(), True)
+        breaker = self.port.setCircuitBreaker(CircuitBreaker(failure_threshold=2, reset_timeout=60.0))
+        meter.setRetryPolicy(None)
+        self.emulator.setErrors(no_reply=1.0)
+        meter.request()
+        meter.request()
+        self.assertEqual(breaker.getState(self.v4_addr), CircuitState.Open)
+        self.emulator.setErrors()
+        self.assertEqual(meter.request(), False)
+        self.assertEqual(meter.getReadError(), ReadError.Circuit)
+        breaker.reset()
+        self.assertEqual(meter.request(), True)
+
+    def testSessionV4(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        reads = self.emulator.getStats()["reads"]
+        with meter.openSession() as session:
+            self.assertEqual(meter.setCTRatio(CTRatio.Amps_400), True)
+            self.assertEqual(meter.setMaxDemandPeriod(MaxDemandPeriod.At_30_Minutes), True)
+            self.assertEqual(meter.readHolidayDates(), True)
+        self.assertEqual(self.emulator.getStats()["reads"], reads + 1)
+        self.assertEqual(session.getCommandCount(), 3)
+        self.assertEqual(meter.getSession(), None)
+        self.assertEqual(meter.requestB(), True)
+        self.assertEqual(meter.m_blk_b[Field.CT_Ratio][MeterData.StringValue], "400")
+
+    def testGetSettingsV4(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        meter.assignHolidayDate(0, 12, 25)
+        self.assertEqual(meter.setHolidayDates(), True)
+        meter.assignSchedule(Schedules.Schedule_2, Tariffs.Tariff_1, 7, 30, 2)
+        self.assertEqual(meter.setSchedule(), True)
+        reads = self.emulator.getStats()["reads"]
+        settings = meter.getSettings()
+        self.assertEqual(self.emulator.getStats()["reads"], reads + 1)
+        self.assertEqual(settings.Holidays[0], (12, 25))
+        self.assertEqual(settings.Schedules[1][0], (7, 30, 2))
+        self.assertTrue(meter.getSettings() is settings)
+
+    def testDiffWritesV4(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        meter.setDiffWrites(True)
+        self.assertEqual(meter.request(), True)
+        self.assertEqual(meter.readSettings(True), True)
+        commands = self.emulator.getStats()["commands"]
+        self.assertEqual(meter.setCTRatio(CTRatio.Amps_200), True)
+        self.assertEqual(meter.setHolidayDates(), True)
+        self.assertEqual(self.emulator.getStats()["commands"], commands)
+        self.assertEqual(meter.setCTRatio(CTRatio.Amps_400), True)
+        self.assertTrue(self.emulator.getStats()["commands"] > commands)
+        self.assertEqual(meter.getKnownSettings()["00D0"], "0400")
+
+    def testFleetPush(self):
+        meters = [V4Meter(self.v4_addr), V3Meter(self.v3_addr)]
+        for meter in meters:
+            meter.attachPort(self.port)
+        config = FleetConfig(ct_ratio=CTRatio.Amps_400, holidays=[(12, 25)],
+                             schedules={Schedules.Schedule_1: [(6, 0, 1), (18, 0, 2)]})
+        results = FleetPushEngine(config, meters).run()
+        self.assertEqual(results[self.v4_addr]["status"], PushStatus.Done)
+        self.assertEqual(len(results[self.v3_addr]["written"]), 3)
+        results = FleetPushEngine(config, meters).run()
+        self.assertEqual(results[self.v4_addr]["written"], [])
+        self.assertEqual(len(results[self.v3_addr]["unchanged"]), 3)
+
+    def testGetFieldsV4(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        self.assertEqual(meter.request(), True)
+        volts = meter.m_req[Field.RMS_Volts_Ln_1][MeterData.NativeValue]
+        self.assertEqual(meter.getNative(Field.RMS_Volts_Ln_1), volts)
+        self.assertEqual(meter.getNative("Not_A_Field"), None)
+        self.assertEqual(meter.getFields([Field.RMS_Volts_Ln_1, "Not_A_Field"]), (volts, None))
+        self.assertEqual(meter.getFields([Field.RMS_Volts_Ln_1]), (volts,))
+        accessor = FieldAccessor([Field.Meter_Address, Field.RMS_Volts_Ln_1])
+        self.assertEqual(accessor(meter.getSnapshot()), (self.v4_addr, volts))
+
+    @unittest.skipIf(importlib.util.find_spec("numpy") is None, "numpy not installed")
+    def testBatchDecodeV4(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        db_file = os.path.join(tempfile.mkdtemp(), "batch.db")
+        meter_db = SqliteMeterDB(db_file)
+        meter_db.dbCreate()
+        volts = []
+        for i in range(3):
+            self.assertEqual(meter.request(), True)
+            meter.insert(meter_db)
+            volts.append(meter.getNative(Field.RMS_Volts_Ln_1))
+        columns = meter_db.decodeRawReadsSince(0, self.v4_addr)
+        self.assertEqual(list(columns[Field.RMS_Volts_Ln_1]), volts)
+        self.assertEqual(list(columns["Frame_Ok"]), [True] * 3)
+        self.assertEqual(columns[Field.Meter_Address][0], self.v4_addr)
+        decoder = BatchDecoder(meter.m_blk_a)
+        columns = decoder.decode([meter.m_raw_read_a, meter.m_raw_read_a[:-1] + "\x00"])
+        self.assertEqual(list(columns["Frame_Ok"]), [True, False])
+
+    def testExportReadsV4(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        export_dir = tempfile.mkdtemp()
+        meter_db = SqliteMeterDB(os.path.join(export_dir, "export.db"))
+        meter_db.dbCreate()
+        snapshots = []
+        for i in range(3):
+            self.assertEqual(meter.request(), True)
+            meter.insert(meter_db)
+            snapshots.append(meter.getSnapshot())
+        path = meter_db.exportReadsSince(0, os.path.join(export_dir, "reads"),
+                                         fmt=ExportFormat.Csv, chunk_size=2)
+        self.assertEqual(path, os.path.join(export_dir, "reads.csv"))
+        with open(path) as csv_file:
+            rows = list(csv.DictReader(csv_file))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0][Field.Meter_Address], self.v4_addr)
+        self.assertEqual(float(rows[2][Field.RMS_Volts_Ln_1]),
+                         snapshots[2].getNative(Field.RMS_Volts_Ln_1))
+        if importlib.util.find_spec("numpy") is not None:
+            with ReadExporter(os.path.join(export_dir, "memory"), meter_db.m_all_fields,
+                              ExportFormat.Npz, 2) as exporter:
+                exporter.writeReads(snapshots)
+            import numpy
+            columns = numpy.load(exporter.getPath())
+            self.assertEqual(list(columns[Field.Time_Stamp]), [read.getTimeStamp() for read in snapshots])
+            self.assertEqual(columns[Field.RMS_Volts_Ln_1].dtype, numpy.float64)
+
+    def testReadHistory(self):
+        history = ReadHistory([Field.RMS_Volts_Ln_1], 4)
+        for sample_time in range(1, 7):
+            self.assertEqual(history.append(float(sample_time), [sample_time * 10]), True)
+        self.assertEqual(history.append(1.0, [0]), False)
+        self.assertEqual(len(history), 4)
+        times, values = history.getWindow(4, 5)
+        self.assertEqual(list(times), [4.0, 5.0])
+        self.assertEqual(list(values[0]), [40.0, 50.0])
+        self.assertEqual(list(history.getLast(1)[0]), [5.0, 6.0])
+        self.assertEqual(history.countWindow(0, 3.5), 1)
+
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        observer = HistoryObserver([Field.RMS_Volts_Ln_1, Field.RMS_Watts_Tot])
+        meter.registerObserver(observer)
+        for i in range(2):
+            self.assertEqual(meter.request(), True)
+        history = observer.getHistory(self.v4_addr)
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history.getField(Field.RMS_Volts_Ln_1)[-1],
+                         meter.getNative(Field.RMS_Volts_Ln_1))
+
+    def testFrameLogV4(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        meter_db = FrameLogMeterDB(tempfile.mkdtemp(), segment_records=2, index_interval=1)
+        meter_db.dbCreate()
+        volts = []
+        for i in range(3):
+            self.assertEqual(meter.request(), True)
+            meter_db.dbInsert(meter.m_req, meter.m_raw_read_a, meter.m_raw_read_b, 1000 + i)
+            volts.append(meter.getNative(Field.RMS_Volts_Ln_1))
+        self.assertEqual(meter_db.getRecordCount(), 3)
+        self.assertEqual(meter_db.getSegmentCount(), 2)
+        records = list(meter_db.readRecords(meter=self.v4_addr))
+        self.assertEqual(records[-1][2], meter.m_raw_read_a)
+        snapshots = list(meter_db.readSnapshots(records[1][0]))
+        self.assertEqual([read.getNative(Field.RMS_Volts_Ln_1) for read in snapshots], volts[1:])
+        self.assertEqual(snapshots[0].getTimeStamp(), records[1][0])
+        meter_db.closeLog()
+        reopened = FrameLogMeterDB(meter_db.m_connection_string, segment_records=2, index_interval=1)
+        self.assertEqual([record[0] for record in reopened.readRecords()], [record[0] for record in records])
+        reopened.dbDropReads()
+        self.assertEqual(reopened.getRecordCount(), 0)
+
+    def testStorageBackendsV4(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        folder = tempfile.mkdtemp()
+        backends = [SqliteBackend(os.path.join(folder, "reads.db")),
+                    FileSinkBackend(os.path.join(folder, "reads.csv"), ExportFormat.Csv),
+                    FileSinkBackend(os.path.join(folder, "reads.ndjson"), ExportFormat.Ndjson)]
+        for backend in backends:
+            meter_db = BackendMeterDB(backend, batch_size=2, flush_seconds=60)
+            meter_db.dbCreate()
+            meter_db.dbDropReads()
+            meter_db.dbCreate()
+            for i in range(3):
+                self.assertEqual(meter.request(), True)
+                meter.insert(meter_db)
+            self.assertEqual(meter_db.getBufferedCount(), 1)
+            names = meter_db.getColumnNames()
+            rows = list(meter_db.queryRange(meter=self.v4_addr))
+            self.assertEqual(len(rows), 3)
+            self.assertEqual(rows[-1][names.index(Field.RMS_Volts_Ln_1)],
+                             meter.getNative(Field.RMS_Volts_Ln_1))
+            self.assertEqual(rows[-1][names.index("Raw_A")], str2hex(meter.m_raw_read_a))
+            stamp = rows[1][names.index(Field.Time_Stamp)]
+            self.assertTrue(all(row[names.index(Field.Time_Stamp)] >= stamp
+                                for row in meter_db.queryRange(start_time=stamp)))
+            self.assertEqual(list(meter_db.queryRange(meter="999999999999")), [])
+            meter_db.close()
+
+    def testBackendOutage(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        backend = SqliteBackend(os.path.join(tempfile.mkdtemp(), "reads.db"))
+        meter_db = BackendMeterDB(backend, batch_size=2, flush_seconds=60, max_rows=3)
+        meter_db.dbCreate()
+        backend.getConnection().close()
+        stamps = []
+        for i in range(5):
+            self.assertEqual(meter.request(), True)
+            stamps.append(1000 + i)
+            result = meter_db.dbInsert(meter.getReadBuffer(), meter.m_raw_read_a, meter.m_raw_read_b, stamps[-1])
+            self.assertEqual(result, i != 1)
+        self.assertEqual(meter_db.getBufferedCount(), 3)
+        self.assertEqual(meter_db.getDroppedCount(), 2)
+        self.assertEqual(meter_db.flush(), True)
+        names = meter_db.getColumnNames()
+        self.assertEqual([row[names.index(Field.Time_Stamp)] for row in meter_db.queryRange()], stamps[2:])
+        meter_db.close()
+
+    def testBulkLoadBackends(self):
+        schema = [StorageColumn(Field.Meter_Address, FieldType.String, 12),
+                  StorageColumn(Field.Time_Stamp, FieldType.Int, 13),
+                  StorageColumn(Field.kWh_Tot, FieldType.Float, 8)]
+        rows = [(self.v4_addr, i, i / 10.0) for i in range(1000)]
+        for style in ("qmark", "numeric", "named"):
+            backend = DbApiBackend(lambda: sqlite3.connect(":memory:"), style,
+                                   rows_per_statement=100, max_params=99)
+            backend.create(schema)
+            self.assertEqual(backend.getRowsPerStatement(), 33)
+            self.assertEqual(backend.writeRows(rows), 1000)
+            self.assertEqual(list(backend.queryRange(100, 199)), rows[100:200])
+            backend.close()
+        db_file = os.path.join(tempfile.mkdtemp(), "reconnect.db")
+        connections = []
+
+        def connect():
+            connections.append(sqlite3.connect(db_file, check_same_thread=False))
+            return connections[-1]
+
+        backend = DbApiBackend(connect)
+        self.assertEqual(backend.create(schema), True)
+        self.assertEqual(backend.writeRows(rows[:10]), 10)
+        connections[-1].close()
+        self.assertEqual(backend.writeRows(rows[10:20]), 0)
+        self.assertEqual(backend.writeRows(rows[10:20]), 10)
+        self.assertEqual(backend.writeRows(rows[20:30]), 10)
+        self.assertEqual(len(connections), 2)
+        connections[-1].close()
+        self.assertEqual(backend.execute(["DELETE FROM Meter_Reads WHERE Time_Stamp < 5"]), False)
+        self.assertEqual(backend.execute(["DELETE FROM Meter_Reads WHERE Time_Stamp < 5"]), True)
+        self.assertEqual(list(backend.queryRange()), rows[5:30])
+        backend.close()
+
+        copy_rows = [(self.v4_addr, 1, 2.5), ('a"b', None, None), ("", 2, 0.1)]
+        parsed = list(csv.reader(io.StringIO(PostgresBackend.copyData(copy_rows))))
+        self.assertEqual(parsed, [[self.v4_addr, "1", "2.5"], ['a"b', "", ""], ["", "2", "0.1"]])
+
+    def testSpoolMeterDB(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        folder = tempfile.mkdtemp()
+        db_path = os.path.join(folder, "down", "reads.db")
+        spool_path = os.path.join(folder, "spool")
+        spool = SpoolMeterDB(SqliteMeterDB(db_path), spool_path, batch_size=2, start=False)
+        for i in range(3):
+            self.assertEqual(meter.request(), True)
+            self.assertEqual(meter.insert(spool), True)
+        spool.dbInsert(meter.getReadBuffer(), meter.m_raw_read_a, meter.m_raw_read_b, 1000)
+        self.assertEqual(spool.getPendingCount(), 4)
+        self.assertEqual(spool.drain(), 0)
+        self.assertEqual(spool.getFailureCount(), 1)
+        spool.stop(drain=False)
+        os.makedirs(os.path.dirname(db_path))
+        spool = SpoolMeterDB(SqliteMeterDB(db_path), spool_path, batch_size=2, start=False)
+        self.assertEqual(spool.getPendingCount(), 4)
+        spool.dbCreate()
+        self.assertEqual(spool.drain(), 4)
+        self.assertEqual(spool.getPendingCount(), 0)
+        connection = sqlite3.connect(db_path)
+        rows = connection.execute("SELECT " + Field.RMS_Volts_Ln_1 + ", " + Field.Time_Stamp +
+                                  " FROM Meter_Reads").fetchall()
+        connection.close()
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[-1], (meter.getNative(Field.RMS_Volts_Ln_1), 1000))
+        self.assertEqual(spool.dbInsert(meter.getReadBuffer(), "garbage", ""), False)
+        self.assertEqual(spool.getRejectedCount(), 1)
+        spool.dbInsert(meter.getReadBuffer(), "'" * 255, "")
+        meter.insert(spool)
+        self.assertEqual(spool.drain(), 0)
+        self.assertEqual(spool.drain(), 0)
+        self.assertEqual(spool.getDeadLetterCount(), 0)
+        self.assertEqual(spool.getPendingCount(), 2)
+        self.assertEqual(spool.drain(), 1)
+        self.assertEqual(spool.getPendingCount(), 0)
+        self.assertEqual(spool.getDeadLetterCount(), 1)
+        self.assertTrue(os.path.getsize(os.path.join(spool_path, "spool.dead")) > 255)
+        spool.stop()
+
+    def testSpoolTransientRefusal(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        folder = tempfile.mkdtemp()
+        db_path = os.path.join(folder, "reads.db")
+
+        class FlakyMeterDB(SqliteMeterDB):
+            def __init__(self, connection_string):
+                super(FlakyMeterDB, self).__init__(connection_string)
+                self.m_failures = 0
+
+            def dbInsertBatch(self, reads):
+                if self.m_failures:
+                    self.m_failures -= 1
+                    raise sqlite3.OperationalError("database is locked")
+                return super(FlakyMeterDB, self).dbInsertBatch(reads)
+
+        meter_db = FlakyMeterDB(db_path)
+        meter_db.dbCreate()
+        spool = SpoolMeterDB(meter_db, os.path.join(folder, "spool"), batch_size=10, start=False)
+        for i in range(3):
+            self.assertEqual(meter.request(), True)
+            self.assertEqual(meter.insert(spool), True)
+        meter_db.m_failures = 2
+        self.assertEqual(spool.drain(), 0)
+        self.assertEqual(spool.getFailureCount(), 1)
+        self.assertEqual(spool.getPendingCount(), 3)
+        self.assertEqual(spool.drain(), 3)
+        self.assertEqual(spool.getPendingCount(), 0)
+        self.assertEqual(spool.getDeadLetterCount(), 0)
+        self.assertFalse(os.path.exists(os.path.join(folder, "spool", "spool.dead")))
+        connection = sqlite3.connect(db_path)
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM Meter_Reads").fetchone()[0], 3)
+        connection.close()
+        spool.stop()
+
+    @unittest.skipIf(os.name != "posix", "pseudo terminals need POSIX")
+    def testPtyReadAndSettings(self):
+        name = self.emulator.startPty()
+        self.assertNotEqual(name, "")
+        port = SerialPort(name, force_wait=0.01)
+        try:
+            self.assertEqual(port.initPort(), True)
+            port.setPollingValues(100, 0.005)
+            meter = V4Meter(self.v4_addr)
+            meter.attachPort(port)
+            for i in range(5):
+                meter.requestBreadCounter[self.v4_addr] = meter.requestBinterval + 1
+                self.assertEqual(meter.request(), True)
+            self.assertEqual(meter.setCTRatio(CTRatio.Amps_800), True)
+            self.assertEqual(self.emulator.getMeter(self.v4_addr).m_settings[Field.CT_Ratio], 800)
+        finally:
+            port.closePort()
+            self.emulator.stop()
+
+    def testEventRules(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        virtual = self.emulator.getMeter(self.v4_addr)
+        events = []
+        observer = EventObserver([
+            EventRule("broken", Field.Meter_Address, EventRuleType.Above, level=1.0),
+            EventRule("high_volts", Field.RMS_Volts_Ln_1, EventRuleType.Above, level=125.0,
+                      clear_level=122.0, debounce=2),
+            EventRule("input_1", Field.State_Inputs, EventRuleType.Transition, mask=1),
+            EventRule("input_2_on", Field.State_Inputs, EventRuleType.Transition, mask=2, to_state=2)],
+            events.append)
+        meter.registerObserver(observer)
+
+        def readWith(volts, inputs):
+            virtual.setValue(Field.RMS_Volts_Ln_1, volts)
+            virtual.setValue(Field.State_Inputs, inputs)
+            self.assertEqual(meter.request(), True)
+            fired = [(event.Rule_Name, event.Event, event.Value) for event in events]
+            del events[:]
+            return fired
+
+        self.assertEqual(readWith(120.0, 0), [])
+        self.assertEqual(readWith(126.0, 0), [])
+        self.assertEqual(readWith(126.0, 1), [("high_volts", EventState.Raise, 126.0),
+                                               ("input_1", EventState.Change, 1)])
+        self.assertEqual(readWith(123.0, 3), [("input_2_on", EventState.Change, 2)])
+        self.assertEqual(readWith(121.0, 1), [])
+        self.assertEqual(readWith(121.0, 0), [("high_volts", EventState.Clear, 121.0),
+                                               ("input_1", EventState.Change, 0)])
+        self.assertEqual(observer.getRuleErrors(), {"broken": 6})
+
+    def testLogArguments(self):
+        lines = []
+        ekm_set_log(lines.append)
+        ekm_set_log_level(3)
+        try:
+            ekm_log("read %s in %d ms", self.v4_addr, 12)
+            ekm_log("special %s", "query", priority=4)
+            ekm_log("SELECT 1", 4)
+            ekm_log("bad %d format", "query")
+            ekm_set_log_level(4)
+            ekm_log("special %s", "query", priority=4)
+            ekm_log("SELECT 2", 4)
+            ekm_log("waits %d", 4)
+        finally:
+            ekm_set_log_level(3)
+            ekm_set_log(ekm_no_log)
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[0].endswith("-> read " + self.v4_addr + " in 12 ms"))
+        self.assertTrue(lines[1].endswith("-> bad %d format query"))
+        self.assertTrue(lines[2].endswith("-> special query"))
+        self.assertTrue(lines[3].endswith("-> SELECT 2"))
+        self.assertTrue(lines[4].endswith("-> waits 4"))
+
+        import logging
+        logger = logging.getLogger("ekmmeters.test")
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger.addHandler(handler)
+        try:
+            ekm_use_logging(logger)
+            ekm_log("read %s", self.v4_addr)
+            logger.setLevel(logging.DEBUG - 1)
+            ekm_log("special %s", "query", priority=4)
+        finally:
+            logger.removeHandler(handler)
+            ekm_set_log(ekm_no_log)
+        self.assertEqual([(record.levelno, record.getMessage()) for record in records],
+                         [(logging.DEBUG, "read " + self.v4_addr), (logging.DEBUG - 1, "special query")])
+
+    def testSnapshotTracksRead(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        virtual = self.emulator.getMeter(self.v4_addr)
+        virtual.setValue(Field.RMS_Volts_Ln_1, 121.0)
+        self.assertEqual(meter.request(), True)
+        done = int(time.time() * 1000)
+        time.sleep(0.05)
+        snapshot = meter.getSnapshot()
+        self.assertTrue(abs(snapshot.getTimeStamp() - done) < 30)
+        self.assertTrue(meter.getSnapshot() is snapshot)
+        virtual.setValue(Field.RMS_Volts_Ln_1, 118.5)
+        self.assertEqual(meter.requestA(), True)
+        self.assertEqual(meter.getNative(Field.RMS_Volts_Ln_1), 118.5)
+        self.assertEqual(meter.getField(Field.RMS_Volts_Ln_1), "118.5")
+        self.assertTrue(meter.getSnapshot().getTimeStamp() > snapshot.getTimeStamp())
+        self.emulator.setErrors(bad_crc=1.0)
+        virtual.setValue(Field.RMS_Volts_Ln_1, 117.0)
+        meter.request()
+        self.assertEqual(meter.getNative(Field.RMS_Volts_Ln_1),
+                         float(meter.getField(Field.RMS_Volts_Ln_1)))
+
+    def testQueuedObserverPolicies(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        self.assertEqual(meter.request(), True)
+        reads = [ReadSnapshot.fromBlock(meter.getReadBuffer(), stamp) for stamp in range(1, 5)]
+
+        class GateObserver(MeterObserver):
+            def __init__(self):
+                super(GateObserver, self).__init__()
+                self.m_entered = threading.Event()
+                self.m_gate = threading.Event()
+                self.m_stamps = []
+
+            def update(self, def_buf):
+                self.m_entered.set()
+                self.m_gate.wait(5)
+                self.m_stamps.append(def_buf.getTimeStamp())
+
+        expected = {DispatchPolicy.DropNewest: ([1, 2, 3], "dropped", 1),
+                    DispatchPolicy.DropOldest: ([1, 3, 4], "dropped", 1),
+                    DispatchPolicy.Coalesce: ([1, 4], "coalesced", 2)}
+        for policy, (stamps, counter, count) in expected.items():
+            gated = GateObserver()
+            queued = QueuedObserver(gated, max_queue=2, policy=policy)
+            queued.update(reads[0])
+            self.assertTrue(gated.m_entered.wait(5))
+            for read in reads[1:]:
+                queued.update(read)
+            gated.m_gate.set()
+            queued.stop(wait=5)
+            self.assertEqual(gated.m_stamps, stamps)
+            self.assertEqual(queued.getStats()[counter], count)
+            self.assertEqual(queued.getStats()["dispatched"], len(stamps))
+
+        gated = GateObserver()
+        queued = QueuedObserver(gated, max_queue=2, policy=DispatchPolicy.Block)
+        queued.update(reads[0])
+        self.assertTrue(gated.m_entered.wait(5))
+        producer = threading.Thread(target=lambda: [queued.update(read) for read in reads[1:]])
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+        gated.m_gate.set()
+        producer.join(5)
+        queued.stop(wait=5)
+        self.assertEqual(gated.m_stamps, [1, 2, 3, 4])
+        self.assertEqual(queued.getStats()["dropped"], 0)
+
+        gated = GateObserver()
+        queued = QueuedObserver(gated, max_queue=4)
+        queued.update(reads[0])
+        self.assertTrue(gated.m_entered.wait(5))
+        queued.update(reads[1])
+        queued.update(reads[2])
+        queued.stop(drain=False, wait=0)
+        gated.m_gate.set()
+        queued.m_worker.join(5)
+        queued.update(reads[3])
+        self.assertEqual(gated.m_stamps, [1])
+        self.assertEqual(queued.getStats()["dropped"], 2)
+        self.assertEqual(queued.getStats()["enqueued"], 3)
+
+        gated = GateObserver()
+        queued = QueuedObserver(gated, max_queue=4, timeout=0.05)
+        queued.update(reads[0])
+        queued.update(reads[1])
+        for i in range(100):
+            if queued.getStats()["dispatched"] == 2:
+                break
+            time.sleep(0.01)
+        self.assertEqual(queued.getStats()["timeouts"], 2)
+        gated.m_gate.set()
+        queued.update(reads[2])
+        queued.stop(wait=5)
+        self.assertEqual(gated.m_stamps, [1, 3])
+        self.assertEqual(queued.getStats()["timeouts"], 2)
+        self.assertEqual(queued.getStats()["dispatched"], 3)
+
+    @unittest.skipIf(os.name != "posix", "pseudo terminals need POSIX")
+    def testRecordReplay(self):
+        capture_path = os.path.join(tempfile.mkdtemp(), "bus.cap")
+        port = RecordingSerialPort(self.emulator.startPty(), capture_path, force_wait=0.01)
+        try:
+            self.assertEqual(port.initPort(), True)
+            port.setPollingValues(100, 0.005)
+            meter = V4Meter(self.v4_addr)
+            meter.attachPort(port)
+            self.assertEqual(meter.request(), True)
+            self.assertEqual(meter.setCTRatio(CTRatio.Amps_800), True)
+            recorded_volts = meter.getNative(Field.RMS_Volts_Ln_1)
+        finally:
+            port.closePort()
+            self.emulator.stop()
+        start, records = RecordingSerialPort.readCapture(capture_path)
+        self.assertTrue(len(records) >= 6)
+
+        replay = ReplaySerialPort(capture_path, speed=0)
+        self.assertEqual(replay.initPort(), True)
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(replay)
+        replay_start = time.time()
+        self.assertEqual(meter.request(), True)
+        self.assertEqual(meter.setCTRatio(CTRatio.Amps_800), True)
+        self.assertTrue(time.time() - replay_start < 1.0)
+        self.assertEqual(meter.getNative(Field.RMS_Volts_Ln_1), recorded_volts)
+        self.assertEqual(replay.getMismatches(), 0)
+
+    def testAdaptiveTimingMath(self):
+        timing = AdaptiveTiming(factor=2.0, margin=0.01, min_samples=3, window=100,
+                                min_timeout=0.05, min_turnaround=0.02)
+        read_a = hex2str("2f3f") + self.v4_addr + hex2str("3030210d0a")
+        key = timing.keyFor(read_a)
+        self.assertEqual(key, (self.v4_addr, "00"))
+        self.assertEqual(timing.keyFor(CommandFrame.get("P").buildPayload("00000000")), (self.v4_addr, "P"))
+        self.assertEqual(timing.getDeadline(key, 1.0), 1.0)
+        self.assertEqual(timing.getPostWriteWait(key, 0.2), 0.0)
+        self.assertEqual(timing.getPostWriteWait(None, 0.2), 0.2)
+        for ms in range(1, 101):
+            timing.addResponse(key, ms / 1000.0)
+        self.assertAlmostEqual(timing.getDeadline(key, 1.0), 0.099 * 2.0 + 0.01)
+        self.assertEqual(timing.getDeadline(key, 0.1), 0.1)
+        self.assertEqual(timing.getPostWriteWait(key, 0.2), 0.001)
+        self.assertEqual(timing.getPostWriteWait(key, 0.0005), 0.0005)
+        fast_key = (self.v3_addr, "v3")
+        for i in range(3):
+            timing.addResponse(fast_key, 0.001)
+        self.assertEqual(timing.getDeadline(fast_key, 1.0), 0.05)
+        slow_key = (self.v3_addr, "P")
+        for i in range(3):
+            timing.addResponse(slow_key, 0.3, first_byte=0.02 + i / 100.0)
+        self.assertEqual(timing.getPostWriteWait(slow_key, 0.2), 0.02)
+        self.assertAlmostEqual(timing.getDeadline(slow_key, 1.0), 0.61)
+        self.assertEqual(timing.getTurnaround(self.v4_addr, 0.2), 0.2)
+        timing.addResponse(key, 0.01)
+        self.assertAlmostEqual(timing.getTurnaround(self.v4_addr, 0.2), 0.18)
+        timing.addTimeout(key, 0.2)
+        self.assertAlmostEqual(timing.getTurnaround(self.v4_addr, 0.2), 0.19)
+        self.assertEqual(timing.getTurnaround(self.v3_addr, 0.2), 0.2)
+
+    def testAdaptiveTimingRead(self):
+        emulator = OmnimeterEmulator(latency=0.01, seed=1)
+        emulator.addMeter(self.v4_addr, 4)
+        port = EmulatorPort(emulator, force_wait=0.2)
+        self.assertEqual(port.initPort(), True)
+        port.setPollingValues(100, 0.005)
+        timing = port.setAdaptiveTiming(min_samples=2, min_timeout=0.01)
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(port)
+        key = (self.v4_addr, "00")
+        for i in range(3):
+            meter.requestBreadCounter[self.v4_addr] = meter.requestBinterval + 1
+            self.assertEqual(meter.request(), True)
+        stats = timing.getStats()[key]
+        self.assertEqual(stats["count"], 3)
+        self.assertEqual(stats["timeouts"], 0)
+        self.assertTrue(0.01 <= stats["first_byte"] < 0.1)
+        self.assertTrue(stats["p50"] >= 0.01)
+        post_write_wait = timing.getPostWriteWait(key, port.m_force_wait)
+        self.assertTrue(0.01 <= post_write_wait < 0.1)
+        deadline = timing.getDeadline(key, port.m_max_waits * port.m_wait_sleep)
+        self.assertTrue(0.01 < deadline < port.m_max_waits * port.m_wait_sleep)
+        for i in range(3):
+            meter.requestBreadCounter[self.v4_addr] = meter.requestBinterval + 1
+            self.assertEqual(meter.request(), True)
+        self.assertEqual(timing.getStats()[key]["timeouts"], 0)
+        self.assertTrue(timing.getPostWriteWait(key, port.m_force_wait) < 0.1)
+
+    def testSlidingWindowAccumulator(self):
+        window = WindowAccumulator(10)
+        for sample_time, value in [(0, 5), (2, 1), (4, 4), (6, 2), (8, 8)]:
+            window.add(sample_time, value)
+        window.add(10, 3)
+        summary = window.summarize(self.v4_addr, Field.RMS_Volts_Ln_1, 0, 10)
+        self.assertEqual((summary.Count, summary.Min, summary.Max, summary.Last), (5, 1, 8, 3))
+        self.assertAlmostEqual(summary.Mean, 3.6)
+        window.add(12, 7)
+        summary = window.summarize(self.v4_addr, Field.RMS_Volts_Ln_1, 2, 12)
+        self.assertEqual((summary.Count, summary.Min, summary.Max), (5, 2, 8))
+        self.assertAlmostEqual(summary.Mean, 4.8)
+        window.add(20, 0)
+        summary = window.summarize(self.v4_addr, Field.RMS_Volts_Ln_1, 10, 20)
+        self.assertEqual((summary.Count, summary.Min, summary.Max, summary.Delta), (2, 0, 7, -7))
+        self.assertAlmostEqual(summary.Mean, 3.5)
+
+        rng = random.Random(7)
+        window = WindowAccumulator(5)
+        samples = []
+        for sample_time in range(200):
+            value = rng.randint(0, 50)
+            window.add(sample_time, value)
+            samples.append((sample_time, value))
+            live = [val for (stamp, val) in samples if stamp > sample_time - 5]
+            summary = window.summarize(self.v4_addr, Field.RMS_Volts_Ln_1, sample_time - 5, sample_time)
+            self.assertEqual((summary.Count, summary.Min, summary.Max), (len(live), min(live), max(live)))
+            self.assertAlmostEqual(summary.Mean, float(sum(live)) / len(live))
+
+    def testSummaryObserverInsert(self):
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(self.port)
+        db_file = os.path.join(tempfile.mkdtemp(), "summary.db")
+        meter_db = SqliteMeterDB(db_file)
+        meter_db.dbCreateSummary()
+        observer = SummaryObserver(60, [Field.RMS_Volts_Ln_1], meter_db=meter_db)
+        virtual = self.emulator.getMeter(self.v4_addr)
+        for stamp, volts in [(0, 120.5), (10000, 118.0), (20000, 121.5), (61000, 119.0)]:
+            virtual.setValue(Field.RMS_Volts_Ln_1, volts)
+            self.assertEqual(meter.request(), True)
+            observer.update(ReadSnapshot.fromBlock(meter.getReadBuffer(), stamp))
+        observer.flush()
+        con = sqlite3.connect(db_file)
+        rows = con.execute("SELECT Meter_Address, Field_Name, Start_Time, End_Time, " +
+                           "Summary_Count, Summary_Min, Summary_Max, Summary_Mean, " +
+                           "Summary_Last, Summary_Delta FROM Meter_Summaries ORDER BY Start_Time").fetchall()
+        con.close()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(tuple(rows[0][:7]), (self.v4_addr, Field.RMS_Volts_Ln_1, 0, 60000, 3, 118.0, 121.5))
+        self.assertAlmostEqual(rows[0][7], 120.0)
+        self.assertEqual(tuple(rows[0][8:]), (121.5, 1.0))
+        self.assertEqual(tuple(rows[1][2:7]), (60000, 120000, 1, 119.0, 119.0))
+
+    def testMetricsExposition(self):
+        registry = MetricsRegistry()
+        ekm_set_metrics(registry)
+        server = MetricsServer(port=0)
+        try:
+            meter = V3Meter(self.v3_addr)
+            meter.attachPort(self.port)
+            self.assertEqual(meter.request(), True)
+            meter_db = SqliteMeterDB(os.path.join(tempfile.mkdtemp(), "metrics.db"))
+            meter_db.dbCreate()
+            self.assertEqual(meter.insert(meter_db), True)
+            self.emulator.setErrors(bad_crc=1.0)
+            self.assertEqual(meter.request(), False)
+
+            self.assertEqual(registry.getValue(Metric.ReadsAttempted, self.v3_addr), 2)
+            self.assertEqual(registry.getValue(Metric.ReadsSucceeded, self.v3_addr), 1)
+            self.assertEqual(registry.getValue(Metric.CrcFailures, self.v3_addr), 1)
+            self.assertEqual(registry.getValue(Metric.DbInsertSeconds, self.v3_addr), 1)
+            self.assertEqual(registry.getValue(Metric.LengthErrors, self.v3_addr), 0)
+
+            registry.describe("ekm_test_seconds", "Test samples.", MetricType.Histogram, buckets=(0.1, 1.0))
+            for value in (0.1, 0.5, 2.0):
+                registry.observe("ekm_test_seconds", value, self.v3_addr)
+            registry.setGauge(Metric.SpoolPending, 3, 'a"b')
+
+            lines = registry.render().splitlines()
+            label = 'meter="' + self.v3_addr + '"'
+            self.assertIn("# HELP " + Metric.CrcFailures + " Blocks received with a bad CRC.", lines)
+            self.assertIn("# TYPE " + Metric.CrcFailures + " counter", lines)
+            self.assertIn(Metric.ReadsAttempted + "{" + label + "} 2.0", lines)
+            self.assertIn(Metric.CrcFailures + "{" + label + "} 1.0", lines)
+            self.assertIn("# TYPE " + Metric.SpoolPending + " gauge", lines)
+            self.assertIn(Metric.SpoolPending + '{spool="a\\"b"} 3.0', lines)
+            self.assertIn("# TYPE " + Metric.DbInsertSeconds + " histogram", lines)
+            self.assertIn(Metric.DbInsertSeconds + "_bucket{" + label + ',le="+Inf"} 1', lines)
+            self.assertIn(Metric.DbInsertSeconds + "_count{" + label + "} 1", lines)
+            insert_buckets = [int(line.split()[-1]) for line in lines
+                              if line.startswith(Metric.DbInsertSeconds + "_bucket")]
+            self.assertEqual(insert_buckets, sorted(insert_buckets))
+            self.assertEqual(len(insert_buckets), len(MetricsRegistry.m_default_buckets) + 1)
+            self.assertEqual([line for line in lines if line.startswith("ekm_test_seconds")],
+                             ['ekm_test_seconds_bucket{' + label + ',le="0.1"} 1',
+                              'ekm_test_seconds_bucket{' + label + ',le="1.0"} 2',
+                              'ekm_test_seconds_bucket{' + label + ',le="+Inf"} 3',
+                              'ekm_test_seconds_sum{' + label + '} 2.6',
+                              'ekm_test_seconds_count{' + label + '} 3'])
+
+            self.assertEqual(server.start(), True)
+            response = urllib.request.urlopen("http://127.0.0.1:" + str(server.getPort()) + "/metrics", timeout=5)
+            self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+            self.assertEqual(response.read().decode("utf-8"), registry.render())
+            response.close()
+        finally:
+            server.stop()
+            ekm_set_metrics(None)
+
+    def testLatencyHistogram(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.getPercentile(50), 0.0)
+        self.assertEqual(histogram.getSummary()["max"], 0.0)
+        floor = LatencyHistogram.m_floor
+        for idx in range(1, LatencyHistogram.m_buckets):
+            histogram.reset()
+            histogram.add(floor * 2 ** ((idx - 0.5) / LatencyHistogram.m_per_octave))
+            self.assertEqual(histogram.m_counts[idx], 1)
+            histogram.reset()
+            histogram.add(floor * 2 ** (float(idx) / LatencyHistogram.m_per_octave) * 1.001)
+            self.assertEqual(histogram.m_counts[min(idx + 1, LatencyHistogram.m_buckets - 1)], 1)
+        histogram.reset()
+        histogram.add(floor / 10)
+        histogram.add(1.0e6)
+        self.assertEqual((histogram.m_counts[0], histogram.m_counts[-1]), (1, 1))
+        self.assertEqual(histogram.getPercentile(50), floor)
+        self.assertEqual(histogram.getPercentile(100), 1.0e6)
+
+        histogram.reset()
+        for i in range(90):
+            histogram.add(0.001)
+        for i in range(9):
+            histogram.add(0.1)
+        histogram.add(1.0)
+        edge = 2 ** (1.0 / LatencyHistogram.m_per_octave)
+        summary = histogram.getSummary()
+        self.assertEqual((summary["count"], summary["min"], summary["max"]), (100, 0.001, 1.0))
+        self.assertAlmostEqual(summary["mean"], (0.09 + 0.9 + 1.0) / 100)
+        self.assertTrue(0.001 <= summary["p50"] <= 0.001 * edge)
+        self.assertTrue(0.001 <= summary["p90"] <= 0.001 * edge)
+        self.assertTrue(0.1 <= summary["p99"] <= 0.1 * edge)
+        self.assertEqual(histogram.getPercentile(100), 1.0)
+        self.assertEqual(histogram.getPercentile(0), summary["p50"])
+
+        samples = []
+        stats = LatencyStats(self.v4_addr, lambda name, stage, seconds: samples.append((name, stage, seconds)))
+        stats.record(LatencyStage.Crc, 0.002)
+        stats.record(LatencyStage.Write, 0.004)
+        stats.record(LatencyStage.Crc, 0.006)
+        self.assertEqual(list(stats.getStats().keys()), [LatencyStage.Crc, LatencyStage.Write])
+        self.assertEqual(stats.getHistogram(LatencyStage.Crc).getCount(), 2)
+        self.assertAlmostEqual(stats.getStats()[LatencyStage.Crc]["mean"], 0.004)
+        self.assertEqual(samples[1], (self.v4_addr, LatencyStage.Write, 0.004))
+        stats.reset()
+        self.assertEqual(stats.getHistogram(LatencyStage.Crc), None)
+
+    def testLatencyStatsEmulator(self):
+        emulator = OmnimeterEmulator(latency=0.01, seed=1)
+        emulator.addMeter(self.v4_addr, 4)
+        port = EmulatorPort(emulator)
+        self.assertEqual(port.initPort(), True)
+        port.setPollingValues(100, 0.001)
+        port_stats = port.enableLatencyStats()
+        meter = V4Meter(self.v4_addr)
+        meter.attachPort(port)
+        samples = []
+        meter_stats = meter.enableLatencyStats(lambda name, stage, seconds: samples.append((name, stage)))
+
+        self.assertEqual(meter.request(), True)
+        stats = meter_stats.getStats()
+        self.assertEqual(list(stats.keys()),
+                         [LatencyStage.Write, LatencyStage.Response, LatencyStage.Unpack, LatencyStage.Convert,
+                          LatencyStage.Crc, LatencyStage.Calculate, LatencyStage.Observers, LatencyStage.Request])
+        self.assertEqual(stats[LatencyStage.Response]["count"], 2)
+        self.assertEqual(stats[LatencyStage.Request]["count"], 1)
+        self.assertTrue(stats[LatencyStage.Response]["min"] >= 0.005)
+        self.assertTrue(stats[LatencyStage.Request]["min"] >= 2 * stats[LatencyStage.Response]["min"])
+        self.assertEqual(port_stats.getHistogram(LatencyStage.Response).getCount(), 2)
+
+        self.assertEqual(meter.setCTRatio(CTRatio.Amps_400), True)
+        stats = meter_stats.getStats()
+        self.assertEqual(stats["setCTRatio"]["count"], 1)
+        self.assertTrue(stats["setCTRatio"]["min"] >= 0.01)
+        self.assertEqual(stats[LatencyStage.Request]["count"], 2)
+        self.assertEqual(port_stats.getHistogram(LatencyStage.Response).getCount(),
+                         stats[LatencyStage.Response]["count"] + 2)
+        self.assertEqual(len(samples), sum(stage["count"] for stage in stats.values()))
+        self.assertEqual(samples[0], (self.v4_addr, LatencyStage.Write))
+
+        meter.disableLatencyStats()
+        port.disableLatencyStats()
+        self.assertEqual(meter.request(), True)
+        self.assertEqual(meter.getLatencyStats(), None)
+        self.assertEqual(len(samples), sum(stage["count"] for stage in stats.values()))
+
+    def testMetricsShortFrame(self):
+        class ShortPort(EmulatorPort):
+            def getResponse(self, context=""):
+                return super(ShortPort, self).getResponse(context)[:200]
+
+        port = ShortPort(self.emulator)
+        self.assertEqual(port.initPort(), True)
+        port.setPollingValues(100, 0.001)
+        registry = MetricsRegistry()
+        ekm_set_metrics(registry)
+        try:
+            meter = V3Meter(self.v3_addr)
+            meter.attachPort(port)
+            self.assertEqual(meter.request(), False)
+        finally:
+            ekm_set_metrics(None)
+        self.assertEqual(registry.getValue(Metric.ReadsAttempted, self.v3_addr), 1)
+        self.assertEqual(registry.getValue(Metric.LengthErrors, self.v3_addr), 1)
+        self.assertEqual(registry.getValue(Metric.CrcFailures, self.v3_addr), 0)
+
+    def testCommandFrame(self):
+        req_str = "015731023030443028" + str2hex("0200") + "2903"
+        req_str += Meter.calc_crc16(hex2str(req_str[2:]))
+        self.assertEqual(CommandFrame.get("W", "00D0", (4,)).build(200), hex2str(req_str))
+        req_str = "0150310228" + str2hex("00000000") + "2903"
+        req_str += Meter.calc_crc16(hex2str(req_str[2:]))
+        self.assertEqual(CommandFrame.get("P").buildPayload("00000000"), hex2str(req_str))
+        self.assertTrue(CommandFrame.get("W", "00D0", (4,)) is CommandFrame.get("W", "00D0", (4,)))
+
 if __name__ == '__main__':
     unittest.main()